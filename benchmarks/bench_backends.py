@@ -0,0 +1,103 @@
+"""Run the same workload against each storage backend, side by side.
+
+SQLite and in-memory always run; MySQL joins in when WORK_DB_BACKEND=mysql
+(or db.ini) points at a reachable server. Every backend must return the
+same summary and breakdown, overall and per user / project, so the run
+doubles as a consistency check.
+Usage: python benchmarks/bench_backends.py [rows]
+
+Note: the MySQL run appends to the configured table, so point it at an
+empty database or the consistency check will fail.
+"""
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import DB_ERRORS, MemoryBackend, SQLiteBackend, load_config, open_backend
+
+SINGLE_ROW_SAMPLE = 1000
+START = datetime(2015, 1, 1, 9, 0, 0)
+
+
+def synthetic(rows, offset=0):
+    return ((START + timedelta(hours=5 * (i + offset)), i % 12 + 1) for i in range(rows))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def walk_pages(backend):
+    """Page through the whole table newest first, returns rows seen"""
+    count, after = 0, None
+    while True:
+        rows = backend.page(after, 50)
+        if not rows:
+            return count
+        count += len(rows)
+        after = (rows[-1][1], rows[-1][0])
+
+
+def workload(backend, rows):
+    now = START + timedelta(hours=5 * rows // 2)
+    return [
+        ('add_many', lambda: backend.add_many(synthetic(rows))),
+        (f'add x{SINGLE_ROW_SAMPLE}', lambda: sum(
+            1 for date_time, hours in synthetic(SINGLE_ROW_SAMPLE, rows) if backend.add(date_time, hours)
+        )),
+        ('count_and_total', backend.count_and_total),
+        ('summary', lambda: backend.summary(now)),
+        ('breakdown(day)', lambda: len(backend.breakdown('day'))),
+        ('breakdown(month)', lambda: backend.breakdown('month')),
+        ('page x all', lambda: walk_pages(backend)),
+        ('iter_batches', lambda: sum(len(batch) for batch in backend.iter_batches())),
+        ('add_many(user)', lambda: backend.add_many(synthetic(rows // 4), dedup=True, user='alice', project='web')),
+        ('totals_by(user)', lambda: backend.totals_by('user')),
+        ('totals_by(project)', lambda: backend.totals_by('project')),
+        ('summary(user)', lambda: backend.summary(now, user='alice')),
+        ('breakdown(project)', lambda: backend.breakdown('month', project='web')),
+    ]
+
+
+def run():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [MemoryBackend(), SQLiteBackend(os.path.join(tmp, 'bench.db'))]
+        config = load_config()
+        if config['backend'].lower() == 'mysql':
+            try:
+                server = open_backend(config)
+                # A scratch database (see above), so it is fine to migrate it here
+                server.migrate()
+                backends.append(server)
+            except (RuntimeError,) + DB_ERRORS as e:
+                print(f"Skipping MySQL: {e}")
+
+        timings, results = {}, {}
+        for backend in backends:
+            for name, func in workload(backend, rows):
+                elapsed, result = timed(func)
+                timings.setdefault(name, {})[backend.name] = elapsed
+                results.setdefault(name, {})[backend.name] = result
+            backend.close()
+
+        names = [backend.name for backend in backends]
+        print(f"{'operation':<20}" + "".join(f"{name:>12}" for name in names))
+        print("-" * (20 + 12 * len(names)))
+        for operation, by_backend in timings.items():
+            print(f"{operation:<20}" + "".join(f"{by_backend[name] * 1000:>10.1f}ms" for name in names))
+
+        mismatched = [name for name, by_backend in results.items() if len(set(map(repr, by_backend.values()))) > 1]
+        if mismatched:
+            print(f"Backends disagree on: {', '.join(mismatched)}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,108 @@
+"""Compare connect-per-call against the pooled DatabaseManager.
+
+DatabaseManager's summary/records cache is cleared before every read, so
+both sides run the query and the numbers compare connection handling.
+
+Usage: python benchmarks/bench_connections.py [iterations]
+"""
+from datetime import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+
+class LegacyDatabaseManager:
+    """The old behaviour: a fresh connection for every call."""
+    path = None
+
+    @staticmethod
+    def connect():
+        return sqlite3.connect(os.path.abspath(LegacyDatabaseManager.path))
+
+    @staticmethod
+    def write_to_db(date_time, hours):
+        connection = LegacyDatabaseManager.connect()
+        connection.execute(
+            "INSERT INTO working_hourse (date_time, hourse) VALUES (?, ?)",
+            (date_time.strftime('%Y-%m-%d %H:%M:%S'), hours)
+        )
+        connection.commit()
+        connection.close()
+
+    @staticmethod
+    def read_from_db():
+        connection = LegacyDatabaseManager.connect()
+        records = connection.execute("SELECT * FROM working_hourse ORDER BY date_time DESC").fetchall()
+        connection.close()
+        return [(r[0], datetime.strptime(r[1], '%Y-%m-%d %H:%M:%S'), r[2]) for r in records]
+
+    @staticmethod
+    def get_summary():
+        connection = LegacyDatabaseManager.connect()
+        cursor = connection.cursor()
+        cursor.execute("SELECT SUM(hourse) FROM working_hourse")
+        total_hours = cursor.fetchone()[0] or 0
+        cursor.execute("SELECT SUM(hourse) FROM working_hourse WHERE date(date_time) = date('now', 'localtime')")
+        today_hours = cursor.fetchone()[0] or 0
+        cursor.execute("SELECT SUM(hourse) FROM working_hourse WHERE strftime('%Y-%m', date_time) = strftime('%Y-%m', 'now', 'localtime')")
+        month_hours = cursor.fetchone()[0] or 0
+        connection.close()
+        return today_hours, month_hours, total_hours
+
+
+def ops_per_sec(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def uncached(manager, func):
+    """func, clearing the manager's cache first if it has one"""
+    cache = getattr(manager, 'cache', None)
+    if cache is None:
+        return func
+
+    def call():
+        cache.clear()
+        return func()
+    return call
+
+
+def run(manager, iterations):
+    now = datetime.now()
+    return {
+        'write_to_db': ops_per_sec(lambda: manager.write_to_db(now, 8), iterations),
+        'read_from_db': ops_per_sec(uncached(manager, manager.read_from_db), iterations),
+        'get_summary': ops_per_sec(uncached(manager, manager.get_summary), iterations),
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        LegacyDatabaseManager.path = os.path.join(tmp, 'legacy.db')
+        DatabaseManager.DB_PATH = os.path.join(tmp, 'pooled.db')
+        DatabaseManager.create_table_if_not_exists()
+        connection = LegacyDatabaseManager.connect()
+        connection.execute("CREATE TABLE working_hourse (sr_no INTEGER PRIMARY KEY AUTOINCREMENT, date_time TIMESTAMP, hourse INTEGER)")
+        connection.close()
+
+        before = run(LegacyDatabaseManager, iterations)
+        after = run(DatabaseManager, iterations)
+        DatabaseManager.close()
+
+    print(f"{'operation':<15} {'before ops/s':>14} {'after ops/s':>14} {'speedup':>9}")
+    print("-" * 55)
+    for name in before:
+        print(f"{name:<15} {before[name]:>14.0f} {after[name]:>14.0f} {after[name] / before[name]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
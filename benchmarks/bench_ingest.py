@@ -0,0 +1,81 @@
+"""Rows/sec for bulk ingestion versus one write_to_db call per row.
+
+Generates a synthetic CSV export and loads it into a temporary app
+database (DatabaseManager) and, through main.py, an in-memory backend.
+Usage: python benchmarks/bench_ingest.py [rows]
+"""
+from datetime import datetime, timedelta
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from records_io import read_records
+from storage import MemoryBackend
+import main
+
+# Single-row inserts are slow enough that a sample gives a stable rate
+SINGLE_ROW_SAMPLE = 2000
+
+
+def write_csv(path, rows):
+    start = datetime(2015, 1, 1, 9, 0, 0)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date_time', 'hours'])
+        for i in range(rows):
+            writer.writerow([(start + timedelta(hours=5 * i)).strftime('%Y-%m-%d %H:%M:%S'), i % 12 + 1])
+
+
+def rate(label, func):
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {count:>8} rows {count / elapsed:>12.0f} rows/s")
+
+
+def use_app_db(path):
+    DatabaseManager.close()
+    DatabaseManager.DB_PATH = path
+    DatabaseManager.create_table_if_not_exists()
+
+
+def run():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'export.csv')
+        write_csv(csv_path, rows)
+        print(f"{'path':<36} {'inserted':>13} {'rate':>17}")
+        print("-" * 70)
+
+        rate("parse CSV only", lambda: sum(1 for _ in read_records(csv_path)))
+
+        use_app_db(os.path.join(tmp, 'single.db'))
+        def single_rows():
+            count = 0
+            for date_time, hours in read_records(csv_path):
+                if count == SINGLE_ROW_SAMPLE:
+                    break
+                DatabaseManager.write_to_db(date_time, hours)
+                count += 1
+            return count
+        rate("DatabaseManager.write_to_db per row", single_rows)
+
+        use_app_db(os.path.join(tmp, 'bulk.db'))
+        rate("DatabaseManager.write_many", lambda: DatabaseManager.write_many(read_records(csv_path)))
+
+        use_app_db(os.path.join(tmp, 'dedup.db'))
+        rate("DatabaseManager.write_many dedup", lambda: DatabaseManager.write_many(read_records(csv_path), dedup=True))
+        DatabaseManager.close()
+
+        main._database = MemoryBackend()
+        rate("main.write_many (memory backend)", lambda: main.write_many(read_records(csv_path)))
+        main.get_database().close()
+
+
+if __name__ == '__main__':
+    run()
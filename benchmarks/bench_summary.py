@@ -0,0 +1,66 @@
+"""Time main.read_from_db's rollup lookup against the old fetchall + Python sum.
+
+Runs against a temporary SQLite backend seeded with synthetic rows.
+Usage: python benchmarks/bench_summary.py [rows]
+"""
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import load_config, open_backend
+import main
+
+
+def seed(db, rows):
+    start = datetime(2015, 1, 1, 9, 0, 0)
+    db.add_many(((start + timedelta(minutes=7 * i), i % 12 + 1) for i in range(rows)), chunk_size=10000)
+
+
+def legacy_read_from_db(db):
+    """The old implementation: fetch every row and sum in Python."""
+    with db.pool.reader() as connection:
+        rows = connection.execute("SELECT * FROM `working_hourse`").fetchall()
+    return len(rows), sum(int(row[2]) for row in rows)
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        config = dict(load_config(), backend='sqlite', path=os.path.join(tmp, 'bench.db'))
+        main._database = open_backend(config)
+        db = main.get_database()
+
+        start = time.perf_counter()
+        seed(db, rows)
+        print(f"Seeded {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        results = [
+            ('fetchall + Python sum', lambda: legacy_read_from_db(db)),
+            ('read_from_db (rollups)', main.read_from_db),
+            ('get_breakdown(day)', lambda: len(main.get_breakdown('day'))),
+            ('get_breakdown(month)', lambda: len(main.get_breakdown('month'))),
+        ]
+        print(f"{'query':<24} {'best of 3':>10}  result")
+        print("-" * 50)
+        for name, func in results:
+            elapsed, result = timed(func)
+            print(f"{name:<24} {elapsed * 1000:>8.1f}ms  {result}")
+        db.close()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,274 @@
+"""Reproducible benchmark suite for the data layer and the UI refresh paths.
+
+For each size (1k, 100k and 1M rows by default) a fresh work_tracker.db and
+a main.py database are seeded with the same synthetic rows, then timed:
+
+    app.*   DatabaseManager.write_to_db, queue_write, read_from_db, read_page,
+            get_summary, get_report
+    cli.*   main.write_to_db, read_from_db, print_table, get_report
+    ui.*    RecordScreen.update_table and HomeScreen.update_summary, run in a
+            headless Kivy app in a subprocess
+
+Caches are cleared before every read, so the numbers are cold lookups.
+Results go to a JSON file. Any metric over its limit in thresholds.json, or
+more than --tolerance slower than a --baseline results file, is reported
+and makes the run exit with status 1.
+
+The main.py side uses a temporary SQLite file unless --cli-backend names
+another backend (memory, or mysql as configured in db.ini / WORK_DB_*).
+
+Usage: python benchmarks/suite.py [--sizes 1000,100000] [--baseline old.json]
+"""
+from datetime import datetime, timedelta
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import DatabaseManager, RecordSet
+from storage import SQLiteBackend, load_config, open_backend
+import main
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_THRESHOLDS = os.path.join(HERE, 'thresholds.json')
+DEFAULT_OUT = os.path.join(HERE, 'results.json')
+# Calls per timed run for the operations that are too quick to time singly
+WRITES_PER_RUN = 100
+# Baseline slowdowns below this many milliseconds are ignored as noise
+NOISE_MS = 0.5
+# 1M rows 7 minutes apart end in 2013, so records saved "now" are the newest
+START = datetime(2000, 1, 1, 9, 0, 0)
+
+
+def synthetic(rows):
+    """The same rows every run: one every 7 minutes from START, 1-12 hours"""
+    return ((START + timedelta(minutes=7 * i), i % 12 + 1) for i in range(rows))
+
+
+def measure(func, repeat, number=1, setup=None):
+    """Best and median milliseconds per call over `repeat` runs of `number` calls"""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - start) * 1000 / number)
+    return {'best_ms': round(min(runs), 4), 'median_ms': round(statistics.median(runs), 4), 'runs': repeat}
+
+
+def bench_app(path, rows, repeat):
+    DatabaseManager.DB_PATH = path
+    DatabaseManager.use_backend(SQLiteBackend(path))
+    DatabaseManager.write_many(synthetic(rows))
+    cold = DatabaseManager.cache.clear
+    results = {
+        'app.write_to_db': measure(lambda: DatabaseManager.write_to_db(datetime.now(), 1), repeat, WRITES_PER_RUN),
+        'app.read_from_db': measure(DatabaseManager.read_from_db, repeat, setup=cold),
+        'app.read_page': measure(DatabaseManager.read_page, repeat),
+        'app.get_summary': measure(DatabaseManager.get_summary, repeat, setup=cold),
+        'app.get_report': measure(DatabaseManager.get_report, repeat, setup=cold),
+        # Last, so the background commits don't overlap the reads above
+        'app.queue_write': measure(lambda: DatabaseManager.queue_write(datetime.now(), 1), repeat, WRITES_PER_RUN),
+    }
+    DatabaseManager.close()
+    return results
+
+
+def bench_cli(config, rows, repeat):
+    main._database = open_backend(config)
+    main.write_many(synthetic(rows))
+    with open(os.devnull, 'w') as out:
+        results = {
+            'cli.write_to_db': measure(lambda: main.write_to_db(datetime.now(), 1), repeat, WRITES_PER_RUN),
+            'cli.read_from_db': measure(main.read_from_db, repeat),
+            'cli.print_table': measure(lambda: main.print_table(0, out=out), repeat),
+            'cli.get_report': measure(lambda: main.get_report('month'), repeat),
+        }
+    main.get_database().close()
+    main._database = None
+    return results
+
+
+def bench_ui(path, repeat):
+    """Run this script with --ui in a headless Kivy subprocess, return its timings"""
+    env = dict(os.environ)
+    for key, value in (('KIVY_NO_ARGS', '1'), ('KIVY_NO_CONSOLELOG', '1'),
+                       ('SDL_VIDEODRIVER', 'offscreen'), ('KIVY_GL_BACKEND', 'mock')):
+        env.setdefault(key, value)
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        out = f.name
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--ui', path, '--out', out, '--repeat', str(repeat)],
+            env=env, check=True, stdout=subprocess.DEVNULL
+        )
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+
+def load_frontend():
+    spec = importlib.util.spec_from_file_location('frontend', os.path.join(ROOT, 'frontend kivy.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_ui(path, out, repeat):
+    """Time the screens' refresh coroutines inside a running app"""
+    DatabaseManager.DB_PATH = path
+    frontend = load_frontend()
+    from kivy.clock import Clock
+    import asynckivy as ak
+
+    app = frontend.WorkTrackerApp()
+    timings = {'ui.update_summary': [], 'ui.update_table': [], 'ui.update_table_newer': []}
+
+    def timed(name, start):
+        timings[name].append((time.perf_counter() - start) * 1000)
+
+    async def drive():
+        try:
+            # Let on_start run first
+            await ak.sleep(0)
+            home = app.root.get_screen('home')
+            screen = app.get_screen('records')
+            view = screen.ids.records_view
+            for _ in range(repeat):
+                DatabaseManager.cache.clear()
+                start = time.perf_counter()
+                await home._update_summary()
+                timed('ui.update_summary', start)
+
+                # First page from scratch, including building the visible rows
+                screen.records, screen.max_sr_no, screen.all_loaded = RecordSet(), 0, False
+                start = time.perf_counter()
+                await screen._update_table()
+                view.refresh_views()
+                timed('ui.update_table', start)
+
+                # Returning to the screen after a save: read_newer and prepend
+                DatabaseManager.write_to_db(datetime.now(), 1)
+                start = time.perf_counter()
+                await screen._update_table()
+                view.refresh_views()
+                timed('ui.update_table_newer', start)
+        finally:
+            app.stop()
+
+    Clock.schedule_once(lambda dt: ak.start(drive()), 0)
+    app.run()
+    results = {
+        name: {'best_ms': round(min(runs), 4), 'median_ms': round(statistics.median(runs), 4), 'runs': len(runs)}
+        for name, runs in timings.items() if runs
+    }
+    with open(out, 'w') as f:
+        json.dump(results, f)
+
+
+def check(results, thresholds, baseline, tolerance, min_delta=NOISE_MS):
+    """Return a line for every metric over its threshold or slower than the baseline.
+
+    Against the baseline, slowdowns smaller than min_delta milliseconds are
+    treated as noise whatever the ratio.
+    """
+    failures = []
+    for size, metrics in results.items():
+        for name, timing in metrics.items():
+            limit = thresholds.get(size, {}).get(name)
+            if limit is not None and timing['median_ms'] > limit:
+                failures.append(f"{size} rows {name}: {timing['median_ms']:.3f}ms over threshold {limit}ms")
+            before = baseline.get(size, {}).get(name)
+            if before and timing['median_ms'] > max(before['median_ms'] * (1 + tolerance),
+                                                    before['median_ms'] + min_delta):
+                failures.append(
+                    f"{size} rows {name}: {timing['median_ms']:.3f}ms vs baseline {before['median_ms']:.3f}ms"
+                )
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the data layer and UI refresh paths.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated row counts to seed (default 1000,100000,1000000)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per metric (default 5)")
+    parser.add_argument('--out', default=DEFAULT_OUT, help="results file (default benchmarks/results.json)")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS,
+                        help="JSON of {size: {metric: max median ms}} (default benchmarks/thresholds.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown against --baseline, 0.25 = 25%% (default)")
+    parser.add_argument('--cli-backend', default='sqlite', choices=['sqlite', 'mysql', 'memory'],
+                        help="backend for the main.py side (default: a temporary SQLite file)")
+    parser.add_argument('--no-ui', action='store_true', help="skip the Kivy screens")
+    parser.add_argument('--ui', metavar='DB', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.ui:
+        run_ui(args.ui, args.out, args.repeat)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            started = time.perf_counter()
+            app_path = os.path.join(tmp, f'work_tracker-{rows}.db')
+            config = dict(load_config(), backend=args.cli_backend, path=os.path.join(tmp, f'cli-{rows}.sqlite'))
+            metrics = bench_app(app_path, rows, args.repeat)
+            metrics.update(bench_cli(config, rows, args.repeat))
+            if not args.no_ui:
+                metrics.update(bench_ui(app_path, args.repeat))
+            results[str(rows)] = metrics
+
+            print(f"{rows} rows ({time.perf_counter() - started:.1f}s)")
+            for name, timing in metrics.items():
+                print(f"  {name:<24} median {timing['median_ms']:>10.3f}ms  best {timing['best_ms']:>10.3f}ms")
+
+    thresholds, baseline = {}, {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    failures = check(results, thresholds, baseline, args.tolerance)
+
+    with open(args.out, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sqlite': sqlite3.sqlite_version,
+            'cli_backend': args.cli_backend,
+            'repeat': args.repeat,
+            'results': results,
+            'regressions': failures,
+        }, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    for line in failures:
+        print(f"REGRESSION {line}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,547 @@
+from datetime import datetime, timedelta
+from array import array
+import threading
+import os
+
+from instrumentation import metrics
+from records_io import positive_int, read_records, write_records
+from reports import OVERTIME_HOURS, ROLLING_DAYS, Report, build_report
+from storage import (
+    BULK_CHUNK_SIZE, DB_ERRORS, EPOCH, EXPORT_BATCH_SIZE, PAGE_SIZE,
+    SQLiteBackend, day_number, load_config, month_number, open_backend, to_epoch,
+)
+from write_queue import WriteQueue
+
+# Database Configuration
+DB_NAME = 'work_tracker.db'
+# Write queue log, next to the database file
+QUEUE_SUFFIX = '-queue'
+
+
+class RecordSet:
+    """Records stored column-wise in typed arrays: ids, epoch seconds, hours.
+
+    Indexing returns (sr_no, datetime, hours) like a list of rows, but the
+    datetime is only built for the rows actually looked at. format_dates
+    formats a slice in one pass, running strftime once per distinct day.
+    """
+
+    def __init__(self, ids=(), stamps=(), hours=()):
+        self.ids = array('q', ids)
+        self.stamps = array('q', stamps)
+        self.hours = array('q', hours)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (sr_no, ts, hours) rows as returned by a storage backend"""
+        if not rows:
+            return cls()
+        ids, stamps, hours = zip(*rows)
+        return cls(ids, stamps, hours)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordSet(self.ids[index], self.stamps[index], self.hours[index])
+        return self.ids[index], EPOCH + timedelta(seconds=self.stamps[index]), self.hours[index]
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    def copy(self):
+        return self[:]
+
+    def extend(self, other):
+        """Append another RecordSet after this one"""
+        self.ids.extend(other.ids)
+        self.stamps.extend(other.stamps)
+        self.hours.extend(other.hours)
+
+    def prepend(self, other):
+        """Insert another RecordSet in front of this one"""
+        self.ids[0:0] = other.ids
+        self.stamps[0:0] = other.stamps
+        self.hours[0:0] = other.hours
+
+    def format_dates(self, start=0, stop=None, day_format='%d/%m'):
+        """Return 'dd/mm HH:MM' style labels for rows start..stop"""
+        day_labels = {}
+        labels = []
+        for ts in self.stamps[start:stop]:
+            day, seconds = divmod(ts, 86400)
+            day_label = day_labels.get(day)
+            if day_label is None:
+                day_label = day_labels[day] = (EPOCH + timedelta(days=day)).strftime(day_format)
+            labels.append(f"{day_label} {seconds // 3600:02d}:{seconds // 60 % 60:02d}")
+        return labels
+
+
+class SummaryCache:
+    """Summary values and recent records kept in memory between refreshes.
+
+    Writes update the cached values in place; the summary is keyed by the
+    day/month it was computed for, so it goes stale by itself at rollover.
+    Reports are keyed by their parameters and the day, and dropped on writes.
+
+    Every change bumps `generation`. A reader takes it before querying and
+    passes it to the set_* call, which drops the result if the cache changed
+    meanwhile: a read that started before a commit must not be cached after
+    the commit cleared the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self.stale = 0
+        self.clear()
+
+    def clear(self):
+        """Drop everything, the next lookups go to the database"""
+        with self._lock:
+            self.generation += 1
+            self._summary = None
+            self._summary_key = None
+            self._records = None
+            self._reports = {}
+
+    def _outdated(self, generation):
+        # Called with the lock held
+        if generation != self.generation:
+            self.stale += 1
+            return True
+        return False
+
+    def get_summary(self, now):
+        with self._lock:
+            if self._summary is not None and self._summary_key == (day_number(now), month_number(now)):
+                self.hits += 1
+                return self._summary
+            self.misses += 1
+            return None
+
+    def set_summary(self, now, summary, generation):
+        with self._lock:
+            if self._outdated(generation):
+                return
+            self._summary_key = (day_number(now), month_number(now))
+            self._summary = summary
+
+    def get_report(self, key):
+        with self._lock:
+            report = self._reports.get(key)
+            if report is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return report
+
+    def set_report(self, key, report, generation):
+        with self._lock:
+            if self._outdated(generation):
+                return
+            self._reports[key] = report
+
+    def get_records(self):
+        with self._lock:
+            if self._records is not None:
+                self.hits += 1
+                return self._records.copy()
+            self.misses += 1
+            return None
+
+    def set_records(self, records, generation):
+        with self._lock:
+            if self._outdated(generation):
+                return
+            self._records = records.copy()
+
+    def add_record(self, sr_no, date_time, hours):
+        """Write-through for a record that was just committed"""
+        with self._lock:
+            self.generation += 1
+            self._reports = {}
+            if self._summary is not None:
+                today_hours, month_hours, total_hours = self._summary
+                day, month = self._summary_key
+                if day_number(date_time) == day:
+                    today_hours += hours
+                if month_number(date_time) == month:
+                    month_hours += hours
+                self._summary = (today_hours, month_hours, total_hours + hours)
+            if self._records is not None:
+                # Records are newest first; a back-dated entry needs a reload
+                ts = to_epoch(date_time)
+                if not self._records or ts >= self._records.stamps[0]:
+                    self._records.prepend(RecordSet([sr_no], [ts], [hours]))
+                else:
+                    self._records = None
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+
+
+class DatabaseManager:
+    """The app's view of its storage backend, with a summary/records cache.
+
+    Errors are reported and turned into empty results, so screens never
+    have to handle database exceptions themselves.
+    """
+    # Overridden on Android to point at external storage
+    DB_PATH = None
+    _backend = None
+    _backend_lock = threading.Lock()
+    _write_queue = None
+    cache = SummaryCache()
+    # Called with the committed (ts, hours) records after each queued batch,
+    # on the queue's thread
+    commit_callbacks = []
+
+    @staticmethod
+    def get_db_path():
+        if DatabaseManager.DB_PATH:
+            return DatabaseManager.DB_PATH
+        # Get the directory where the script is located
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(script_dir, DB_NAME)
+
+    @staticmethod
+    def get_backend():
+        """Return the shared backend, opening the SQLite file on first use"""
+        if DatabaseManager._backend is None:
+            with DatabaseManager._backend_lock:
+                if DatabaseManager._backend is None:
+                    try:
+                        DatabaseManager._backend = SQLiteBackend(DatabaseManager.get_db_path())
+                    except DB_ERRORS as e:
+                        print(f"Database connection error: {e}")
+                        metrics.error('db.connect', e)
+                        return None
+        return DatabaseManager._backend
+
+    @staticmethod
+    def use_backend(backend):
+        """Swap in another backend, e.g. a MemoryBackend for benchmarks"""
+        DatabaseManager.close()
+        with DatabaseManager._backend_lock:
+            DatabaseManager._backend = backend
+
+    @staticmethod
+    def get_write_queue():
+        """Return the write queue, replaying its log on first use"""
+        with DatabaseManager._backend_lock:
+            if DatabaseManager._write_queue is None:
+                DatabaseManager._write_queue = WriteQueue(
+                    DatabaseManager.get_db_path() + QUEUE_SUFFIX,
+                    DatabaseManager.get_backend,
+                    on_commit=DatabaseManager._queue_committed
+                )
+                if DatabaseManager._write_queue.replayed:
+                    print(f"Replaying {DatabaseManager._write_queue.replayed} queued records")
+            return DatabaseManager._write_queue
+
+    @staticmethod
+    def _queue_committed(records):
+        DatabaseManager.cache.clear()
+        for callback in DatabaseManager.commit_callbacks:
+            callback(records)
+
+    @staticmethod
+    def close():
+        """Flush the write queue and close the shared backend, e.g. when the app stops"""
+        write_queue, DatabaseManager._write_queue = DatabaseManager._write_queue, None
+        if write_queue is not None:
+            write_queue.close()
+        with DatabaseManager._backend_lock:
+            if DatabaseManager._backend is not None:
+                DatabaseManager._backend.close()
+                DatabaseManager._backend = None
+            DatabaseManager.cache.clear()
+
+    @staticmethod
+    @metrics.timed('db.create_table_if_not_exists')
+    def create_table_if_not_exists():
+        """Create the table or migrate it to the latest schema version"""
+        try:
+            backend = DatabaseManager.get_backend()
+            if backend:
+                return backend.migrate()
+        except DB_ERRORS as e:
+            print(f"Error creating table: {e}")
+            metrics.error('db.create_table_if_not_exists', e)
+        return None
+
+    @staticmethod
+    @metrics.timed('db.write_to_db')
+    def write_to_db(date_time, hours):
+        try:
+            backend = DatabaseManager.get_backend()
+            if backend:
+                sr_no = backend.add(date_time, hours)
+                DatabaseManager.cache.add_record(sr_no, date_time.replace(microsecond=0), hours)
+                return True
+            return False
+        except DB_ERRORS as e:
+            print(f"Error writing to database: {e}")
+            metrics.error('db.write_to_db', e)
+            return False
+
+    @staticmethod
+    @metrics.timed('db.queue_write')
+    def queue_write(date_time, hours):
+        """Log a record for the write queue to commit, True once it is on disk"""
+        try:
+            DatabaseManager.get_write_queue().add(date_time, hours)
+            return True
+        except (OSError, RuntimeError) as e:
+            print(f"Error queueing record: {e}")
+            metrics.error('db.queue_write', e)
+            return False
+
+    @staticmethod
+    @metrics.timed('db.write_many')
+    def write_many(records, chunk_size=BULK_CHUNK_SIZE, dedup=False):
+        """Insert (datetime, hours) pairs with one transaction per chunk.
+
+        With dedup, records for a day that already has one are skipped.
+        Returns the number of rows inserted, or None if the database failed;
+        chunks committed before the failure stay saved.
+        """
+        try:
+            backend = DatabaseManager.get_backend()
+            if not backend:
+                return None
+            return backend.add_many(records, chunk_size, dedup)
+        except DB_ERRORS as e:
+            print(f"Error writing batch to database: {e}")
+            metrics.error('db.write_many', e)
+            return None
+        finally:
+            DatabaseManager.cache.clear()
+
+    @staticmethod
+    @metrics.timed('db.read_from_db')
+    def read_from_db():
+        try:
+            cached = DatabaseManager.cache.get_records()
+            if cached is not None:
+                return cached
+            generation = DatabaseManager.cache.generation
+            backend = DatabaseManager.get_backend()
+            if backend:
+                records = RecordSet.from_rows(backend.all_rows())
+                DatabaseManager.cache.set_records(records, generation)
+                return records
+            return RecordSet()
+        except DB_ERRORS as e:
+            print(f"Error reading from database: {e}")
+            metrics.error('db.read_from_db', e)
+            return RecordSet()
+
+    @staticmethod
+    @metrics.timed('db.read_page')
+    def read_page(after=None, limit=PAGE_SIZE):
+        """Return up to `limit` records, newest first, older than record `after`"""
+        try:
+            backend = DatabaseManager.get_backend()
+            if backend:
+                key = None if after is None else (to_epoch(after[1]), after[0])
+                return RecordSet.from_rows(backend.page(key, limit))
+            return RecordSet()
+        except DB_ERRORS as e:
+            print(f"Error reading page: {e}")
+            metrics.error('db.read_page', e)
+            return RecordSet()
+
+    @staticmethod
+    @metrics.timed('db.read_newer')
+    def read_newer(sr_no):
+        """Return records added after `sr_no`, newest first"""
+        try:
+            backend = DatabaseManager.get_backend()
+            if backend:
+                return RecordSet.from_rows(backend.newer(sr_no))
+            return RecordSet()
+        except DB_ERRORS as e:
+            print(f"Error reading new records: {e}")
+            metrics.error('db.read_newer', e)
+            return RecordSet()
+
+    @staticmethod
+    def iter_batches(start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+        """Yield (sr_no, ts, hours) rows in [start, end) in batches, oldest first"""
+        backend = DatabaseManager.get_backend()
+        if backend:
+            yield from backend.iter_batches(start, end, batch_size)
+
+    @staticmethod
+    @metrics.timed('db.export')
+    def export(path, fmt=None, start=None, end=None):
+        """Stream records in [start, end) to a CSV, JSONL or WHR file.
+
+        Returns rows written, or None if the database or the file failed.
+        """
+        try:
+            return write_records(DatabaseManager.iter_batches(start, end), path, fmt)
+        except DB_ERRORS + (OSError, ValueError) as e:
+            print(f"Error exporting records: {e}")
+            metrics.error('db.export', e)
+            return None
+
+    @staticmethod
+    @metrics.timed('db.get_summary')
+    def get_summary():
+        try:
+            now = datetime.now()
+            cached = DatabaseManager.cache.get_summary(now)
+            if cached is not None:
+                return cached
+            generation = DatabaseManager.cache.generation
+            backend = DatabaseManager.get_backend()
+            if backend:
+                summary = backend.summary(now)
+                DatabaseManager.cache.set_summary(now, summary, generation)
+                return summary
+            return 0, 0, 0
+        except DB_ERRORS as e:
+            print(f"Error getting summary: {e}")
+            metrics.error('db.get_summary', e)
+            return 0, 0, 0
+
+    @staticmethod
+    @metrics.timed('db.get_report')
+    def get_report(period='week', overtime=OVERTIME_HOURS, window=ROLLING_DAYS):
+        """Report over all records, see reports.build_report"""
+        try:
+            today = datetime.now().date()
+            key = (period, overtime, window, today)
+            cached = DatabaseManager.cache.get_report(key)
+            if cached is not None:
+                return cached
+            generation = DatabaseManager.cache.generation
+            backend = DatabaseManager.get_backend()
+            if backend:
+                report = build_report(backend.breakdown('day'), period, overtime, window, today)
+                DatabaseManager.cache.set_report(key, report, generation)
+                return report
+            return Report(period, overtime, window)
+        except DB_ERRORS as e:
+            print(f"Error building report: {e}")
+            metrics.error('db.get_report', e)
+            return Report(period, overtime, window)
+
+    @staticmethod
+    @metrics.timed('db.rebuild_rollups')
+    def rebuild_rollups():
+        """Recompute daily_totals and monthly_totals from working_hourse"""
+        try:
+            backend = DatabaseManager.get_backend()
+            if backend:
+                backend.rebuild_rollups()
+                DatabaseManager.cache.clear()
+                return True
+            return False
+        except DB_ERRORS as e:
+            print(f"Error rebuilding rollups: {e}")
+            metrics.error('db.rebuild_rollups', e)
+            return False
+
+    @staticmethod
+    @metrics.timed('db.verify_rollups')
+    def verify_rollups():
+        """Return (table, key, expected, stored) for every rollup row that is off"""
+        try:
+            backend = DatabaseManager.get_backend()
+            if not backend:
+                return []
+            return backend.verify_rollups()
+        except DB_ERRORS as e:
+            print(f"Error verifying rollups: {e}")
+            metrics.error('db.verify_rollups', e)
+            return []
+
+
+metrics.register('cache', DatabaseManager.cache.stats)
+metrics.register('queue', lambda: DatabaseManager._write_queue.stats() if DatabaseManager._write_queue else {})
+
+
+if __name__ == '__main__':
+    # Maintenance commands: python database.py [--db PATH] {migrate,rebuild,verify}
+    # or python database.py migrate --mysql for the server in db.ini / WORK_DB_*
+    import argparse
+    parser = argparse.ArgumentParser(description="Work tracker database maintenance.")
+    parser.add_argument('command', choices=['migrate', 'rebuild', 'verify', 'import', 'export'], nargs='?', default='migrate')
+    parser.add_argument('file', nargs='?', help="CSV, JSON, JSONL or WHR file to import or export")
+    parser.add_argument('--db', help="database file (default: work_tracker.db next to this script)")
+    parser.add_argument('--mysql', action='store_true',
+                        help="migrate the MySQL server configured in db.ini / WORK_DB_* instead of the app's file")
+    parser.add_argument('--dedup', action='store_true', help="skip records for days that already have one")
+    parser.add_argument('--chunk-size', type=positive_int, default=BULK_CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument('--format', choices=['csv', 'json', 'jsonl', 'whr'],
+                        help="file format, json for import only (default: from the file extension)")
+    parser.add_argument('--from', dest='start', type=datetime.fromisoformat, help="export records from this day, YYYY-MM-DD")
+    parser.add_argument('--to', dest='end', type=datetime.fromisoformat, help="export records up to this day, YYYY-MM-DD (inclusive)")
+    args = parser.parse_args()
+    if args.command in ('import', 'export') and not args.file:
+        parser.error(f"{args.command} needs a file")
+    if args.command == 'export' and args.format == 'json':
+        parser.error("json can only be imported, export to jsonl instead")
+    if args.mysql:
+        if args.command != 'migrate':
+            parser.error("--mysql only applies to migrate")
+        config = dict(load_config(), backend='mysql')
+        try:
+            server = open_backend(config)
+            print(f"{config['host']}/{config['database']}: schema version {server.migrate()}")
+            server.close()
+        except (RuntimeError,) + DB_ERRORS as e:
+            print(f"Error migrating MySQL: {e}")
+            raise SystemExit(1)
+        raise SystemExit(0)
+    if args.db:
+        DatabaseManager.DB_PATH = args.db
+
+    version = DatabaseManager.create_table_if_not_exists()
+    if version is None:
+        raise SystemExit(1)
+    print(f"{DatabaseManager.get_db_path()}: schema version {version}")
+
+    if args.command == 'import':
+        import time
+        start = time.perf_counter()
+        try:
+            count = DatabaseManager.write_many(read_records(args.file, args.format), args.chunk_size, args.dedup)
+        except (OSError, ValueError) as e:
+            # An unreadable file or unsupported format; earlier chunks stay saved
+            print(f"Error reading {args.file}: {e}")
+            DatabaseManager.close()
+            raise SystemExit(1)
+        if count is None:
+            DatabaseManager.close()
+            raise SystemExit(1)
+        elapsed = time.perf_counter() - start
+        print(f"Imported {count} records in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rows/s)")
+    elif args.command == 'export':
+        end = args.end + timedelta(days=1) if args.end else None
+        count = DatabaseManager.export(args.file, args.format, args.start, end)
+        if count is None:
+            DatabaseManager.close()
+            raise SystemExit(1)
+        print(f"Exported {count} records")
+    elif args.command == 'rebuild':
+        rebuilt = DatabaseManager.rebuild_rollups()
+        print("Rollups rebuilt" if rebuilt else "Rebuild failed")
+        DatabaseManager.close()
+        raise SystemExit(0 if rebuilt else 1)
+    elif args.command == 'verify':
+        mismatches = DatabaseManager.verify_rollups()
+        for table, key, expected, stored in mismatches:
+            print(f"{table} {key}: expected {expected}, stored {stored}")
+        print(f"{len(mismatches)} mismatched rollup rows")
+        DatabaseManager.close()
+        raise SystemExit(1 if mismatches else 0)
+    DatabaseManager.close()
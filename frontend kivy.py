@@ -1,21 +1,29 @@
+import time
+# Taken before Kivy loads, for the startup report
+IMPORT_STARTED = time.perf_counter()
+
 from datetime import datetime
 from kivy.lang import Builder
 from kivy.metrics import dp
-from kivy.uix.screenmanager import Screen, ScreenManager, FadeTransition, CardTransition
-from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.screenmanager import Screen, ScreenManager, CardTransition
 from kivymd.app import MDApp
-from kivymd.uix.button import MDFillRoundFlatIconButton, MDIconButton
-from kivymd.uix.datatables import MDDataTable
-from kivymd.uix.snackbar import MDSnackbar
+from kivymd.uix.button import MDIconButton
 from kivy.core.window import Window
 from kivy.animation import Animation
 from kivy.clock import Clock
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.textfield import MDTextField
-from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
-from kivymd.uix.toolbar import MDTopAppBar
-import sqlite3
+from kivy.properties import StringProperty
+from kivy.event import EventDispatcher
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from database import DatabaseManager, RecordSet, PAGE_SIZE
+from reports import summary_lines
+from instrumentation import METRICS_ENV, Profiler, finish_session, format_snapshot, metrics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asynckivy as ak
 import os
 import platform
 
@@ -23,121 +31,325 @@ import platform
 if platform != 'android':
     Window.size = (360, 640)
 
-# Database Configuration
-DB_NAME = 'work_tracker.db'
+# Taps on the home clock, within this many seconds, that open the debug screen
+DEBUG_TAPS = 5
+DEBUG_TAP_WINDOW = 2
+# F12 opens it on desktop
+DEBUG_KEY = 293
 
-class DatabaseManager:
-    @staticmethod
-    def get_db_path():
-        # Get the directory where the script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        return os.path.join(script_dir, DB_NAME)
+class RefreshScheduler:
+    """Runs screen refreshes at most once per frame.
 
-    @staticmethod
-    def connect():
-        try:
-            connection = sqlite3.connect(DatabaseManager.get_db_path())
-            return connection
-        except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
-            return None
-
-    @staticmethod
-    def create_table_if_not_exists():
-        try:
-            connection = DatabaseManager.connect()
-            if connection:
-                cursor = connection.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS working_hourse (
-                        sr_no INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date_time TIMESTAMP,
-                        hourse INTEGER
-                    )
-                """)
-                connection.commit()
-                cursor.close()
-                connection.close()
-        except sqlite3.Error as e:
-            print(f"Error creating table: {e}")
-
-    @staticmethod
-    def write_to_db(date_time, hours):
-        try:
-            connection = DatabaseManager.connect()
-            if connection:
-                cursor = connection.cursor()
-                # Convert datetime to string in SQLite format
-                date_str = date_time.strftime('%Y-%m-%d %H:%M:%S')
-                cursor.execute(
-                    "INSERT INTO working_hourse (date_time, hourse) VALUES (?, ?)",
-                    (date_str, hours)
-                )
-                connection.commit()
-                cursor.close()
-                connection.close()
-                return True
-            return False
-        except sqlite3.Error as e:
-            print(f"Error writing to database: {e}")
+    Repeated requests for the same callback before the next frame collapse
+    into one call, refreshes for screens that are not showing are dropped
+    (their on_enter refreshes them anyway), and resize bursts are debounced
+    into a single refresh once the window settles.
+    """
+
+    def __init__(self, resize_delay=0.25):
+        self.pending = {}  # callback -> screen
+        self.resize_handlers = []
+        self.requested = 0
+        self.executed = 0
+        self._flush_event = Clock.create_trigger(self._flush)
+        self._resize_event = Clock.create_trigger(self._on_resize_settled, resize_delay)
+        Window.bind(on_resize=self._on_resize)
+
+    def request(self, screen, callback):
+        """Ask for `callback` to run on the next frame if `screen` is current"""
+        self.requested += 1
+        self._queue(screen, callback)
+
+    def _queue(self, screen, callback):
+        self.pending[callback] = screen
+        self._flush_event()
+
+    def bind_resize(self, screen, callback):
+        """Refresh `screen` with `callback` after the window stops resizing"""
+        self.resize_handlers.append((screen, callback))
+
+    def _on_resize(self, instance, width, height):
+        # One request per handler, so requested against executed counts
+        # the refreshes the debounce saves
+        self.requested += len(self.resize_handlers)
+        # Restart the timer so only the last event of a burst counts
+        self._resize_event.cancel()
+        self._resize_event()
+
+    @metrics.timed('clock.resize_settled')
+    def _on_resize_settled(self, dt):
+        for screen, callback in self.resize_handlers:
+            self._queue(screen, callback)
+
+    @metrics.timed('clock.refresh_flush')
+    def _flush(self, dt):
+        pending, self.pending = self.pending, {}
+        for callback, screen in pending.items():
+            if screen.manager is not None and screen.manager.current != screen.name:
+                continue
+            self.executed += 1
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error refreshing {screen.name}: {e}")
+                metrics.error(f'refresh.{screen.name}', e)
+
+    def stats(self):
+        return {
+            'requested': self.requested,
+            'executed': self.executed,
+            'saved': self.requested - self.executed,
+        }
+
+refresh_scheduler = RefreshScheduler()
+metrics.register('refresh', refresh_scheduler.stats)
+
+class ClockService(EventDispatcher):
+    """Wall-clock ticks for whatever is showing the time.
+
+    Runs only between start() and stop() and never while the app is
+    paused. Each tick is scheduled to land just after the next second
+    boundary instead of drifting with a fixed interval. The first tick on
+    a new date dispatches on_day_change, and on_month_change when the
+    month changed too, including a rollover that happened while stopped.
+    """
+
+    __events__ = ('on_tick', 'on_day_change', 'on_month_change')
+
+    # Lands ticks this far past the boundary so timer jitter can't fire early
+    TICK_SLACK = 0.005
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = False
+        self.paused = False
+        self._event = None
+        self._day = None  # date of the last tick
+
+    def start(self):
+        """Tick on the next frame and every second after that, until stop()"""
+        self.active = True
+        self._schedule(0)
+
+    def stop(self):
+        self.active = False
+        self._cancel()
+
+    def pause(self):
+        """App went to the background"""
+        self.paused = True
+        self._cancel()
+
+    def resume(self):
+        self.paused = False
+        if self.active:
+            self._schedule(0)
+
+    def _cancel(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _schedule(self, delay):
+        self._cancel()
+        if self.active and not self.paused:
+            self._event = Clock.schedule_once(self._tick, delay)
+
+    @metrics.timed('clock.tick')
+    def _tick(self, dt):
+        self._event = None
+        now = datetime.now()
+        self._check_rollover(now.date())
+        self.dispatch('on_tick', now)
+        self._schedule(1 - now.microsecond / 1e6 + self.TICK_SLACK)
+
+    def _check_rollover(self, today):
+        previous, self._day = self._day, today
+        if previous is None or previous == today:
+            return
+        metrics.count('clock.day_changes')
+        self.dispatch('on_day_change', today)
+        if (previous.year, previous.month) != (today.year, today.month):
+            self.dispatch('on_month_change', today)
+
+    def on_tick(self, now):
+        pass
+
+    def on_day_change(self, today):
+        pass
+
+    def on_month_change(self, today):
+        pass
+
+clock_service = ClockService()
+
+class DataService:
+    """Runs DatabaseManager calls on a dedicated worker thread.
+
+    Calls are queued on a single-thread executor and their results come back
+    on the main thread through Clock, so they can be awaited from asynckivy
+    tasks without blocking rendering. Each call is timed on the worker
+    under 'worker.<name>' in the shared metrics.
+    """
+
+    # Frame budget used to express time moved off the UI thread as frames
+    FRAME_TIME = 1 / 60
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-worker')
+
+    async def call(self, func, *args):
+        """Await func(*args) run on the worker thread"""
+        return await ak.run_in_executor(self.executor, partial(self._timed, func, *args))
+
+    def _timed(self, func, *args):
+        with metrics.timer(f'worker.{func.__name__}'):
+            return func(*args)
+
+    def report(self):
+        """Per-call latency and the UI time it no longer blocks"""
+        lines = []
+        total = 0.0
+        for name, (calls, seconds, longest) in sorted(metrics.timers('worker.').items()):
+            total += seconds
+            name = name[len('worker.'):]
+            lines.append(f"{name}: {calls} calls, avg {seconds / calls * 1000:.2f}ms, max {longest * 1000:.2f}ms")
+        lines.append(f"Off the UI thread: {total * 1000:.1f}ms (~{total / self.FRAME_TIME:.1f} frames at 60fps)")
+        return lines
+
+    def shutdown(self):
+        """Finish queued calls and stop the worker"""
+        self.executor.shutdown(wait=True)
+
+data_service = DataService()
+
+class NotificationService:
+    """One snackbar for the whole app, reused for every message.
+
+    Messages queue up and show one at a time. A message identical to the
+    one showing, or to one already queued, bumps a repeat count instead of
+    adding another snackbar. Errors are rate limited: past ERROR_BURST
+    within ERROR_WINDOW seconds they are only counted, and the count is
+    shown in a single message once the queue drains.
+    """
+
+    STYLES = {
+        'success': ((0.2, 0.8, 0.2, 1), 1.5),  # background, seconds shown
+        'error': ((0.8, 0.2, 0.2, 1), 2),
+    }
+    ERROR_BURST = 3
+    ERROR_WINDOW = 10
+    # Further messages are dropped while this many are waiting
+    QUEUE_LIMIT = 5
+
+    def __init__(self):
+        self.queue = deque()  # [kind, text, repeats] waiting to be shown
+        self.current = None  # [kind, text, repeats] on screen
+        self.suppressed = 0
+        self._error_times = deque()
+        self._snackbar = None
+        self._label = None
+        self._hide_event = None
+
+    def success(self, text):
+        self.notify('success', text)
+
+    def error(self, text):
+        self.notify('error', text)
+
+    def notify(self, kind, text):
+        if self.current is not None and self.current[:2] == [kind, text]:
+            self.current[2] += 1
+            metrics.count('notify.coalesced')
+            self._render()
+            # Keep it up for a full duration from the latest repeat
+            self._schedule_hide()
+            return
+        for entry in self.queue:
+            if entry[:2] == [kind, text]:
+                entry[2] += 1
+                metrics.count('notify.coalesced')
+                return
+        if kind == 'error' and not self._allow_error():
+            self.suppressed += 1
+            metrics.count('notify.suppressed')
+            return
+        if len(self.queue) >= self.QUEUE_LIMIT:
+            metrics.count('notify.dropped')
+            return
+        self.queue.append([kind, text, 1])
+        if self.current is None:
+            self._show_next()
+
+    def _allow_error(self):
+        now = time.monotonic()
+        while self._error_times and now - self._error_times[0] > self.ERROR_WINDOW:
+            self._error_times.popleft()
+        if len(self._error_times) >= self.ERROR_BURST:
             return False
+        self._error_times.append(now)
+        return True
 
-    @staticmethod
-    def read_from_db():
-        try:
-            connection = DatabaseManager.connect()
-            if connection:
-                cursor = connection.cursor()
-                cursor.execute("SELECT * FROM working_hourse ORDER BY date_time DESC")
-                records = cursor.fetchall()
-                cursor.close()
-                connection.close()
-                
-                # Convert string dates back to datetime objects
-                formatted_records = []
-                for record in records:
-                    try:
-                        date_obj = datetime.strptime(record[1], '%Y-%m-%d %H:%M:%S')
-                        formatted_records.append((record[0], date_obj, record[2]))
-                    except (ValueError, TypeError):
-                        # If date parsing fails, use the original record
-                        formatted_records.append(record)
-                
-                return formatted_records
-            return []
-        except sqlite3.Error as e:
-            print(f"Error reading from database: {e}")
-            return []
-
-    @staticmethod
-    def get_summary():
+    def _get_snackbar(self):
+        if self._snackbar is None:
+            from kivymd.uix.snackbar import MDSnackbar
+            self._label = MDLabel(theme_text_color="Custom", text_color="white")
+            self._snackbar = MDSnackbar(
+                self._label,
+                y=10,
+                pos_hint={"center_x": 0.5},
+                size_hint_x=0.9,
+                # Hidden by _hide instead, whose timer restarts on repeats
+                duration=float('inf'),
+            )
+            self._snackbar.bind(on_dismiss=self._on_dismiss)
+        return self._snackbar
+
+    def _show_next(self):
+        if not self.queue and self.suppressed:
+            self.queue.append(['error', f"{self.suppressed} more errors", 1])
+            self.suppressed = 0
+        if not self.queue:
+            self.current = None
+            return
+        self.current = self.queue.popleft()
+        snackbar = self._get_snackbar()
+        snackbar.md_bg_color = self.STYLES[self.current[0]][0]
+        self._render()
+        metrics.count('notify.shown')
         try:
-            connection = DatabaseManager.connect()
-            if connection:
-                cursor = connection.cursor()
-                # Get total hours
-                cursor.execute("SELECT SUM(hourse) FROM working_hourse")
-                total_hours = cursor.fetchone()[0] or 0
-                
-                # Get today's hours
-                cursor.execute(
-                    "SELECT SUM(hourse) FROM working_hourse WHERE date(date_time) = date('now', 'localtime')"
-                )
-                today_hours = cursor.fetchone()[0] or 0
-                
-                # Get this month's hours
-                cursor.execute(
-                    "SELECT SUM(hourse) FROM working_hourse WHERE strftime('%Y-%m', date_time) = strftime('%Y-%m', 'now', 'localtime')"
-                )
-                month_hours = cursor.fetchone()[0] or 0
-                
-                cursor.close()
-                connection.close()
-                return today_hours, month_hours, total_hours
-            return 0, 0, 0
-        except sqlite3.Error as e:
-            print(f"Error getting summary: {e}")
-            return 0, 0, 0
+            snackbar.open()
+        except Exception as e:
+            print(f"Error showing message: {e}")
+            self.current = None
+            return
+        self._schedule_hide()
+
+    def _schedule_hide(self):
+        if self._hide_event is not None:
+            self._hide_event.cancel()
+        self._hide_event = Clock.schedule_once(self._hide, self.STYLES[self.current[0]][1])
+
+    def _hide(self, dt):
+        self._hide_event = None
+        self._snackbar.dismiss()
+
+    def _render(self):
+        kind, text, repeats = self.current
+        self._label.text = f"{text} (x{repeats})" if repeats > 1 else text
+
+    def _on_dismiss(self, snackbar):
+        self._show_next()
+
+    def stats(self):
+        return {
+            'showing': self.current is not None,
+            'queued': len(self.queue),
+            'suppressed': self.suppressed,
+        }
+
+notifications = NotificationService()
+metrics.register('notify', notifications.stats)
 
 class NumericSpinner(MDBoxLayout):
     def __init__(self, **kwargs):
@@ -195,91 +407,107 @@ class NumericSpinner(MDBoxLayout):
         current = self.get_value()
         self.set_value(current - 1)
 
+class RecordRow(RecycleDataViewBehavior, MDBoxLayout):
+    """One visible row of the records list, filled in from the RecordSet"""
+    sr_no = StringProperty()
+    date = StringProperty()
+    hours = StringProperty()
+
+    def refresh_view_attrs(self, rv, index, data):
+        # Rows are formatted only when they scroll into view
+        records = rv.records
+        self.sr_no = str(records.ids[index])
+        self.date = records.format_dates(index, index + 1)[0]
+        self.hours = str(records.hours[index])
+        return super().refresh_view_attrs(rv, index, data)
+
 class RecordScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        Window.bind(on_resize=self.on_window_resize)
-        Clock.schedule_once(self.update_table, 0.5)  # Initial table load
-        
+        self.records = RecordSet()  # Loaded records, newest first
+        self.max_sr_no = 0  # Highest record id seen so far
+        self.all_loaded = False
+        self.loading = False
+
     def on_enter(self):
         """Called when screen is entered"""
-        self.update_table()
-        
-    def on_window_resize(self, instance, width, height):
-        """Handle window resize events"""
-        try:
-            self.update_table()
-        except Exception as e:
-            print(f"Error handling resize: {e}")
+        refresh_scheduler.request(self, self.update_table)
 
     def update_table(self, *args):
+        ak.start(self._update_table())
+
+    async def _update_table(self):
+        """Load the first page, or prepend records saved since the last visit"""
+        if self.loading:
+            return
+        self.loading = True
         try:
-            self.ids.records_table.clear_widgets()
-            
-            records = DatabaseManager.read_from_db()
-            if not records:
-                records = []
-                
-            formatted_data = []
-            for row in records:
-                try:
-                    date_str = row[1].strftime('%d/%m %H:%M') if isinstance(row[1], datetime) else str(row[1])
-                    formatted_data.append((str(row[0]), date_str, str(row[2])))
-                except (AttributeError, TypeError) as e:
-                    print(f"Error formatting row {row}: {e}")
-                    continue
-            
-            # Get screen dimensions
-            screen_width = Window.width
-            table_width = screen_width * 0.95  # Use 95% of screen width
-            
-            # Calculate column widths
-            col1_width = dp(40)  # ID column
-            col3_width = dp(40)  # Hours column
-            col2_width = table_width - col1_width - col3_width - dp(20)  # Date column with padding
-            
-            data_table = MDDataTable(
-                size_hint=(None, None),
-                width=table_width,
-                height=dp(350),  # Reduced height for mobile
-                pos_hint={'center_x': 0.5, 'center_y': 0.5},
-                use_pagination=True,
-                pagination_menu_pos="auto",
-                rows_num=6,  # Reduced for better mobile view
-                column_data=[
-                    ("ID", col1_width),
-                    ("Date", col2_width),
-                    ("Hrs", col3_width)
-                ],
-                row_data=formatted_data,
-                column_data_height=dp(40),  # Increased touch target
-                row_data_height=dp(35),     # Increased touch target
-            )
-            
-            self.ids.records_table.add_widget(data_table)
-            
+            if not self.records:
+                # An empty first page marked everything loaded; records may
+                # have been saved since, so start again from the top
+                self.all_loaded = False
+                await self._load_more()
+                return
+
+            newer = await data_service.call(DatabaseManager.read_newer, self.max_sr_no)
+            if not newer:
+                return
+            self.max_sr_no = max(self.max_sr_no, max(newer.ids))
+            if newer.stamps[-1] < self.records.stamps[0]:
+                # Back-dated records belong further down, start over
+                metrics.count('ui.table_reloads')
+                self.records = RecordSet()
+                self.all_loaded = False
+                self.ids.records_view.data = []
+                await self._load_more()
+                return
+            self.records.prepend(newer)
+            self.show_records()
         except Exception as e:
             print(f"Error updating table: {e}")
+            metrics.error('ui.update_table', e)
             self.show_error_message("Error loading records")
+        finally:
+            self.loading = False
 
-    def show_error_message(self, message):
-        """Show error message using red Snackbar"""
+    async def _load_more(self):
+        """Append the next page of older records"""
+        if self.all_loaded:
+            return
+        page = await data_service.call(
+            DatabaseManager.read_page, self.records[-1] if self.records else None
+        )
+        if len(page) < PAGE_SIZE:
+            self.all_loaded = True
+        if page:
+            self.max_sr_no = max(self.max_sr_no, max(page.ids))
+        self.records.extend(page)
+        self.show_records()
+
+    @metrics.timed('ui.show_records')
+    def show_records(self):
+        """Point the list at the loaded records; RecordRow formats on demand"""
+        view = self.ids.records_view
+        view.records = self.records
+        view.data = [{} for _ in range(len(self.records))]
+
+    def on_records_scroll(self, view):
+        """Fetch the next page once the list is scrolled near the bottom"""
+        if view.scroll_y <= 0.1 and not self.all_loaded and not self.loading:
+            ak.start(self._scroll_load())
+
+    async def _scroll_load(self):
+        self.loading = True
         try:
-            snackbar = MDSnackbar(
-                MDLabel(
-                    text=message,
-                    theme_text_color="Custom",
-                    text_color="white",
-                ),
-                y=10,
-                pos_hint={"center_x": 0.5},
-                size_hint_x=0.9,
-                md_bg_color=(0.8, 0.2, 0.2, 1),
-                duration=2
-            )
-            snackbar.open()
+            await self._load_more()
         except Exception as e:
-            print(f"Error showing error message: {e}")
+            print(f"Error loading records: {e}")
+            metrics.error('ui.load_more', e)
+        finally:
+            self.loading = False
+
+    def show_error_message(self, message):
+        notifications.error(message)
 
     def go_to_home(self):
         try:
@@ -288,27 +516,101 @@ class RecordScreen(Screen):
         except Exception as e:
             print(f"Error navigating to home: {e}")
 
+class ReportScreen(Screen):
+    """Totals per week, month or year, with averages, streaks and overtime"""
+    period = StringProperty('week')
+
+    def on_enter(self):
+        refresh_scheduler.request(self, self.update_report)
+
+    def set_period(self, period):
+        if period != self.period:
+            self.period = period
+            refresh_scheduler.request(self, self.update_report)
+
+    def update_report(self):
+        ak.start(self._update_report())
+
+    async def _update_report(self):
+        try:
+            report = await data_service.call(DatabaseManager.get_report, self.period)
+            self.ids.report_summary.text = "\n".join(summary_lines(report))
+            # Newest period first, like the records list
+            self.ids.report_view.data = [
+                {'label': label, 'days': str(days), 'hours': str(hours), 'overtime': str(extra)}
+                for label, days, records, hours, extra in reversed(report.buckets)
+            ]
+        except Exception as e:
+            print(f"Error updating report: {e}")
+            metrics.error('ui.update_report', e)
+            notifications.error("Error loading report")
+
+    def go_to_home(self):
+        self.manager.transition = CardTransition(direction="right", duration=0.3)
+        self.manager.current = 'home'
+
+class DebugScreen(Screen):
+    """Hidden diagnostics: the live metrics snapshot, refreshable and savable"""
+
+    def on_enter(self):
+        self.refresh()
+
+    def refresh(self):
+        self.ids.metrics_label.text = format_snapshot(metrics.snapshot())
+
+    def save_snapshot(self):
+        """Write the snapshot to WORK_TRACKER_METRICS, or metrics.json next to the database"""
+        try:
+            path = os.environ.get(METRICS_ENV) or os.path.join(
+                os.path.dirname(DatabaseManager.get_db_path()), 'metrics.json'
+            )
+            metrics.dump(path)
+            self.ids.metrics_label.text = f"Saved to {path}\n\n" + format_snapshot(metrics.snapshot())
+        except OSError as e:
+            print(f"Error saving metrics: {e}")
+
+    def go_to_home(self):
+        self.manager.transition = CardTransition(direction="right", duration=0.3)
+        self.manager.current = 'home'
+
 class HomeScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        Clock.schedule_interval(self.update_datetime, 1)  # Update time every second
-        Window.bind(on_resize=self.on_window_resize)
+        refresh_scheduler.bind_resize(self, self.update_summary)
+        # Today's and this month's hours change at midnight
+        clock_service.bind(on_day_change=self.on_day_change)
+        self._clock_taps = []
+        self._clock_day = None
+        self._clock_date_text = ''
 
-    def on_window_resize(self, instance, width, height):
-        """Handle window resize events"""
-        try:
-            self.update_summary()  # Refresh the layout
-        except Exception as e:
-            print(f"Error handling resize: {e}")
+    def on_datetime_touch(self, label, touch):
+        """Five quick taps on the clock open the hidden diagnostics screen"""
+        if not label.collide_point(*touch.pos):
+            return
+        now = time.monotonic()
+        self._clock_taps = [tap for tap in self._clock_taps if now - tap < DEBUG_TAP_WINDOW] + [now]
+        if len(self._clock_taps) >= DEBUG_TAPS:
+            self._clock_taps = []
+            MDApp.get_running_app().open_screen('debug')
 
-    def update_datetime(self, dt):
-        """Update the datetime label"""
+    @metrics.timed('clock.update_datetime')
+    def update_datetime(self, service, now):
+        """Show `now` on the datetime label, formatting the date part once per day"""
         try:
-            if hasattr(self.ids, 'datetime_label'):
-                self.ids.datetime_label.text = self.get_current_datetime()
+            day = now.date()
+            if day != self._clock_day:
+                self._clock_day = day
+                self._clock_date_text = now.strftime('%Y-%m-%d ')
+            text = f"{self._clock_date_text}{now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+            label = self.ids.datetime_label
+            if label.text != text:
+                label.text = text
         except Exception as e:
             print(f"Error updating datetime: {e}")
 
+    def on_day_change(self, service, today):
+        refresh_scheduler.request(self, self.update_summary)
+
     def animate_button(self, instance):
         try:
             anim = Animation(scale_x=0.9, scale_y=0.9, duration=0.1) + Animation(scale_x=1, scale_y=1, duration=0.1)
@@ -328,6 +630,9 @@ class HomeScreen(Screen):
             self.show_error_message("An error occurred")
 
     def save_record(self):
+        ak.start(self._save_record())
+
+    async def _save_record(self):
         try:
             hours = self.ids.hours_input.get_value()
             if not isinstance(hours, (int, float)) or hours <= 0:
@@ -339,92 +644,58 @@ class HomeScreen(Screen):
                 return
                 
             current_time = datetime.now()
-            if DatabaseManager.write_to_db(current_time, hours):
-                self.update_summary()
+            # Logged to the write queue; the summary refreshes once it commits
+            if await data_service.call(DatabaseManager.queue_write, current_time, hours):
                 self.ids.hours_input.set_value(0)
                 self.show_success_message("Record Added Successfully!")
             else:
                 self.show_error_message("Failed to add record")
         except Exception as e:
             print(f"Error saving record: {e}")
+            metrics.error('ui.save_record', e)
             self.show_error_message("Error saving record")
 
     def show_success_message(self, message):
-        """Show success message using green Snackbar"""
-        try:
-            snackbar = MDSnackbar(
-                MDLabel(
-                    text=message,
-                    theme_text_color="Custom",
-                    text_color="white",
-                ),
-                y=10,
-                pos_hint={"center_x": 0.5},
-                size_hint_x=0.9,
-                md_bg_color=(0.2, 0.8, 0.2, 1),
-                duration=1.5
-            )
-            snackbar.open()
-        except Exception as e:
-            print(f"Error showing success message: {e}")
+        notifications.success(message)
 
     def show_error_message(self, message):
-        """Show error message using red Snackbar"""
-        try:
-            snackbar = MDSnackbar(
-                MDLabel(
-                    text=message,
-                    theme_text_color="Custom",
-                    text_color="white",
-                ),
-                y=10,
-                pos_hint={"center_x": 0.5},
-                size_hint_x=0.9,
-                md_bg_color=(0.8, 0.2, 0.2, 1),
-                duration=2
-            )
-            snackbar.open()
-        except Exception as e:
-            print(f"Error showing error message: {e}")
+        notifications.error(message)
 
     def on_enter(self):
         self.ids.datetime_label.text = self.get_current_datetime()
-        self.update_summary()
+        clock_service.bind(on_tick=self.update_datetime)
+        clock_service.start()
+        refresh_scheduler.request(self, self.update_summary)
+
+    def on_leave(self):
+        # Nothing else shows the time, so the clock can rest
+        clock_service.unbind(on_tick=self.update_datetime)
+        clock_service.stop()
         
     def get_current_datetime(self):
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     def update_summary(self):
-        total_records, total_hours, month_hours = DatabaseManager.get_summary()
-        self.ids.total_records.text = f"Total Records: {total_records}"
-        self.ids.total_hours.text = f"Total Hours: {total_hours}"
-        self.ids.month_records.text = f"This Month: {month_hours}"
+        ak.start(self._update_summary())
+
+    async def _update_summary(self):
+        try:
+            today, month, total = await data_service.call(DatabaseManager.get_summary)
+            self.ids.today_hours.text = f"Today: {today}"
+            self.ids.month_records.text = f"This Month: {month}"
+            self.ids.total_hours.text = f"Total Hours: {total}"
+        except Exception as e:
+            print(f"Error updating summary: {e}")
+            metrics.error('ui.update_summary', e)
 
     def go_to_records(self):
-        self.manager.transition = CardTransition(direction="left", duration=0.3)
-        self.manager.current = 'records'
+        MDApp.get_running_app().open_screen('records')
 
-class WorkTrackerApp(MDApp):
-    def build(self):
-        if platform != 'android':
-            Window.size = (360, 640)
-        else:
-            # Android-specific settings
-            from android.permissions import request_permissions, Permission
-            request_permissions([
-                Permission.WRITE_EXTERNAL_STORAGE,
-                Permission.READ_EXTERNAL_STORAGE
-            ])
-            
-        # Theme settings
-        self.theme_cls.primary_palette = "Blue"
-        self.theme_cls.theme_style = "Light"
-        
-        # Create database on first run
-        DatabaseManager.create_table_if_not_exists()
-        
-        # Load KV string
-        KV = '''
+    def go_to_reports(self):
+        MDApp.get_running_app().open_screen('report')
+
+# KV rules for each screen, parsed the first time that screen is built
+HOME_KV = '''
 <HomeScreen>:
     BoxLayout:
         orientation: "vertical"
@@ -435,6 +706,7 @@ class WorkTrackerApp(MDApp):
             title: "Work Tracker"
             elevation: 0
             pos_hint: {"top": 1}
+            right_action_items: [["chart-bar", lambda x: root.go_to_reports()]]
 
         ScrollView:
             MDBoxLayout:
@@ -448,6 +720,7 @@ class WorkTrackerApp(MDApp):
                     halign: "center"
                     theme_text_color: "Primary"
                     font_style: "H6"
+                    on_touch_down: root.on_datetime_touch(self, args[1])
 
                 # Hours Input Section with NumericSpinner
                 MDCard:
@@ -502,10 +775,10 @@ class WorkTrackerApp(MDApp):
                         padding: dp(10)
 
                         MDLabel:
-                            text: "Total Records:"
+                            text: "Today:"
                             theme_text_color: "Secondary"
                         MDLabel:
-                            id: total_records
+                            id: today_hours
                             text: "0"
                             theme_text_color: "Primary"
 
@@ -535,6 +808,19 @@ class WorkTrackerApp(MDApp):
                     scale_y: 1
                     on_release: 
                         root.animate_button(self)
+'''
+
+RECORDS_KV = '''
+<RecordRow>:
+    MDLabel:
+        text: root.sr_no
+        size_hint_x: 0.2
+    MDLabel:
+        text: root.date
+        size_hint_x: 0.6
+    MDLabel:
+        text: root.hours
+        size_hint_x: 0.2
 
 <RecordScreen>:
     BoxLayout:
@@ -547,11 +833,39 @@ class WorkTrackerApp(MDApp):
             elevation: 0
             left_action_items: [["arrow-left", lambda x: root.go_to_home()]]
 
-        BoxLayout:
-            id: records_table
-            orientation: "vertical"
-            padding: dp(5)
-            
+        # Column header, widths match RecordRow
+        MDBoxLayout:
+            size_hint_y: None
+            height: dp(40)
+            padding: dp(5), 0
+
+            MDLabel:
+                text: "ID"
+                bold: True
+                size_hint_x: 0.2
+            MDLabel:
+                text: "Date"
+                bold: True
+                size_hint_x: 0.6
+            MDLabel:
+                text: "Hrs"
+                bold: True
+                size_hint_x: 0.2
+
+        # Only the visible rows get widgets; pages load as the list scrolls
+        RecycleView:
+            id: records_view
+            viewclass: "RecordRow"
+            on_scroll_y: root.on_records_scroll(self)
+
+            RecycleBoxLayout:
+                orientation: "vertical"
+                default_size: None, dp(35)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
+                padding: dp(5), 0
+
         MDLabel:
             text: "Made by: SJAM Creates"
             theme_text_color: "Secondary"
@@ -560,14 +874,188 @@ class WorkTrackerApp(MDApp):
             height: dp(30)
             font_style: "Caption"
 '''
-        Builder.load_string(KV)
+
+REPORT_KV = '''
+<ReportRow@MDBoxLayout>:
+    label: ""
+    days: ""
+    hours: ""
+    overtime: ""
+    MDLabel:
+        text: root.label
+        size_hint_x: 0.34
+    MDLabel:
+        text: root.days
+        size_hint_x: 0.22
+    MDLabel:
+        text: root.hours
+        size_hint_x: 0.22
+    MDLabel:
+        text: root.overtime
+        size_hint_x: 0.22
+
+<ReportScreen>:
+    BoxLayout:
+        orientation: "vertical"
+        spacing: dp(10)
+        padding: dp(10)
+
+        MDTopAppBar:
+            title: "Reports"
+            elevation: 0
+            left_action_items: [["arrow-left", lambda x: root.go_to_home()]]
+
+        MDBoxLayout:
+            size_hint_y: None
+            height: dp(40)
+            spacing: dp(5)
+
+            MDFlatButton:
+                text: "Week"
+                disabled: root.period == "week"
+                on_release: root.set_period("week")
+            MDFlatButton:
+                text: "Month"
+                disabled: root.period == "month"
+                on_release: root.set_period("month")
+            MDFlatButton:
+                text: "Year"
+                disabled: root.period == "year"
+                on_release: root.set_period("year")
+
+        MDLabel:
+            id: report_summary
+            theme_text_color: "Secondary"
+            font_style: "Caption"
+            size_hint_y: None
+            height: self.texture_size[1]
+
+        # Column header, widths match ReportRow
+        MDBoxLayout:
+            size_hint_y: None
+            height: dp(40)
+            padding: dp(5), 0
+
+            MDLabel:
+                text: "Period"
+                bold: True
+                size_hint_x: 0.34
+            MDLabel:
+                text: "Days"
+                bold: True
+                size_hint_x: 0.22
+            MDLabel:
+                text: "Hrs"
+                bold: True
+                size_hint_x: 0.22
+            MDLabel:
+                text: "Over"
+                bold: True
+                size_hint_x: 0.22
+
+        RecycleView:
+            id: report_view
+            viewclass: "ReportRow"
+
+            RecycleBoxLayout:
+                orientation: "vertical"
+                default_size: None, dp(35)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
+                padding: dp(5), 0
+'''
+
+DEBUG_KV = '''
+<DebugScreen>:
+    BoxLayout:
+        orientation: "vertical"
+        spacing: dp(10)
+        padding: dp(10)
+
+        MDTopAppBar:
+            title: "Diagnostics"
+            elevation: 0
+            left_action_items: [["arrow-left", lambda x: root.go_to_home()]]
+            right_action_items: [["refresh", lambda x: root.refresh()], ["content-save", lambda x: root.save_snapshot()]]
+
+        ScrollView:
+            Label:
+                id: metrics_label
+                font_name: "RobotoMono-Regular"
+                font_size: "11sp"
+                color: app.theme_cls.text_color
+                size_hint_y: None
+                text_size: self.width, None
+                height: self.texture_size[1]
+'''
+
+# name -> (screen class, KV rules)
+SCREENS = {
+    'home': (HomeScreen, HOME_KV),
+    'records': (RecordScreen, RECORDS_KV),
+    'report': (ReportScreen, REPORT_KV),
+    'debug': (DebugScreen, DEBUG_KV),
+}
+_loaded_rules = set()
+
+def load_rules(name):
+    """Parse a screen's KV rules, once per process"""
+    if name not in _loaded_rules:
+        Builder.load_string(SCREENS[name][1], filename=f"{name}.kv")
+        _loaded_rules.add(name)
+
+class WorkTrackerApp(MDApp):
+    def build(self):
+        build_started = time.perf_counter()
+        if platform != 'android':
+            Window.size = (360, 640)
+        else:
+            # Android-specific settings
+            from android.permissions import request_permissions, Permission
+            request_permissions([
+                Permission.WRITE_EXTERNAL_STORAGE,
+                Permission.READ_EXTERNAL_STORAGE
+            ])
+            
+        # cProfile / tracemalloc when WORK_TRACKER_PROFILE is set
+        self.profiler = Profiler()
+        self.profiler.start()
+
+        # Theme settings
+        self.theme_cls.primary_palette = "Blue"
+        self.theme_cls.theme_style = "Light"
         
-        # Create screen manager with smooth transition
-        sm = ScreenManager()
-        sm.add_widget(HomeScreen(name="home"))
-        sm.add_widget(RecordScreen(name="records"))
+        # Only the home screen is built now, the others on first visit
+        with metrics.timer('startup.kv'):
+            load_rules('home')
+        with metrics.timer('startup.screens'):
+            sm = ScreenManager()
+            sm.add_widget(HomeScreen(name="home"))
+        Window.bind(on_keyboard=self.on_keyboard)
+        self.build_finished = time.perf_counter()
+        metrics.record('startup.build', self.build_finished - build_started)
         return sm
 
+    def get_screen(self, name):
+        """Return screen `name`, parsing its rules and building it on first use"""
+        if not self.root.has_screen(name):
+            with metrics.timer(f'ui.build_screen.{name}'):
+                load_rules(name)
+                self.root.add_widget(SCREENS[name][0](name=name))
+        return self.root.get_screen(name)
+
+    def open_screen(self, name, direction="left"):
+        self.get_screen(name)
+        self.root.transition = CardTransition(direction=direction, duration=0.3)
+        self.root.current = name
+
+    def on_keyboard(self, window, key, *args):
+        if key == DEBUG_KEY:
+            self.open_screen('debug')
+            return True
+        return False
+
     def is_android(self):
         try:
             from android.permissions import request_permissions, Permission
@@ -575,30 +1063,84 @@ class WorkTrackerApp(MDApp):
         except ImportError:
             return False
             
+    def on_pause(self):
+        clock_service.pause()
+        return True
+
+    def on_resume(self):
+        clock_service.resume()
+
     def on_start(self):
         """Called when the application starts."""
+        DatabaseManager.commit_callbacks.append(self._on_records_committed)
+        ak.start(self._open_database())
+        Clock.schedule_once(self._report_startup, 0)
+
+    def _report_startup(self, dt):
+        """Runs on the first frame; records how long each startup phase took.
+
+        The phases are in the metrics snapshot (debug screen, WORK_TRACKER_METRICS);
+        they are printed as well only while WORK_TRACKER_PROFILE is set.
+        """
+        now = time.perf_counter()
+        metrics.record('startup.first_frame', now - self.build_finished)
+        metrics.record('startup.total', now - IMPORT_STARTED)
+        if not self.profiler.enabled:
+            return
+        phases = metrics.timers('startup.')
+        print("Startup: " + ", ".join(
+            f"{name[len('startup.'):]} {phases[name][1] * 1000:.0f}ms"
+            for name in ('startup.imports', 'startup.kv', 'startup.screens', 'startup.build',
+                         'startup.first_frame', 'startup.total')
+            if name in phases
+        ))
+
+    async def _open_database(self):
+        """The run's only schema check, on the worker thread"""
         try:
-            DatabaseManager.create_table_if_not_exists()
-            conn = DatabaseManager.connect()
-            if conn:
-                conn.close()
-            else:
-                snackbar = MDSnackbar(
-                    MDLabel(
-                        text="Database connection failed",
-                        theme_text_color="Custom",
-                        text_color="white",
-                    ),
-                    y=10,
-                    pos_hint={"center_x": 0.5},
-                    size_hint_x=0.9,
-                    md_bg_color=(0.8, 0.2, 0.2, 1),
-                    duration=2
-                )
-                snackbar.open()
+            with metrics.timer('startup.database'):
+                version = await data_service.call(DatabaseManager.create_table_if_not_exists)
+            if version is None:
+                notifications.error("Database connection failed")
+            # Saves left in the queue by the last run are committed from here
+            await data_service.call(DatabaseManager.get_write_queue)
         except Exception as e:
             print(f"Error during app start: {e}")
 
+    def _on_records_committed(self, records):
+        # On the write queue's thread; the refresh has to happen on the main one
+        Clock.schedule_once(self._refresh_after_commit)
+
+    def _refresh_after_commit(self, dt):
+        home = self.root.get_screen('home')
+        refresh_scheduler.request(home, home.update_summary)
+        if self.root.has_screen('records'):
+            records = self.root.get_screen('records')
+            refresh_scheduler.request(records, records.update_table)
+        if self.root.has_screen('report'):
+            report = self.root.get_screen('report')
+            refresh_scheduler.request(report, report.update_report)
+
+    def on_stop(self):
+        """Called when the application stops."""
+        try:
+            data_service.shutdown()
+            # Refresh counts and worker timings are in the metrics snapshot;
+            # the console summary is for profiling runs
+            if self.profiler.enabled:
+                stats = refresh_scheduler.stats()
+                print(f"Refreshes: {stats['requested']} requested, {stats['executed']} run, {stats['saved']} saved")
+                for line in data_service.report():
+                    print(line)
+            DatabaseManager.close()
+            path = finish_session(self.profiler)
+            if path:
+                print(f"Metrics written to {path}")
+        except Exception as e:
+            print(f"Error during app stop: {e}")
+
+metrics.record('startup.imports', time.perf_counter() - IMPORT_STARTED)
+
 if __name__ == '__main__':
     try:
         if platform == 'android':
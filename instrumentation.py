@@ -0,0 +1,217 @@
+"""Lightweight timers and counters for the hot paths.
+
+Everything goes into the process-wide `metrics` object:
+
+    with metrics.timer('db.read_page'): ...     time a block
+    @metrics.timed('clock.update_datetime')     time every call of a function
+    metrics.count('db.connections_opened')      bump a counter
+    metrics.error('db.write_to_db', e)          count an error, keep the last message
+    metrics.register('cache', cache.stats)      include a stats() dict in snapshots
+
+metrics.snapshot() returns plain dicts and metrics.dump(path) writes them as
+JSON. Two environment variables control the heavier tools:
+
+    WORK_TRACKER_METRICS=path.json   dump a snapshot there when the app stops
+    WORK_TRACKER_PROFILE=cpu,memory  run cProfile and/or tracemalloc for the
+                                     whole session; cProfile stats are saved
+                                     next to the snapshot as a .prof file
+"""
+from contextlib import contextmanager
+from functools import wraps
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+METRICS_ENV = 'WORK_TRACKER_METRICS'
+PROFILE_ENV = 'WORK_TRACKER_PROFILE'
+# Functions / allocation sites listed in a snapshot's profile section
+PROFILE_TOP = 15
+
+
+class Metrics:
+    """Thread-safe named timers, counters and error tallies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}
+        self.started = time.time()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._timers = {}  # name -> [calls, total seconds, max seconds]
+            self._counters = {}
+            self._errors = {}  # name -> [count, last message]
+            self.profile = None
+
+    def record(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                self._timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator recording each call of the function under `name`"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def error(self, name, error):
+        with self._lock:
+            entry = self._errors.setdefault(name, [0, ''])
+            entry[0] += 1
+            entry[1] = f"{type(error).__name__}: {error}"
+
+    def register(self, name, stats):
+        """Include `stats()` under `name` in every snapshot"""
+        self._sources[name] = stats
+
+    def timers(self, prefix=''):
+        """{name: (calls, total seconds, max seconds)} for names starting with prefix"""
+        with self._lock:
+            return {name: tuple(timer) for name, timer in self._timers.items() if name.startswith(prefix)}
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {
+                'uptime_s': round(time.time() - self.started, 3),
+                'timers': {
+                    name: {
+                        'calls': calls,
+                        'total_ms': round(total * 1000, 3),
+                        'avg_ms': round(total / calls * 1000, 3),
+                        'max_ms': round(longest * 1000, 3),
+                    }
+                    for name, (calls, total, longest) in sorted(self._timers.items())
+                },
+                'counters': dict(sorted(self._counters.items())),
+                'errors': {name: {'count': count, 'last': last} for name, (count, last) in sorted(self._errors.items())},
+            }
+            sources = list(self._sources.items())
+        for name, stats in sources:
+            try:
+                snapshot[name] = stats()
+            except Exception as e:
+                snapshot[name] = {'error': str(e)}
+        if self.profile is not None:
+            snapshot['profile'] = self.profile
+        return snapshot
+
+    def dump(self, path):
+        """Write a snapshot as JSON, returns the path"""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+metrics = Metrics()
+
+
+class Profiler:
+    """cProfile and/or tracemalloc for a whole session, chosen by WORK_TRACKER_PROFILE."""
+
+    def __init__(self, modes=None):
+        if modes is None:
+            modes = os.environ.get(PROFILE_ENV, '')
+        self.modes = {mode.strip().lower() for mode in modes.split(',') if mode.strip()}
+        self._profile = None
+
+    @property
+    def enabled(self):
+        return bool(self.modes)
+
+    def start(self):
+        if 'memory' in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if 'cpu' in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self, prof_path=None):
+        """Stop profiling and put a summary in metrics.profile.
+
+        The full cProfile stats are written to prof_path when given.
+        """
+        report = {}
+        if self._profile is not None:
+            self._profile.disable()
+            if prof_path:
+                self._profile.dump_stats(prof_path)
+                report['cpu_stats_file'] = prof_path
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            report['cpu_top'] = [line for line in out.getvalue().splitlines() if line.strip()]
+            self._profile = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+            tracemalloc.stop()
+            report['memory'] = {
+                'current_kb': current // 1024,
+                'peak_kb': peak // 1024,
+                'top': [f"{stat.traceback} {stat.size // 1024}KiB in {stat.count} blocks" for stat in top],
+            }
+        if report:
+            metrics.profile = report
+        return report
+
+
+def finish_session(profiler=None):
+    """Stop profiling and dump a snapshot if WORK_TRACKER_METRICS is set, returns the path"""
+    path = os.environ.get(METRICS_ENV)
+    if profiler is not None and profiler.enabled:
+        profiler.stop(os.path.splitext(path)[0] + '.prof' if path else None)
+    if path:
+        return metrics.dump(path)
+    return None
+
+
+def format_snapshot(snapshot):
+    """Plain-text rendering of a snapshot for the debug screen and the console"""
+    lines = [f"Uptime {snapshot['uptime_s']:.0f}s", "", "Timers (calls, avg ms, max ms)"]
+    for name, timer in snapshot['timers'].items():
+        lines.append(f"  {name:<30} {timer['calls']:>6} {timer['avg_ms']:>9.2f} {timer['max_ms']:>9.2f}")
+    lines += ["", "Counters"]
+    lines += [f"  {name:<30} {value:>6}" for name, value in snapshot['counters'].items()]
+    if snapshot['errors']:
+        lines += ["", "Errors"]
+        for name, error in snapshot['errors'].items():
+            lines.append(f"  {name} x{error['count']}: {error['last']}")
+    for section, values in snapshot.items():
+        if section in ('uptime_s', 'timers', 'counters', 'errors', 'profile'):
+            continue
+        lines += ["", section.capitalize()]
+        lines += [f"  {key:<30} {value}" for key, value in values.items()]
+    profile = snapshot.get('profile')
+    if profile and 'memory' in profile:
+        lines += ["", f"Memory: {profile['memory']['current_kb']}KiB now, {profile['memory']['peak_kb']}KiB peak"]
+    return "\n".join(lines)
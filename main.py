@@ -1,119 +1,461 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
 import datetime
-import mysql.connector
-import os
-
-def write_to_db(date, hours):
-    try:
-        # Establish a connection to the database
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="pass123",
-            database="abd-db"
-        )
-        
-        cursor = conn.cursor()
-        
-        # Insert data into the working_hourse table
-        insert_query = "INSERT INTO `working_hourse` (`date_time`, `hourse`) VALUES (%s, %s)"
-        cursor.execute(insert_query, (date, hours))
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-    except mysql.connector.Error as e:
+import sys
+import threading
+import time
+
+from records_io import check_hours, format_timestamps, positive_int, read_records, read_stream, write_records
+from reports import OVERTIME_HOURS, PERIODS, ROLLING_DAYS, Report, build_report, format_report
+from storage import BULK_CHUNK_SIZE, DB_ERRORS, load_config, open_backend
+
+# Rows fetched per round trip when streaming the table
+BATCH_SIZE = 500
+# Rows shown per screen before the pager waits for enter
+PAGE_SIZE = 20
+# ANSI cursor home + erase display, instead of spawning `clear` / `cls`
+CLEAR_SCREEN = '\033[H\033[2J'
+
+_database = None
+
+def get_database():
+    """Return the storage backend named in db.ini / WORK_DB_BACKEND, opened on first use"""
+    global _database
+    if _database is None:
+        _database = open_backend(load_config())
+    return _database
+
+def write_to_db(date, hours, user='', project=''):
+    """Insert one record, returns whether it was saved"""
+    try:
+        get_database().add(date, hours, user, project)
+        return True
+    except DB_ERRORS as e:
         print(f"An error occurred: {e}")
+        return False
 
-def read_from_db():
-    try:
-        # Establish a connection to the database
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="pass123",
-            database="abd-db"
-        )
-        
-        cursor = conn.cursor()
-        
-        # Select and fetch data from the working_hourse table
-        select_query = "SELECT * FROM `working_hourse`"
-        cursor.execute(select_query)
-        rows = cursor.fetchall()
-        
-        row_count = len(rows)
-        hours = sum(int(row[2]) for row in rows)  # Assuming `hourse` is the third column
-        
-        cursor.close()
-        conn.close()
-        
-        return row_count, hours
-    except mysql.connector.Error as e:
+def write_many(records, chunk_size=BULK_CHUNK_SIZE, dedup=False, user='', project=''):
+    """Insert (datetime, hours) pairs for one user and project, one transaction per chunk.
+
+    With dedup, records for a day that already has a record for the same
+    user and project (in the table or earlier in the same import) are
+    skipped. Returns rows inserted, or None if the database failed.
+    """
+    try:
+        return get_database().add_many(records, chunk_size, dedup, user, project)
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+        return None
+
+def close_database():
+    """Close the backend if it was opened; the next call to get_database reopens it"""
+    global _database
+    if _database is not None:
+        _database.close()
+        _database = None
+
+def read_from_db(user=None, project=None):
+    try:
+        row_count, hours = get_database().count_and_total(user, project)
+        return row_count, int(hours)
+    except DB_ERRORS as e:
         print(f"An error occurred: {e}")
         return 0, 0
 
-def print_table():
-    try:
-        # Establish a connection to the database
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="pass123",
-            database="abd-db"
-        )
-        
-        cursor = conn.cursor()
-        
-        # Select all data from the working_hourse table
-        select_query = "SELECT * FROM `working_hourse`"
-        cursor.execute(select_query)
-        rows = cursor.fetchall()
-        
+def get_summary(user=None, project=None):
+    """Return (today's hours, this month's hours, total hours)"""
+    try:
+        return get_database().summary(datetime.datetime.now(), user, project)
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+        return 0, 0, 0
+
+def get_breakdown(period='day', start=None, end=None, user=None, project=None):
+    """Return (period, count, hours) rows grouped by 'day', 'month' or 'year'.
+
+    start/end are optional day boundaries (end is exclusive).
+    """
+    try:
+        return get_database().breakdown(period, start, end, user, project)
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+        return []
+
+def get_totals_by(dimension, start=None, end=None):
+    """Return (user or project, count, hours) rows, one per user or project"""
+    try:
+        return get_database().totals_by(dimension, start, end)
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+        return []
+
+def get_report(period='week', start=None, end=None, user=None, project=None,
+               overtime=OVERTIME_HOURS, window=ROLLING_DAYS):
+    """Return a reports.Report over the days in [start, end)"""
+    try:
+        days = get_database().breakdown('day', start, end, user, project)
+        return build_report(days, period, overtime, window)
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+        return Report(period, overtime, window)
+
+def iter_rows(start=None, end=None, batch_size=BATCH_SIZE, user=None, project=None):
+    """Yield batches of (sr_no, epoch seconds, hours) rows without loading the whole table"""
+    return get_database().iter_batches(start, end, batch_size, user, project)
+
+def print_table(page_size=PAGE_SIZE, start=None, end=None, out=None, user=None, project=None):
+    """Stream the table to `out`, pausing every `page_size` rows on a terminal"""
+    out = out or sys.stdout
+    # Only page when someone is there to press enter
+    paging = page_size > 0 and sys.stdin.isatty() and out.isatty()
+    day_labels = {}
+    try:
         # Print the table header
-        print(f"{'days '} {'Date Time':<20} {'Hours':<10}")
-        print("-" * 30)
-        
-        # Print each row in the table
-        for row in rows:
-            # Print the entire row for debugging
-            #print(f"DEBUG: Row data: {row}")  # Debugging line
-            
-            # Assuming row[0] is sr-no, row[1] is date_time, and row[2] is hourse
-            day= row[0]
-            date_time = row[1]
-            hourse = int(row[2])  # Convert hourse to int to remove leading zeros
-            
-            # Print formatted output
-            print(f"{day:<6}{date_time.strftime('%Y-%m-%d %H:%M:%S'):<20} {hourse:<10}")  # Format date_time and hourse
-        
-        cursor.close()
-        conn.close()
-    except mysql.connector.Error as e:
+        out.write(f"{'days '} {'Date Time':<20} {'Hours':<10}\n")
+        out.write("-" * 30 + "\n")
+        out.flush()
+
+        # Print each batch with a single write
+        batch_size = page_size if paging else BATCH_SIZE
+        for rows in iter_rows(start, end, batch_size, user, project):
+            # row[0] is sr_no, row[1] epoch seconds and row[2] hourse
+            labels = format_timestamps([row[1] for row in rows], day_labels)
+            out.write("".join(
+                f"{row[0]:<6}{label:<20} {int(row[2]):<10}\n"
+                for row, label in zip(rows, labels)
+            ))
+            out.flush()
+            if paging and len(rows) == batch_size:
+                if input("-- More -- (enter to continue, q to quit) ").lower().startswith('q'):
+                    break
+    except DB_ERRORS as e:
+        print(f"An error occurred: {e}")
+
+def print_totals(dimension, start=None, end=None, out=None):
+    """Print records and hours per user or project"""
+    out = out or sys.stdout
+    out.write(f"{dimension.capitalize():<20} {'Records':<8} {'Hours':<10}\n")
+    out.write("-" * 38 + "\n")
+    out.write("".join(
+        f"{name or '-':<20} {count:<8} {int(hours):<10}\n"
+        for name, count, hours in get_totals_by(dimension, start, end)
+    ))
+    out.flush()
+
+def export(path, fmt=None, start=None, end=None, user=None, project=None):
+    """Stream records in [start, end) to a CSV, JSONL or WHR file.
+
+    Returns rows written, or None if the database failed.
+    """
+    try:
+        return write_records(iter_rows(start, end, user=user, project=project), path, fmt)
+    except DB_ERRORS as e:
         print(f"An error occurred: {e}")
+        return None
+
+def clear_screen(out=None):
+    out = out or sys.stdout
+    if out.isatty():
+        out.write(CLEAR_SCREEN)
+        out.flush()
+
+def _settle(future, value=None, error=None):
+    # The prompt may have been cancelled by Ctrl-C before the line arrived
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+
+def read_line(prompt):
+    """input(), reading piped input from the unbuffered file.
+
+    A thread blocked in sys.stdin.readline() holds the buffer's lock, and
+    the interpreter aborts if it has to exit meanwhile. On a terminal
+    input() reads through readline instead and holds no such lock.
+    """
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        return input(prompt)
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    line = sys.stdin.buffer.raw.readline()
+    if not line:
+        raise EOFError
+    return line.decode(sys.stdin.encoding, 'replace').rstrip('\r\n')
+
+async def ask(prompt):
+    """read_line() on a daemon thread, so queued database work carries on meanwhile.
+
+    Nothing waits for that thread: on Ctrl-C the process exits instead of
+    hanging until enter is pressed.
+    """
+    loop = asyncio.get_running_loop()
+    answer = loop.create_future()
+
+    def read():
+        try:
+            line = read_line(prompt)
+        except (EOFError, KeyboardInterrupt) as e:
+            loop.call_soon_threadsafe(_settle, answer, None, e)
+        else:
+            loop.call_soon_threadsafe(_settle, answer, line)
 
-while True:
-    os.system('cls' if os.name == 'nt' else 'clear')  # Clear the console
+    threading.Thread(target=read, name='prompt', daemon=True).start()
+    return await answer
 
-    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
+async def ask_hours():
     while True:
         try:
-            hours = int(input('Enter today\'s working hours and press enter: '))
-            if hours < 0:
-                print("Please enter a non-negative integer for hours.")
-                continue
-            break
+            hours = int(await ask('Enter today\'s working hours and press enter: '))
         except ValueError:
             print("Invalid input. Please enter an integer.")
+            continue
+        try:
+            return check_hours(hours)
+        except ValueError as e:
+            print(f"Please enter valid hours: {e}.")
+
+def acknowledge(saved, totals, hours, date):
+    """Report a confirmed save, with totals read before it plus the new entry"""
+    if not saved:
+        print(f"Could not save {hours} hours at {date}")
+        return
+    print(f"Saved {hours} hours at {date}")
+    total_records, total_hours = totals
+    print(f'Your total records are {total_records + 1} and total hours are {total_hours + hours}')
+
+async def interactive(args):
+    """Prompt for hours until the user is done, presses Ctrl-C or ends the input.
+
+    Database calls run in order on one worker thread and never hold up the
+    prompt: a save is queued and the next question asked at once. The save
+    is acknowledged, with the totals fetched while the user was typing plus
+    the new entry, at the start of the next round. Whatever way the session
+    ends, a save still in flight is waited for and acknowledged.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+
+    def submit(func, *func_args, **kwargs):
+        return executor.submit(func, *func_args, **kwargs)
+
+    async def result(future):
+        # Shielded: Ctrl-C while waiting must not cancel a queued save
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    summary = submit(read_from_db, args.user, args.project)
+    saving = None  # (save future, totals future, hours, date) not yet acknowledged
+    try:
+        while True:
+            clear_screen()
+            if saving is not None:
+                save, totals, hours, date = saving
+                acknowledge(await result(save), await result(totals), hours, date)
+                saving = None
+
+            current_time = datetime.datetime.now().replace(microsecond=0)
+            hours = await ask_hours()
+
+            saving = (submit(write_to_db, current_time, hours, args.user or '', args.project or ''),
+                      summary, hours, current_time)
+            # Queued behind the save, so the next round's totals include it
+            summary = submit(read_from_db, args.user, args.project)
+
+            if (await ask("Do you want to see the working hours table? (yes/no): ")).lower() == 'yes':
+                await result(submit(print_table, user=args.user, project=args.project))
 
-    write_to_db(current_time, hours)
-    print('Recorded', hours, 'at', current_time)
+            if (await ask("Do you want to continue? (yes/no): ")).lower() != 'yes':
+                break
+    except (EOFError, KeyboardInterrupt, asyncio.CancelledError):
+        # asyncio.run turns Ctrl-C into a cancellation of this task
+        print()
+    finally:
+        # Runs the queued save to the end; nothing else is left waiting on it
+        executor.shutdown(wait=True)
+    if saving is not None:
+        save, totals, hours, date = saving
+        acknowledge(save.result(), totals.result(), hours, date)
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def parse_datetime(value):
+    try:
+        return datetime.datetime.fromisoformat(value).replace(microsecond=0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{value}', expected YYYY-MM-DD[ HH:MM[:SS]]")
+
+def non_negative_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"invalid value '{value}', expected a whole number of at least 0")
+    return number
+
+def run_add(args):
+    try:
+        check_hours(args.hours)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    date = args.at or datetime.datetime.now().replace(microsecond=0)
+    if not write_to_db(date, args.hours, args.user or '', args.project or ''):
+        return 1
+    print('Recorded', args.hours, 'at', date)
+    return 0
+
+def run_add_many(args):
+    if args.file == '-':
+        records = read_stream(sys.stdin, args.format or 'csv')
+    else:
+        records = read_records(args.file, args.format)
+    start = time.perf_counter()
+    try:
+        count = write_many(records, args.chunk_size, args.dedup, args.user or '', args.project or '')
+    except (OSError, ValueError) as e:
+        # An unreadable file or unsupported format; earlier chunks stay saved
+        print(f"Error reading {args.file}: {e}")
+        return 1
+    if count is None:
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"Added {count} records in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rows/s)")
+    return 0
 
-    total_days, total_hours = read_from_db()
-    print(f'Your total days are {total_days} and total hours are {total_hours}')
+def run_summary(args):
+    total_records, total_hours = read_from_db(args.user, args.project)
+    today_hours, month_hours, _ = get_summary(args.user, args.project)
+    print(f"Total records: {total_records}")
+    print(f"Total hours: {total_hours}")
+    print(f"This month: {month_hours}")
+    print(f"Today: {today_hours}")
+    return 0
 
-    if input("Do you want to see the working hours table? (yes/no): ").lower() == 'yes':
-        print_table()
+def run_table(args):
+    print_table(args.page_size, args.start, args.end, user=args.user, project=args.project)
+    return 0
+
+def run_export(args):
+    try:
+        count = export(args.file, args.format, args.start, args.end, args.user, args.project)
+    except (OSError, ValueError) as e:
+        print(f"Error writing {args.file}: {e}")
+        return 1
+    if count is None:
+        return 1
+    print(f"Exported {count} records")
+    return 0
+
+def run_report(args):
+    report = get_report(args.period, args.start, args.end, args.user, args.project, args.overtime, args.window)
+    print(format_report(report))
+    return 0
+
+def run_totals(args):
+    print_totals(args.dimension, args.start, args.end)
+    return 0
+
+# subcommand -> function taking the parsed args, returning the exit status
+COMMANDS = {
+    'add': run_add,
+    'add-many': run_add_many,
+    'summary': run_summary,
+    'table': run_table,
+    'export': run_export,
+    'report': run_report,
+    'totals': run_totals,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Record and review working hours. Without a command, prompts for hours interactively."
+    )
+
+    def partition_options(parser, default):
+        # Accepted before or after the command; after it, default=SUPPRESS
+        # keeps the subparser from overwriting a value given before it
+        parser.add_argument('--user', default=default,
+                            help="user the records belong to: new records are saved under it, reads only show it")
+        parser.add_argument('--project', default=default,
+                            help="project the records belong to: new records are saved under it, reads only show it")
+
+    def range_options(parser):
+        parser.add_argument('--from', dest='start', type=parse_date,
+                            help="first day to include, YYYY-MM-DD")
+        parser.add_argument('--to', dest='end', type=parse_date,
+                            help="last day to include, YYYY-MM-DD (inclusive)")
+
+    partition_options(parser, None)
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    add = commands.add_parser('add', help="save one record")
+    add.add_argument('hours', type=int, help="hours worked")
+    add.add_argument('--at', type=parse_datetime, help="time of the record (default: now)")
+
+    add_many = commands.add_parser('add-many', help="save records from a file or standard input, in batches")
+    add_many.add_argument('file', nargs='?', default='-',
+                          help="CSV, JSON, JSONL or WHR file, or - for standard input (default)")
+    add_many.add_argument('--format', choices=['csv', 'json', 'jsonl', 'whr'],
+                          help="input format (default: from the extension, csv for standard input)")
+    add_many.add_argument('--dedup', action='store_true',
+                          help="skip records for days that already have one")
+    add_many.add_argument('--chunk-size', type=positive_int, default=BULK_CHUNK_SIZE,
+                          help=f"rows per transaction (default {BULK_CHUNK_SIZE})")
+
+    commands.add_parser('summary', help="print total records and hours, this month's and today's hours")
+
+    table = commands.add_parser('table', help="print the working hours table")
+    table.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                       help=f"rows per screen, 0 to print without pausing (default {PAGE_SIZE})")
+    range_options(table)
+
+    export_parser = commands.add_parser('export', help="write records to a CSV, JSONL or WHR file")
+    export_parser.add_argument('file', help="file to write")
+    export_parser.add_argument('--format', choices=['csv', 'jsonl', 'whr'],
+                               help="file format (default: from the extension)")
+    range_options(export_parser)
+
+    report = commands.add_parser('report', help="totals per period with averages, streaks and overtime")
+    report.add_argument('period', nargs='?', choices=PERIODS, default='week', help="period size (default week)")
+    report.add_argument('--overtime', type=non_negative_int, default=OVERTIME_HOURS,
+                        help=f"daily hours above which the rest is overtime (default {OVERTIME_HOURS})")
+    report.add_argument('--window', type=positive_int, default=ROLLING_DAYS,
+                        help=f"days in the rolling window (default {ROLLING_DAYS})")
+    range_options(report)
+
+    totals = commands.add_parser('totals', help="print records and hours per user or project")
+    totals.add_argument('dimension', choices=['user', 'project'])
+    range_options(totals)
+
+    for name, command in commands.choices.items():
+        if name != 'totals':
+            partition_options(command, argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+    if getattr(args, 'end', None) is not None:
+        # --to is inclusive, the queries take an exclusive bound
+        args.end += datetime.timedelta(days=1)
+    return args
+
+def main(argv=None):
+    """Run one command, or the interactive prompt, on a single connection"""
+    args = parse_args(argv)
+    try:
+        if args.command is None:
+            asyncio.run(interactive(args))
+            status = 0
+        else:
+            status = COMMANDS[args.command](args)
+    finally:
+        close_database()
+    if status:
+        raise SystemExit(status)
 
-    if input("Do you want to continue? (yes/no): ").lower() != 'yes':
-        break
\ No newline at end of file
+if __name__ == '__main__':
+    main()
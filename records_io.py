@@ -0,0 +1,210 @@
+"""Reading and writing working-hours records as files.
+
+Files hold one record per row/line with a timestamp and an hour count:
+
+    CSV    header row with date_time and hours columns (plus sr_no on export)
+    JSONL  one {"date_time": ..., "hours": ...} object per line
+    JSON   an array of such objects (import only)
+    WHR    compact columnar binary, see below
+
+Timestamps are ISO style, 'YYYY-MM-DD HH:MM:SS' or just 'YYYY-MM-DD'.
+The old column names `date` and `hourse` are accepted too.
+
+A WHR file is the magic bytes b'WHR1' followed by blocks, one per batch
+written. Each block is a little-endian uint32 row count n, then n int64
+ids, n int64 local epoch seconds and n int32 hours.
+"""
+from datetime import datetime, timedelta
+from itertools import islice
+from array import array
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+
+DATE_KEYS = ('date_time', 'date')
+HOURS_KEYS = ('hours', 'hourse')
+WHR_MAGIC = b'WHR1'
+# Hours a single record may hold, as the app's entry form allows
+MIN_HOURS = 1
+MAX_HOURS = 24
+EPOCH = datetime(1970, 1, 1)
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if extension == 'ndjson' else extension
+
+
+def chunked(iterable, size):
+    """Return an iterator over lists of up to `size` items, size at least 1"""
+    if size < 1:
+        raise ValueError(f"chunk size must be at least 1, got {size}")
+    return _chunks(iter(iterable), size)
+
+
+def _chunks(iterator, size):
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def positive_int(value):
+    """argparse type for counts such as --chunk-size: a whole number of at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid value '{value}', expected a whole number of at least 1")
+    return number
+
+
+def _pick(record, keys):
+    for key in keys:
+        if key in record:
+            return record[key]
+    raise KeyError(f"missing one of {', '.join(keys)}")
+
+
+def check_hours(hours):
+    """Return hours if it is a valid record value, else raise ValueError"""
+    if not MIN_HOURS <= hours <= MAX_HOURS:
+        raise ValueError(f"hours must be between {MIN_HOURS} and {MAX_HOURS}, got {hours}")
+    return hours
+
+
+def parse_record(record):
+    """Turn a dict from CSV/JSON into a (datetime, hours) pair"""
+    date_time = _pick(record, DATE_KEYS)
+    if not isinstance(date_time, datetime):
+        date_time = datetime.fromisoformat(str(date_time).strip())
+    return date_time.replace(microsecond=0), check_hours(int(_pick(record, HOURS_KEYS)))
+
+
+def read_records(path, fmt=None):
+    """Stream (datetime, hours) pairs from a CSV, JSON, JSON Lines or WHR file.
+
+    CSV, JSON Lines and WHR are read incrementally; a JSON array is loaded whole.
+    Rows that cannot be parsed or whose hours are out of range are reported
+    with their line (WHR: row) number and skipped.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == 'whr':
+        for number, (_, ts, hours) in enumerate(iter_whr(path), start=1):
+            try:
+                yield EPOCH + timedelta(seconds=ts), check_hours(hours)
+            except ValueError as e:
+                print(f"Skipping {os.path.basename(path)}:row {number}: {e}")
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from read_stream(f, fmt, os.path.basename(path))
+
+
+def read_stream(f, fmt, name='<stdin>'):
+    """Stream (datetime, hours) pairs from an open CSV, JSON or JSON Lines text stream.
+
+    Lines are parsed as they arrive, so a pipe can be ingested while it is
+    still being written. `name` labels skipped rows.
+    """
+    if fmt == 'csv':
+        rows = enumerate(csv.DictReader(f), start=2)
+    elif fmt == 'jsonl':
+        rows = ((number, json.loads(line)) for number, line in enumerate(f, start=1) if line.strip())
+    elif fmt == 'json':
+        rows = enumerate(json.load(f), start=1)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    for number, record in rows:
+        try:
+            yield parse_record(record)
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"Skipping {name}:{number}: {e}")
+
+
+def _column(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def iter_whr(path):
+    """Stream (sr_no, epoch seconds, hours) rows from a WHR file"""
+    with open(path, 'rb') as f:
+        if f.read(4) != WHR_MAGIC:
+            raise ValueError(f"{path} is not a WHR file")
+        while True:
+            header = f.read(4)
+            if not header:
+                return
+            (count,) = struct.unpack('<I', header)
+            columns = []
+            for typecode in ('q', 'q', 'i'):
+                column = array(typecode)
+                column.frombytes(f.read(count * column.itemsize))
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                columns.append(column)
+            yield from zip(*columns)
+
+
+def format_timestamps(stamps, day_labels):
+    """'YYYY-MM-DD HH:MM:SS' for each epoch second, strftime once per day"""
+    labels = []
+    for ts in stamps:
+        day, seconds = divmod(ts, 86400)
+        day_label = day_labels.get(day)
+        if day_label is None:
+            day_label = day_labels[day] = (EPOCH + timedelta(days=day)).strftime('%Y-%m-%d')
+        labels.append(f"{day_label} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}")
+    return labels
+
+
+def write_records(batches, path, fmt=None):
+    """Write batches of (sr_no, epoch seconds, hours) rows to `path`.
+
+    Each batch is written out before the next is read, so memory use is
+    bounded by one batch whatever the size of the export. Returns the
+    number of rows written.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in ('csv', 'jsonl', 'whr'):
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    count = 0
+    day_labels = {}
+    with open(path, 'wb' if fmt == 'whr' else 'w', newline='' if fmt == 'csv' else None,
+              encoding=None if fmt == 'whr' else 'utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['sr_no', 'date_time', 'hours'])
+        elif fmt == 'whr':
+            f.write(WHR_MAGIC)
+
+        for batch in batches:
+            if not batch:
+                continue
+            ids, stamps, hours = zip(*batch)
+            if fmt == 'whr':
+                f.write(struct.pack('<I', len(batch)))
+                f.write(_column('q', ids).tobytes())
+                f.write(_column('q', stamps).tobytes())
+                f.write(_column('i', hours).tobytes())
+            else:
+                labels = format_timestamps(stamps, day_labels)
+                if fmt == 'csv':
+                    writer.writerows(zip(ids, labels, hours))
+                else:
+                    f.write("".join(
+                        json.dumps({'sr_no': sr_no, 'date_time': label, 'hours': hour}) + "\n"
+                        for sr_no, label, hour in zip(ids, labels, hours)
+                    ))
+            count += len(batch)
+    return count
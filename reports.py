@@ -0,0 +1,153 @@
+"""Weekly, monthly and yearly reports built on the per-day rollups.
+
+A report never touches individual records. It reads one (day, records,
+hours) row per worked day from backend.breakdown('day'), which every
+backend answers from its day totals, and folds them in a single pass:
+
+    buckets    days worked, records, hours and overtime per week / month / year
+    averages   hours per worked day and per period
+    streaks    the longest run of consecutive worked days, and the current one
+    overtime   hours above the daily threshold, and the days that had any
+    rolling    hours in the trailing window ending today, and the best window
+
+So the cost follows the number of days in the range, a few thousand even
+for millions of records, not the size of the table.
+"""
+from collections import deque
+from datetime import date
+
+from instrumentation import metrics
+
+PERIODS = ('week', 'month', 'year')
+# Hours worked in a day beyond this count as overtime
+OVERTIME_HOURS = 8
+# Days in the rolling window
+ROLLING_DAYS = 7
+
+
+def period_key(period, day):
+    """Sortable bucket key and its label for the period containing `day`"""
+    if period == 'week':
+        year, week, _ = day.isocalendar()
+        return (year, week), f"{year:04d}-W{week:02d}"
+    if period == 'month':
+        return (day.year, day.month), f"{day.year:04d}-{day.month:02d}"
+    if period == 'year':
+        return day.year, f"{day.year:04d}"
+    raise ValueError(f"Unknown period: {period}")
+
+
+class Report:
+    """Totals, streaks and rolling windows for one period size.
+
+    buckets holds [label, days, records, hours, overtime] per period that
+    has records, oldest first. Streaks are (days, first day, last day).
+    """
+
+    def __init__(self, period, overtime=OVERTIME_HOURS, window=ROLLING_DAYS):
+        if overtime < 0:
+            raise ValueError(f"Overtime threshold must be at least 0 hours, got {overtime}")
+        if window < 1:
+            raise ValueError(f"Rolling window must be at least 1 day, got {window}")
+        self.period = period
+        self.threshold = overtime
+        self.window = window
+        self.buckets = []
+        self.days = 0
+        self.records = 0
+        self.hours = 0
+        self.overtime = 0
+        self.overtime_days = 0
+        self.longest_streak = (0, None, None)
+        self.current_streak = 0
+        self.rolling = 0
+        self.best_window = (0, None)
+
+    @property
+    def average_per_day(self):
+        return self.hours / self.days if self.days else 0
+
+    @property
+    def average_per_period(self):
+        return self.hours / len(self.buckets) if self.buckets else 0
+
+
+@metrics.timed('report.build')
+def build_report(days, period='week', overtime=OVERTIME_HOURS, window=ROLLING_DAYS, today=None):
+    """Fold ('YYYY-MM-DD', records, hours) rows, oldest first, into a Report"""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    report = Report(period, overtime, window)
+    today = (today or date.today()).toordinal()
+    bucket_key = None
+    streak_start = previous = None
+    # (day ordinal, hours) of the days inside the window ending at the current day
+    recent, recent_hours = deque(), 0
+
+    for label, records, hours in days:
+        day = date.fromisoformat(label)
+        ordinal = day.toordinal()
+        extra = max(hours - overtime, 0)
+
+        key, key_label = period_key(period, day)
+        if key != bucket_key:
+            bucket_key = key
+            report.buckets.append([key_label, 0, 0, 0, 0])
+        bucket = report.buckets[-1]
+        bucket[1] += 1
+        bucket[2] += records
+        bucket[3] += hours
+        bucket[4] += extra
+
+        report.days += 1
+        report.records += records
+        report.hours += hours
+        report.overtime += extra
+        report.overtime_days += extra > 0
+
+        if previous is None or ordinal != previous + 1:
+            streak_start = ordinal
+        previous = ordinal
+        if ordinal - streak_start + 1 > report.longest_streak[0]:
+            report.longest_streak = (ordinal - streak_start + 1, date.fromordinal(streak_start), day)
+
+        recent.append((ordinal, hours))
+        recent_hours += hours
+        while recent[0][0] <= ordinal - window:
+            recent_hours -= recent.popleft()[1]
+        if recent_hours > report.best_window[0]:
+            report.best_window = (recent_hours, day)
+
+    # A streak is still current if it reaches today, or yesterday while
+    # today has nothing recorded yet
+    if previous is not None and previous >= today - 1:
+        report.current_streak = previous - streak_start + 1
+    report.rolling = sum(hours for ordinal, hours in recent if today - window < ordinal <= today)
+    return report
+
+
+def summary_lines(report):
+    """The report's totals, streaks and windows as short lines of text"""
+    longest, first, last = report.longest_streak
+    lines = [
+        f"Worked {report.days} days, {report.hours} hours ({report.records} records)",
+        f"Average {report.average_per_day:.1f}h per day, {report.average_per_period:.1f}h per {report.period}",
+        f"Overtime above {report.threshold}h: {report.overtime}h on {report.overtime_days} days",
+        f"Longest streak: {longest} days" + (f" ({first} to {last})" if longest else ""),
+        f"Current streak: {report.current_streak} days",
+        f"Last {report.window} days: {report.rolling}h",
+    ]
+    if report.best_window[1] is not None:
+        lines.append(f"Best {report.window} days: {report.best_window[0]}h, ending {report.best_window[1]}")
+    return lines
+
+
+def format_report(report):
+    """Plain-text table of the buckets followed by the summary, for the console"""
+    lines = [f"{'Period':<10} {'Days':>5} {'Hours':>7} {'Avg/day':>8} {'Overtime':>9}", "-" * 43]
+    lines += [
+        f"{label:<10} {days:>5} {hours:>7} {hours / days:>8.1f} {extra:>9}"
+        for label, days, records, hours, extra in report.buckets
+    ]
+    lines += ["-" * 43] + summary_lines(report)
+    return "\n".join(lines)
@@ -0,0 +1,1713 @@
+"""Storage backends for working-hours records.
+
+Every backend speaks in (sr_no, ts, hours) rows, ts being local epoch
+seconds (see to_epoch), and implements the same operations:
+
+    add / add_many        insert one record, or many with one commit per chunk
+    add_once              insert records named by uid, skipping uids already stored
+    count_and_total       number of records and hours over the whole table
+    summary               hours for today, this month and in total
+    breakdown             (label, records, hours) per day, month or year
+    page / newer          keyset pages newest first, rows added after an sr_no
+    iter_batches          rows in a time range, oldest first, in batches
+    changes_since         sync: rows changed after a version, and
+    apply_changes         merging a peer's changed rows (see sync.py)
+
+SQLiteBackend is the app's own database, MySQLBackend the shared server
+the CLI historically wrote to, and MemoryBackend keeps everything in
+Python structures for benchmarks and throwaway sessions. open_backend()
+picks one from the db.ini / WORK_DB_* configuration.
+"""
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from bisect import bisect_left, insort
+import calendar
+import configparser
+import queue
+import sqlite3
+import threading
+import time
+import os
+
+from instrumentation import metrics
+from records_io import chunked
+
+try:
+    import mysql.connector
+    from mysql.connector import pooling
+except ImportError:
+    # Only the SQLite and in-memory backends are usable without the driver
+    mysql = None
+
+PAGE_SIZE = 50
+BULK_CHUNK_SIZE = 5000
+EXPORT_BATCH_SIZE = 1000
+READER_POOL_SIZE = 2
+SYNC_BATCH_SIZE = 500
+STATEMENT_CACHE_SIZE = 64
+
+DB_ERRORS = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql else ())
+
+# Config file read from the script directory, overridden by WORK_DB_* env vars
+CONFIG_FILE = 'db.ini'
+DEFAULT_CONFIG = {
+    'backend': 'mysql',
+    'host': 'localhost',
+    'port': '3306',
+    'user': 'root',
+    'password': 'pass123',
+    'database': 'abd-db',
+    'pool_size': '3',
+    'path': 'abd-db.sqlite',
+    # Shared secret a sync server requires from its clients, see sync.py
+    'sync_token': '',
+}
+
+# Applied to every pooled connection right after it is opened
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-2000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Timestamps are stored as "local epoch" seconds: the wall-clock time the
+# record was made, counted as if it were UTC. Day and month numbers derived
+# from it line up with local calendar days without any timezone lookups.
+EPOCH = datetime(1970, 1, 1)
+
+# Each entry moves the schema up one version, tracked in PRAGMA user_version
+MIGRATIONS = [
+    # 1: original table, date_time stored as '%Y-%m-%d %H:%M:%S' text
+    """
+    CREATE TABLE IF NOT EXISTS working_hourse (
+        sr_no INTEGER PRIMARY KEY AUTOINCREMENT,
+        date_time TIMESTAMP,
+        hourse INTEGER
+    );
+    """,
+    # 2: integer epoch column with generated, indexed day/month numbers.
+    # date_time stays readable as a generated column.
+    """
+    CREATE TABLE working_hourse_v2 (
+        sr_no INTEGER PRIMARY KEY AUTOINCREMENT,
+        date_time TEXT GENERATED ALWAYS AS (datetime(ts, 'unixepoch')) VIRTUAL,
+        hourse INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        day INTEGER GENERATED ALWAYS AS (ts / 86400) VIRTUAL,
+        month INTEGER GENERATED ALWAYS AS (
+            CAST(strftime('%Y', ts, 'unixepoch') AS INTEGER) * 12
+            + CAST(strftime('%m', ts, 'unixepoch') AS INTEGER) - 1
+        ) VIRTUAL
+    );
+    INSERT INTO working_hourse_v2 (sr_no, hourse, ts)
+        SELECT sr_no, COALESCE(hourse, 0), COALESCE(CAST(strftime('%s', date_time) AS INTEGER), 0)
+        FROM working_hourse;
+    DROP TABLE working_hourse;
+    ALTER TABLE working_hourse_v2 RENAME TO working_hourse;
+    CREATE INDEX idx_working_hourse_ts ON working_hourse (ts);
+    CREATE INDEX idx_working_hourse_day ON working_hourse (day, hourse);
+    CREATE INDEX idx_working_hourse_month ON working_hourse (month, hourse);
+    """,
+    # 3: per-day and per-month rollups kept current by triggers, so they
+    # change in the same transaction as the record itself
+    """
+    CREATE TABLE daily_totals (
+        day INTEGER PRIMARY KEY,
+        hours INTEGER NOT NULL DEFAULT 0,
+        records INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE monthly_totals (
+        month INTEGER PRIMARY KEY,
+        hours INTEGER NOT NULL DEFAULT 0,
+        records INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER trg_working_hourse_insert AFTER INSERT ON working_hourse BEGIN
+        INSERT INTO daily_totals (day, hours, records) VALUES (NEW.day, NEW.hourse, 1)
+            ON CONFLICT (day) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+        INSERT INTO monthly_totals (month, hours, records) VALUES (NEW.month, NEW.hourse, 1)
+            ON CONFLICT (month) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+    END;
+    CREATE TRIGGER trg_working_hourse_delete AFTER DELETE ON working_hourse BEGIN
+        UPDATE daily_totals SET hours = hours - OLD.hourse, records = records - 1 WHERE day = OLD.day;
+        DELETE FROM daily_totals WHERE day = OLD.day AND records <= 0;
+        UPDATE monthly_totals SET hours = hours - OLD.hourse, records = records - 1 WHERE month = OLD.month;
+        DELETE FROM monthly_totals WHERE month = OLD.month AND records <= 0;
+    END;
+    CREATE TRIGGER trg_working_hourse_update AFTER UPDATE OF ts, hourse ON working_hourse BEGIN
+        UPDATE daily_totals SET hours = hours - OLD.hourse, records = records - 1 WHERE day = OLD.day;
+        DELETE FROM daily_totals WHERE day = OLD.day AND records <= 0;
+        UPDATE monthly_totals SET hours = hours - OLD.hourse, records = records - 1 WHERE month = OLD.month;
+        DELETE FROM monthly_totals WHERE month = OLD.month AND records <= 0;
+        INSERT INTO daily_totals (day, hours, records) VALUES (NEW.day, NEW.hourse, 1)
+            ON CONFLICT (day) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+        INSERT INTO monthly_totals (month, hours, records) VALUES (NEW.month, NEW.hourse, 1)
+            ON CONFLICT (month) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+    END;
+    INSERT INTO daily_totals (day, hours, records)
+        SELECT day, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY day;
+    INSERT INTO monthly_totals (month, hours, records)
+        SELECT month, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY month;
+    """,
+    # 4: change tracking for sync. Every insert or content update takes the
+    # next value of the version counter (the update trigger watches user
+    # and project too, so it is created with them in 5); uid names the
+    # record on every device, modified (UTC seconds) decides conflicts,
+    # source is the peer the current content came from (NULL when written
+    # here). SQLite already serialises writers, so the single counter row
+    # adds no waiting, but the extra statements take bulk ingest from about
+    # 34k to 25k rows/s
+    """
+    ALTER TABLE working_hourse ADD COLUMN uid TEXT;
+    ALTER TABLE working_hourse ADD COLUMN version INTEGER;
+    ALTER TABLE working_hourse ADD COLUMN modified INTEGER;
+    ALTER TABLE working_hourse ADD COLUMN source TEXT;
+    CREATE TABLE sync_state (
+        key TEXT PRIMARY KEY,
+        value NOT NULL
+    );
+    INSERT INTO sync_state (key, value) VALUES
+        ('device', lower(hex(randomblob(8)))),
+        ('version', (SELECT COALESCE(MAX(sr_no), 0) FROM working_hourse));
+    UPDATE working_hourse SET
+        uid = (SELECT value FROM sync_state WHERE key = 'device') || '-' || sr_no,
+        version = sr_no,
+        modified = CAST(strftime('%s', 'now') AS INTEGER);
+    CREATE UNIQUE INDEX idx_working_hourse_uid ON working_hourse (uid);
+    CREATE INDEX idx_working_hourse_version ON working_hourse (version);
+    CREATE TABLE sync_peers (
+        peer TEXT PRIMARY KEY,
+        pulled INTEGER NOT NULL DEFAULT 0,
+        pushed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TRIGGER trg_working_hourse_sync_insert AFTER INSERT ON working_hourse BEGIN
+        UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+        UPDATE working_hourse SET
+            version = (SELECT value FROM sync_state WHERE key = 'version'),
+            uid = COALESCE(NEW.uid, (SELECT value FROM sync_state WHERE key = 'device') || '-' || NEW.sr_no),
+            modified = COALESCE(NEW.modified, CAST(strftime('%s', 'now') AS INTEGER))
+        WHERE sr_no = NEW.sr_no;
+    END;
+    """,
+    # 5: who and what each record is for ('' when not given). Listings for
+    # one user or project walk their (user, ts) / (project, ts) index, and
+    # per-partition rollups keep per-person summaries to a few rows however
+    # many people share the table.
+    """
+    ALTER TABLE working_hourse ADD COLUMN user TEXT NOT NULL DEFAULT '';
+    ALTER TABLE working_hourse ADD COLUMN project TEXT NOT NULL DEFAULT '';
+    CREATE INDEX idx_working_hourse_user ON working_hourse (user, ts);
+    CREATE INDEX idx_working_hourse_project ON working_hourse (project, ts);
+    CREATE TABLE partition_daily_totals (
+        user TEXT NOT NULL,
+        project TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        hours INTEGER NOT NULL DEFAULT 0,
+        records INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user, day, project)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_partition_daily_totals_project ON partition_daily_totals (project, day);
+    CREATE TABLE partition_monthly_totals (
+        user TEXT NOT NULL,
+        project TEXT NOT NULL,
+        month INTEGER NOT NULL,
+        hours INTEGER NOT NULL DEFAULT 0,
+        records INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user, month, project)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_partition_monthly_totals_project ON partition_monthly_totals (project, month);
+    CREATE TRIGGER trg_working_hourse_partition_insert AFTER INSERT ON working_hourse BEGIN
+        INSERT INTO partition_daily_totals (user, project, day, hours, records)
+            VALUES (NEW.user, NEW.project, NEW.day, NEW.hourse, 1)
+            ON CONFLICT (user, day, project) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+        INSERT INTO partition_monthly_totals (user, project, month, hours, records)
+            VALUES (NEW.user, NEW.project, NEW.month, NEW.hourse, 1)
+            ON CONFLICT (user, month, project) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+    END;
+    CREATE TRIGGER trg_working_hourse_partition_delete AFTER DELETE ON working_hourse BEGIN
+        UPDATE partition_daily_totals SET hours = hours - OLD.hourse, records = records - 1
+            WHERE user = OLD.user AND day = OLD.day AND project = OLD.project;
+        DELETE FROM partition_daily_totals
+            WHERE user = OLD.user AND day = OLD.day AND project = OLD.project AND records <= 0;
+        UPDATE partition_monthly_totals SET hours = hours - OLD.hourse, records = records - 1
+            WHERE user = OLD.user AND month = OLD.month AND project = OLD.project;
+        DELETE FROM partition_monthly_totals
+            WHERE user = OLD.user AND month = OLD.month AND project = OLD.project AND records <= 0;
+    END;
+    CREATE TRIGGER trg_working_hourse_partition_update AFTER UPDATE OF ts, hourse, user, project ON working_hourse BEGIN
+        UPDATE partition_daily_totals SET hours = hours - OLD.hourse, records = records - 1
+            WHERE user = OLD.user AND day = OLD.day AND project = OLD.project;
+        DELETE FROM partition_daily_totals
+            WHERE user = OLD.user AND day = OLD.day AND project = OLD.project AND records <= 0;
+        UPDATE partition_monthly_totals SET hours = hours - OLD.hourse, records = records - 1
+            WHERE user = OLD.user AND month = OLD.month AND project = OLD.project;
+        DELETE FROM partition_monthly_totals
+            WHERE user = OLD.user AND month = OLD.month AND project = OLD.project AND records <= 0;
+        INSERT INTO partition_daily_totals (user, project, day, hours, records)
+            VALUES (NEW.user, NEW.project, NEW.day, NEW.hourse, 1)
+            ON CONFLICT (user, day, project) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+        INSERT INTO partition_monthly_totals (user, project, month, hours, records)
+            VALUES (NEW.user, NEW.project, NEW.month, NEW.hourse, 1)
+            ON CONFLICT (user, month, project) DO UPDATE SET hours = hours + excluded.hours, records = records + 1;
+    END;
+    -- Sync version for a content edit, moving a record to another user or
+    -- project included. Sync marks its own updates by clearing version and
+    -- keeps the peer's modified and source; anything else is a local edit
+    CREATE TRIGGER trg_working_hourse_sync_update AFTER UPDATE OF ts, hourse, user, project ON working_hourse BEGIN
+        UPDATE sync_state SET value = value + 1 WHERE key = 'version';
+        UPDATE working_hourse SET
+            version = (SELECT value FROM sync_state WHERE key = 'version'),
+            modified = CASE WHEN NEW.version IS NULL
+                THEN NEW.modified ELSE CAST(strftime('%s', 'now') AS INTEGER) END,
+            source = CASE WHEN NEW.version IS NULL THEN NEW.source END
+        WHERE sr_no = NEW.sr_no;
+    END;
+    INSERT INTO partition_daily_totals (user, project, day, hours, records)
+        SELECT user, project, day, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY user, project, day;
+    INSERT INTO partition_monthly_totals (user, project, month, hours, records)
+        SELECT user, project, month, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY user, project, month;
+    """,
+]
+
+# SQL is kept in constants so sqlite3's per-connection statement cache
+# hands back the same prepared statement on every call
+INSERT_SQL = "INSERT INTO working_hourse (ts, hourse, user, project) VALUES (?, ?, ?, ?)"
+# Skips days the user already has a record for on the project; the rollup
+# is updated per row, so duplicates inside the same batch are caught as well
+INSERT_NEW_DAY_SQL = """
+    INSERT INTO working_hourse (ts, hourse, user, project)
+    SELECT ?1, ?2, ?3, ?4 WHERE NOT EXISTS (
+        SELECT 1 FROM partition_daily_totals WHERE user = ?3 AND day = ?5 AND project = ?4
+    )
+"""
+# A record whose uid is already stored is left alone, so a retried batch inserts nothing twice
+ADD_ONCE_SQL = """
+    INSERT INTO working_hourse (ts, hourse, user, project, uid) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (uid) DO NOTHING
+"""
+SELECT_ALL_SQL = "SELECT sr_no, ts, hourse FROM working_hourse ORDER BY ts DESC"
+# Keyset pages, newest first, walking the ts index
+FIRST_PAGE_SQL = "SELECT sr_no, ts, hourse FROM working_hourse ORDER BY ts DESC, sr_no DESC LIMIT ?"
+NEXT_PAGE_SQL = """
+    SELECT sr_no, ts, hourse FROM working_hourse
+    WHERE (ts, sr_no) < (?, ?)
+    ORDER BY ts DESC, sr_no DESC LIMIT ?
+"""
+EXPORT_SQL = "SELECT sr_no, ts, hourse FROM working_hourse WHERE ts >= :low AND ts < :high ORDER BY ts, sr_no"
+# For one user and/or project, along the (user, ts) or (project, ts) index
+PARTITION_EXPORT_SQL = """
+    SELECT sr_no, ts, hourse FROM working_hourse
+    WHERE {where} AND ts >= :low AND ts < :high ORDER BY ts, sr_no
+"""
+# The unary + keeps SQLite from walking the whole ts index to avoid a sort;
+# the sr_no range is a handful of rows, sorting them is cheaper
+NEWER_SQL = "SELECT sr_no, ts, hourse FROM working_hourse WHERE sr_no > ? ORDER BY +ts DESC, sr_no DESC"
+# Total, today and this month straight from the rollup tables
+SUMMARY_SQL = """
+    SELECT
+        (SELECT SUM(hours) FROM monthly_totals),
+        (SELECT hours FROM daily_totals WHERE day = ?),
+        (SELECT hours FROM monthly_totals WHERE month = ?)
+"""
+
+COUNT_TOTAL_SQL = "SELECT COALESCE(SUM(records), 0), COALESCE(SUM(hours), 0) FROM monthly_totals"
+# Per-period totals from the rollups; bounds are day or month numbers
+BREAKDOWN_SQL = {
+    'day': "SELECT day, records, hours FROM daily_totals WHERE day >= ? AND day < ? ORDER BY day",
+    'month': "SELECT month, records, hours FROM monthly_totals WHERE month >= ? AND month < ? ORDER BY month",
+    'year': """
+        SELECT month / 12, SUM(records), SUM(hours) FROM monthly_totals
+        WHERE month >= ? AND month < ?
+        GROUP BY month / 12 ORDER BY month / 12
+    """,
+}
+
+# The same totals for one user and/or project, from the partition rollups;
+# {where} is filled in by _partition_where
+PARTITION_SUMMARY_SQL = """
+    SELECT
+        (SELECT SUM(hours) FROM partition_monthly_totals WHERE {where}),
+        (SELECT SUM(hours) FROM partition_daily_totals WHERE {where} AND day = :day),
+        (SELECT SUM(hours) FROM partition_monthly_totals WHERE {where} AND month = :month)
+"""
+PARTITION_COUNT_TOTAL_SQL = """
+    SELECT COALESCE(SUM(records), 0), COALESCE(SUM(hours), 0) FROM partition_monthly_totals WHERE {where}
+"""
+PARTITION_BREAKDOWN_SQL = {
+    'day': """
+        SELECT day, SUM(records), SUM(hours) FROM partition_daily_totals
+        WHERE {where} AND day >= :low AND day < :high
+        GROUP BY day ORDER BY day
+    """,
+    'month': """
+        SELECT month, SUM(records), SUM(hours) FROM partition_monthly_totals
+        WHERE {where} AND month >= :low AND month < :high
+        GROUP BY month ORDER BY month
+    """,
+    'year': """
+        SELECT month / 12, SUM(records), SUM(hours) FROM partition_monthly_totals
+        WHERE {where} AND month >= :low AND month < :high
+        GROUP BY month / 12 ORDER BY month / 12
+    """,
+}
+# (user or project, records, hours) over everything, or over a day range
+TOTALS_BY_SQL = """
+    SELECT {dimension}, SUM(records), SUM(hours) FROM partition_monthly_totals
+    GROUP BY {dimension} ORDER BY {dimension}
+"""
+TOTALS_BY_RANGE_SQL = """
+    SELECT {dimension}, SUM(records), SUM(hours) FROM partition_daily_totals
+    WHERE day >= :low AND day < :high
+    GROUP BY {dimension} ORDER BY {dimension}
+"""
+DIMENSIONS = ('user', 'project')
+
+# Rollups recomputed from working_hourse, for rebuild and verify; columns
+# in table order, the last two being hours and records
+ROLLUP_QUERIES = {
+    'daily_totals': "SELECT day, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY day",
+    'monthly_totals': "SELECT month, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY month",
+    'partition_daily_totals': """
+        SELECT user, project, day, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY user, project, day
+    """,
+    'partition_monthly_totals': """
+        SELECT user, project, month, SUM(hourse), COUNT(*) FROM working_hourse GROUP BY user, project, month
+    """,
+}
+
+# Sync: changed rows in version order, leaving out what the asking peer sent us
+CHANGES_SQL = """
+    SELECT uid, ts, hourse, modified, version, user, project FROM working_hourse
+    WHERE version > ? AND (source IS NULL OR source != ?)
+    ORDER BY version LIMIT ?
+"""
+SYNC_INSERT_SQL = """
+    INSERT INTO working_hourse (ts, hourse, user, project, uid, modified, source) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SYNC_UPDATE_SQL = """
+    UPDATE working_hourse SET ts = ?, hourse = ?, user = ?, project = ?, modified = ?, source = ?, version = NULL
+    WHERE uid = ?
+"""
+SYNC_MARKS_SQL = "SELECT pulled, pushed FROM sync_peers WHERE peer = ?"
+SET_SYNC_MARKS_SQL = """
+    INSERT INTO sync_peers (peer, pulled, pushed) VALUES (:peer, COALESCE(:pulled, 0), COALESCE(:pushed, 0))
+    ON CONFLICT (peer) DO UPDATE SET pulled = COALESCE(:pulled, pulled), pushed = COALESCE(:pushed, pushed)
+"""
+
+
+def to_epoch(date_time):
+    """Local epoch seconds for a naive datetime"""
+    return calendar.timegm(date_time.timetuple())
+
+
+def day_number(date_time):
+    return to_epoch(date_time) // 86400
+
+
+def month_number(date_time):
+    return date_time.year * 12 + date_time.month - 1
+
+
+def bucket_number(period, date_time):
+    """Day number, month number or year of a datetime"""
+    if period == 'day':
+        return day_number(date_time)
+    if period == 'month':
+        return month_number(date_time)
+    if period == 'year':
+        return date_time.year
+    raise ValueError(f"Unknown period: {period}")
+
+
+def bucket_label(period, number):
+    """'YYYY-MM-DD', 'YYYY-MM' or 'YYYY' for a bucket number"""
+    if period == 'day':
+        return (EPOCH + timedelta(days=number)).strftime('%Y-%m-%d')
+    if period == 'month':
+        year, month = divmod(number, 12)
+        return f"{year:04d}-{month + 1:02d}"
+    return f"{number:04d}"
+
+
+def bucket_start(period, number):
+    """Datetime at which bucket `number` begins"""
+    if period == 'day':
+        return EPOCH + timedelta(days=number)
+    if period == 'month':
+        year, month = divmod(number, 12)
+        return datetime(year, month + 1, 1)
+    return datetime(number, 1, 1)
+
+
+def bucket_range(period, start=None, end=None):
+    """First and past-the-last bucket numbers overlapping [start, end), None if open"""
+    low = bucket_number(period, start) if start is not None else None
+    high = bucket_number(period, end - timedelta(seconds=1)) + 1 if end is not None else None
+    return low, high
+
+
+def load_config():
+    """Backend settings from db.ini [database], then WORK_DB_* env vars"""
+    config = dict(DEFAULT_CONFIG)
+
+    parser = configparser.ConfigParser()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.read(os.environ.get('WORK_DB_CONFIG', os.path.join(script_dir, CONFIG_FILE)))
+    if parser.has_section('database'):
+        config.update(parser['database'])
+
+    # Environment wins over the file, e.g. WORK_DB_PASSWORD
+    for key in DEFAULT_CONFIG:
+        value = os.environ.get(f'WORK_DB_{key.upper()}')
+        if value is not None:
+            config[key] = value
+
+    if not os.path.isabs(config['path']):
+        config['path'] = os.path.join(script_dir, config['path'])
+    return config
+
+
+def merge_changes(rows, existing):
+    """Sort a peer's changed rows into inserts and updates.
+
+    Rows are (uid, ts, hours, modified, version, user, project) and
+    existing maps uid -> (ts, hours, modified, user, project) for records
+    already stored. The later `modified` wins. `modified` is in whole
+    seconds, so two edits can tie: then the content decides, compared as
+    (ts, hours, user, project), never which side the row came from. Every
+    database therefore keeps the same version, and an identical row is
+    skipped rather than applied again. Returns (inserts, updates, skipped)
+    with the rows as (uid, ts, hours, user, project, modified).
+    """
+    inserts, updates, skipped = [], [], 0
+    for uid, ts, hours, modified, _, user, project in rows:
+        current = existing.get(uid)
+        if current is None:
+            inserts.append((uid, ts, hours, user, project, modified))
+        elif (modified, ts, hours, user, project) > (current[2], current[0], current[1], current[3], current[4]):
+            updates.append((uid, ts, hours, user, project, modified))
+        else:
+            skipped += 1
+    return inserts, updates, skipped
+
+
+def _partition_where(user=None, project=None):
+    """SQL condition and named params for an optional user and project, None if neither"""
+    where, params = [], {}
+    for name, value in (('user', user), ('project', project)):
+        if value is not None:
+            where.append(f"{name} = :{name}")
+            params[name] = value
+    return (" AND ".join(where) or None), params
+
+
+def _rollup_key(row):
+    """Key columns of a rollup row: everything before hours and records"""
+    return row[0] if len(row) == 3 else tuple(row[:-2])
+
+
+def _rollup_mismatches(table, expected, stored):
+    """(table, key, expected, stored) for each key whose (hours, records) differ"""
+    return [
+        (table, key, expected.get(key), stored.get(key))
+        for key in sorted(expected.keys() | stored.keys())
+        if expected.get(key) != stored.get(key)
+    ]
+
+
+def _statements(script):
+    """Split a migration into statements; trigger bodies keep their inner semicolons"""
+    statements, current = [], ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current)
+            current = ''
+    return statements
+
+
+def migrate(connection):
+    """Bring the schema up to date, one transaction per version.
+
+    user_version is read again once the write lock is held, so when two
+    processes open an old file at once the second waits, then finds the
+    step applied instead of replaying it on the new schema.
+    """
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    while version < len(MIGRATIONS):
+        # executescript() would commit first and drop the lock, so the
+        # statements run one by one inside the transaction
+        connection.commit()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                for statement in _statements(MIGRATIONS[version]):
+                    connection.execute(statement)
+                version += 1
+                connection.execute(f"PRAGMA user_version = {version}")
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+    return version
+
+
+class ConnectionPool:
+    """One long-lived writer connection plus a small pool of readers."""
+
+    def __init__(self, path, readers=READER_POOL_SIZE):
+        self.path = path
+        self.size = readers
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._opened = []
+        self._reader_count = 0
+        self._open_lock = threading.Lock()
+        self._closed = False
+
+    @metrics.timed('db.connect')
+    def _open(self):
+        connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+        self._opened.append(connection)
+        metrics.count('db.connections_opened')
+        return connection
+
+    @contextmanager
+    def writer(self):
+        """Yield the writer connection, committing on success"""
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._writer is None:
+                self._writer = self._open()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """Borrow a reader connection and return it to the pool afterwards"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            connection = None
+            with self._open_lock:
+                if self._reader_count < self.size:
+                    connection = self._open()
+                    self._reader_count += 1
+            if connection is None:
+                connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def close(self):
+        """Close every connection the pool has handed out"""
+        with self._write_lock, self._open_lock:
+            self._closed = True
+            for connection in self._opened:
+                try:
+                    connection.close()
+                except sqlite3.Error as e:
+                    print(f"Error closing connection: {e}")
+            self._opened = []
+            self._reader_count = 0
+            self._writer = None
+            self._readers = queue.LifoQueue()
+
+
+
+class StorageBackend:
+    """Operations every backend provides; rows are (sr_no, ts, hours).
+
+    Records belong to a user and a project, '' when not given. Summaries
+    and listings take optional user / project filters; None means everyone.
+    """
+
+    name = None
+
+    def migrate(self):
+        """Create or upgrade the schema, returns its version"""
+        return 0
+
+    def add(self, date_time, hours, user='', project=''):
+        """Insert one record and return its sr_no"""
+        raise NotImplementedError
+
+    def add_many(self, records, chunk_size=BULK_CHUNK_SIZE, dedup=False, user='', project=''):
+        """Insert (datetime, hours) pairs for one user and project, one transaction per chunk.
+
+        With dedup, records for a day the user already has one for on the
+        project (stored or earlier in the same call) are skipped. Returns
+        rows inserted.
+        """
+        inserted = 0
+        seen_days = set()
+        for chunk in chunked(records, chunk_size):
+            inserted += self._insert_chunk(chunk, seen_days if dedup else None, user, project)
+        return inserted
+
+    def _insert_chunk(self, chunk, seen_days, user, project):
+        raise NotImplementedError
+
+    def add_once(self, records, user='', project=''):
+        """Insert (uid, datetime, hours) records in one transaction.
+
+        Records whose uid is already stored are skipped, so sending the
+        same records again is harmless. Returns rows inserted.
+        """
+        raise NotImplementedError
+
+    def count_and_total(self, user=None, project=None):
+        """(number of records, total hours)"""
+        raise NotImplementedError
+
+    def summary(self, now, user=None, project=None):
+        """(today's hours, this month's hours, total hours) as of `now`"""
+        raise NotImplementedError
+
+    def breakdown(self, period='day', start=None, end=None, user=None, project=None):
+        """(label, records, hours) per 'day', 'month' or 'year', oldest first.
+
+        Every bucket overlapping [start, end) is included in full.
+        """
+        raise NotImplementedError
+
+    def totals_by(self, dimension, start=None, end=None):
+        """(user or project, records, hours) for each one with records in [start, end)"""
+        raise NotImplementedError
+
+    def page(self, after=None, limit=PAGE_SIZE):
+        """Up to `limit` rows newest first, older than the (ts, sr_no) key `after`"""
+        raise NotImplementedError
+
+    def newer(self, sr_no):
+        """Rows with a higher sr_no, newest first"""
+        raise NotImplementedError
+
+    def all_rows(self):
+        """Every row, newest first"""
+        raise NotImplementedError
+
+    def iter_batches(self, start=None, end=None, batch_size=EXPORT_BATCH_SIZE, user=None, project=None):
+        """Yield lists of rows in [start, end), oldest first"""
+        raise NotImplementedError
+
+    def rebuild_rollups(self):
+        """Recompute stored rollups from the records; nothing to do without any"""
+
+    def verify_rollups(self):
+        """Return (table, key, expected, stored) for every rollup row that is off"""
+        return []
+
+    def sync_device(self):
+        """This database's id as a sync peer"""
+        raise NotImplementedError(f"The {self.name} backend does not sync")
+
+    def changes_since(self, version, limit=SYNC_BATCH_SIZE, exclude=None):
+        """Up to `limit` (uid, ts, hours, modified, version, user, project) rows
+        changed after `version`, in version order, without those whose
+        content came from peer `exclude`
+        """
+        raise NotImplementedError(f"The {self.name} backend does not sync")
+
+    def apply_changes(self, rows, source):
+        """Merge changed rows from peer `source` (see merge_changes).
+
+        Returns (inserted, updated, skipped).
+        """
+        raise NotImplementedError(f"The {self.name} backend does not sync")
+
+    def sync_marks(self, peer):
+        """(pulled, pushed): the last versions exchanged with `peer`"""
+        raise NotImplementedError(f"The {self.name} backend does not sync")
+
+    def set_sync_marks(self, peer, pulled=None, pushed=None):
+        raise NotImplementedError(f"The {self.name} backend does not sync")
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """The app's SQLite file: migrated schema, rollup tables, pooled connections."""
+
+    name = 'sqlite'
+
+    def __init__(self, path, readers=READER_POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, readers)
+        self.version = None
+        # Opens the writer, so a bad path fails here rather than on first use
+        self.migrate()
+
+    def migrate(self):
+        # Checked once per backend; later calls have nothing left to do
+        if self.version != len(MIGRATIONS):
+            with self.pool.writer() as connection:
+                self.version = migrate(connection)
+        return self.version
+
+    def add(self, date_time, hours, user='', project=''):
+        with self.pool.writer() as connection:
+            return connection.execute(INSERT_SQL, (to_epoch(date_time), hours, user, project)).lastrowid
+
+    def _insert_chunk(self, chunk, seen_days, user, project):
+        # The partition rollup already answers "is this day taken", seen_days is not needed
+        if seen_days is not None:
+            rows = [(to_epoch(dt), hours, user, project, to_epoch(dt) // 86400) for dt, hours in chunk]
+        else:
+            rows = [(to_epoch(dt), hours, user, project) for dt, hours in chunk]
+        with self.pool.writer() as connection:
+            return connection.executemany(INSERT_NEW_DAY_SQL if seen_days is not None else INSERT_SQL, rows).rowcount
+
+    def add_once(self, records, user='', project=''):
+        rows = [(to_epoch(dt), hours, user, project, uid) for uid, dt, hours in records]
+        with self.pool.writer() as connection:
+            return connection.executemany(ADD_ONCE_SQL, rows).rowcount
+
+    def count_and_total(self, user=None, project=None):
+        where, params = _partition_where(user, project)
+        with self.pool.reader() as connection:
+            if where is None:
+                return tuple(connection.execute(COUNT_TOTAL_SQL).fetchone())
+            return tuple(connection.execute(PARTITION_COUNT_TOTAL_SQL.format(where=where), params).fetchone())
+
+    def summary(self, now, user=None, project=None):
+        where, params = _partition_where(user, project)
+        with self.pool.reader() as connection:
+            if where is None:
+                row = connection.execute(SUMMARY_SQL, (day_number(now), month_number(now))).fetchone()
+            else:
+                params.update(day=day_number(now), month=month_number(now))
+                row = connection.execute(PARTITION_SUMMARY_SQL.format(where=where), params).fetchone()
+        total_hours, today_hours, month_hours = row
+        return today_hours or 0, month_hours or 0, total_hours or 0
+
+    def breakdown(self, period='day', start=None, end=None, user=None, project=None):
+        low, high = bucket_range(period, start, end)
+        if period == 'year':
+            # Years are read off monthly_totals
+            low = low * 12 if low is not None else None
+            high = high * 12 if high is not None else None
+        low = -2 ** 62 if low is None else low
+        high = 2 ** 62 if high is None else high
+        where, params = _partition_where(user, project)
+        with self.pool.reader() as connection:
+            if where is None:
+                rows = connection.execute(BREAKDOWN_SQL[period], (low, high)).fetchall()
+            else:
+                params.update(low=low, high=high)
+                rows = connection.execute(PARTITION_BREAKDOWN_SQL[period].format(where=where), params).fetchall()
+        return [(bucket_label(period, number), records, hours) for number, records, hours in rows]
+
+    def totals_by(self, dimension, start=None, end=None):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        with self.pool.reader() as connection:
+            if start is None and end is None:
+                return connection.execute(TOTALS_BY_SQL.format(dimension=dimension)).fetchall()
+            low, high = bucket_range('day', start, end)
+            return connection.execute(TOTALS_BY_RANGE_SQL.format(dimension=dimension), {
+                'low': -2 ** 62 if low is None else low,
+                'high': 2 ** 62 if high is None else high,
+            }).fetchall()
+
+    def page(self, after=None, limit=PAGE_SIZE):
+        with self.pool.reader() as connection:
+            if after is None:
+                return connection.execute(FIRST_PAGE_SQL, (limit,)).fetchall()
+            return connection.execute(NEXT_PAGE_SQL, (after[0], after[1], limit)).fetchall()
+
+    def newer(self, sr_no):
+        with self.pool.reader() as connection:
+            return connection.execute(NEWER_SQL, (sr_no,)).fetchall()
+
+    def all_rows(self):
+        with self.pool.reader() as connection:
+            return connection.execute(SELECT_ALL_SQL).fetchall()
+
+    def iter_batches(self, start=None, end=None, batch_size=EXPORT_BATCH_SIZE, user=None, project=None):
+        where, params = _partition_where(user, project)
+        params['low'] = to_epoch(start) if start is not None else -2 ** 63
+        params['high'] = to_epoch(end) if end is not None else 2 ** 63 - 1
+        query = EXPORT_SQL if where is None else PARTITION_EXPORT_SQL.format(where=where)
+        # One reader for the whole walk, so it sees a single snapshot
+        with self.pool.reader() as connection:
+            cursor = connection.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
+                cursor.close()
+
+    def rebuild_rollups(self):
+        """Recompute the rollup tables from working_hourse"""
+        with self.pool.writer() as connection:
+            for table, query in ROLLUP_QUERIES.items():
+                connection.execute(f"DELETE FROM {table}")
+                connection.execute(f"INSERT INTO {table} {query}")
+
+    def verify_rollups(self):
+        """Return (table, key, expected, stored) for every rollup row that is off"""
+        mismatches = []
+        with self.pool.reader() as connection:
+            for table, query in ROLLUP_QUERIES.items():
+                expected = {_rollup_key(row): row[-2:] for row in connection.execute(query)}
+                stored = {_rollup_key(row): row[-2:] for row in connection.execute(f"SELECT * FROM {table}")}
+                mismatches.extend(_rollup_mismatches(table, expected, stored))
+        return mismatches
+
+    def sync_device(self):
+        with self.pool.reader() as connection:
+            return connection.execute("SELECT value FROM sync_state WHERE key = 'device'").fetchone()[0]
+
+    def changes_since(self, version, limit=SYNC_BATCH_SIZE, exclude=None):
+        with self.pool.reader() as connection:
+            return connection.execute(CHANGES_SQL, (version, exclude or '', limit)).fetchall()
+
+    def apply_changes(self, rows, source):
+        if not rows:
+            return 0, 0, 0
+        uids = [row[0] for row in rows]
+        with self.pool.writer() as connection:
+            existing = {
+                row[0]: row[1:] for row in connection.execute(
+                    f"SELECT uid, ts, hourse, modified, user, project FROM working_hourse "
+                    f"WHERE uid IN ({','.join('?' * len(uids))})", uids
+                )
+            }
+            inserts, updates, skipped = merge_changes(rows, existing)
+            connection.executemany(SYNC_INSERT_SQL, [
+                (ts, hours, user, project, uid, modified, source)
+                for uid, ts, hours, user, project, modified in inserts
+            ])
+            connection.executemany(SYNC_UPDATE_SQL, [
+                (ts, hours, user, project, modified, source, uid)
+                for uid, ts, hours, user, project, modified in updates
+            ])
+        return len(inserts), len(updates), skipped
+
+    def sync_marks(self, peer):
+        with self.pool.reader() as connection:
+            row = connection.execute(SYNC_MARKS_SQL, (peer,)).fetchone()
+        return tuple(row) if row else (0, 0)
+
+    def set_sync_marks(self, peer, pulled=None, pushed=None):
+        with self.pool.writer() as connection:
+            connection.execute(SET_SYNC_MARKS_SQL, {'peer': peer, 'pulled': pulled, 'pushed': pushed})
+
+    def close(self):
+        self.pool.close()
+
+
+# MySQL keeps the original DATETIME schema; epoch seconds are computed in
+# the query so rows come back in the same shape as from SQLite
+MYSQL_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+MYSQL_PERIOD_FORMATS = {'day': '%Y-%m-%d', 'month': '%Y-%m', 'year': '%Y'}
+MYSQL_EPOCH = "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', `date_time`)"
+MYSQL_COLUMNS = f"`sr_no`, {MYSQL_EPOCH}, `hourse`"
+MYSQL_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS `working_hourse` (
+        `sr_no` INT AUTO_INCREMENT PRIMARY KEY,
+        `date_time` DATETIME,
+        `hourse` INT
+    )
+"""
+# Schema version, the device id and the sync version counter
+MYSQL_STATE_SQL = """
+    CREATE TABLE IF NOT EXISTS `sync_state` (
+        `key` VARCHAR(32) PRIMARY KEY,
+        `value` VARCHAR(64) NOT NULL
+    )
+"""
+# Statements taking the schema from version N to N + 1, starting at 1: the
+# table as the CLI has always created it. DDL commits implicitly in MySQL,
+# so a migration that fails part way is re-run from its first statement:
+# every statement must be safe to apply twice. Columns and indexes are
+# added one per statement, and "already exists" errors for them are
+# ignored (MYSQL_ALREADY_APPLIED); triggers are dropped before creation.
+MYSQL_MIGRATIONS = [
+    # 2: change tracking for sync, as in SQLite migration 4. Bumping the
+    # `sync_state` counter row for every row written would hold its lock
+    # until commit, so every writer would wait for the whole of the previous
+    # add_many chunk. The backend sets @sync_pending instead; its rows are
+    # parked at -CONNECTION_ID() and stamped just before commit
+    # (MYSQL_NEXT_TRANSACTION_SQL, MYSQL_STAMP_SQL), so the counter is
+    # locked only between stamping and committing. A version is
+    # (transaction << 32) | sr_no: unique, and it commits in counter order,
+    # so a peer never skips a version that was still uncommitted. Other
+    # clients writing to the table still get a version per row.
+    [
+        "ALTER TABLE `working_hourse` ADD COLUMN `uid` VARCHAR(64)",
+        "ALTER TABLE `working_hourse` ADD COLUMN `version` BIGINT",
+        "ALTER TABLE `working_hourse` ADD COLUMN `modified` BIGINT",
+        "ALTER TABLE `working_hourse` ADD COLUMN `source` VARCHAR(32)",
+        """
+        INSERT IGNORE INTO `sync_state` (`key`, `value`)
+        SELECT 'device', LEFT(REPLACE(UUID(), '-', ''), 16)
+        UNION ALL SELECT 'version', COALESCE(MAX(`sr_no`), 0) FROM `working_hourse`
+        """,
+        """
+        UPDATE `working_hourse` SET
+            `uid` = CONCAT((SELECT `value` FROM `sync_state` WHERE `key` = 'device'), '-', `sr_no`),
+            `version` = `sr_no`,
+            `modified` = UNIX_TIMESTAMP()
+        WHERE `uid` IS NULL
+        """,
+        "ALTER TABLE `working_hourse` ADD UNIQUE INDEX `idx_working_hourse_uid` (`uid`)",
+        "ALTER TABLE `working_hourse` ADD INDEX `idx_working_hourse_version` (`version`)",
+        """
+        CREATE TABLE IF NOT EXISTS `sync_peers` (
+            `peer` VARCHAR(32) PRIMARY KEY,
+            `pulled` BIGINT NOT NULL DEFAULT 0,
+            `pushed` BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "DROP TRIGGER IF EXISTS `trg_working_hourse_sync_insert`",
+        """
+        CREATE TRIGGER `trg_working_hourse_sync_insert` BEFORE INSERT ON `working_hourse`
+        FOR EACH ROW BEGIN
+            IF @sync_pending THEN
+                SET NEW.`version` = -CONNECTION_ID();
+            ELSE
+                UPDATE `sync_state` SET `value` = CAST(`value` AS UNSIGNED) + 1 WHERE `key` = 'version';
+                SET NEW.`version` = (SELECT CAST(`value` AS UNSIGNED) << 32 FROM `sync_state` WHERE `key` = 'version');
+            END IF;
+            SET NEW.`uid` = COALESCE(NEW.`uid`, REPLACE(UUID(), '-', ''));
+            SET NEW.`modified` = COALESCE(NEW.`modified`, UNIX_TIMESTAMP());
+        END
+        """,
+    ],
+    # 3: user and project, as in SQLite migration 5. There are no rollups on
+    # the server; the covering (user|project, date_time, hourse) indexes keep
+    # a per-person query inside that person's slice of the index. Native
+    # PARTITION BY would need `user` in the primary and uid keys.
+    [
+        "ALTER TABLE `working_hourse` ADD COLUMN `user` VARCHAR(64) NOT NULL DEFAULT ''",
+        "ALTER TABLE `working_hourse` ADD COLUMN `project` VARCHAR(64) NOT NULL DEFAULT ''",
+        "ALTER TABLE `working_hourse` ADD INDEX `idx_working_hourse_user` (`user`, `date_time`, `hourse`)",
+        "ALTER TABLE `working_hourse` ADD INDEX `idx_working_hourse_project` (`project`, `date_time`, `hourse`)",
+        # Sync versions for content edits, created with the columns it
+        # watches. Sync marks its own updates by clearing `version` and
+        # keeps the peer's `modified` and `source`; anything else is local
+        "DROP TRIGGER IF EXISTS `trg_working_hourse_sync_update`",
+        """
+        CREATE TRIGGER `trg_working_hourse_sync_update` BEFORE UPDATE ON `working_hourse`
+        FOR EACH ROW BEGIN
+            DECLARE synced BOOLEAN DEFAULT NEW.`version` IS NULL;
+            IF synced OR NOT (NEW.`date_time` <=> OLD.`date_time` AND NEW.`hourse` <=> OLD.`hourse`
+                    AND NEW.`user` <=> OLD.`user` AND NEW.`project` <=> OLD.`project`) THEN
+                IF @sync_pending THEN
+                    SET NEW.`version` = -CONNECTION_ID();
+                ELSE
+                    UPDATE `sync_state` SET `value` = CAST(`value` AS UNSIGNED) + 1 WHERE `key` = 'version';
+                    SET NEW.`version` = (SELECT CAST(`value` AS UNSIGNED) << 32 FROM `sync_state` WHERE `key` = 'version');
+                END IF;
+                IF NOT synced THEN
+                    SET NEW.`modified` = UNIX_TIMESTAMP(), NEW.`source` = NULL;
+                END IF;
+            END IF;
+        END
+        """,
+    ],
+    # 4: time order, for iter_batches' keyset and the newest-first pages
+    [
+        "ALTER TABLE `working_hourse` ADD INDEX `idx_working_hourse_date_time` (`date_time`, `sr_no`)",
+    ],
+]
+# Duplicate column, duplicate key name, trigger exists: left by an earlier partial migration
+MYSQL_ALREADY_APPLIED = {1060, 1061, 1359}
+MYSQL_NO_SUCH_TABLE = 1146
+# Named lock held while migrating, and seconds to wait for it
+MYSQL_MIGRATE_LOCK = 'work_hours_migrate'
+MYSQL_MIGRATE_WAIT = 60
+MYSQL_INSERT_SQL = "INSERT INTO `working_hourse` (`date_time`, `hourse`, `user`, `project`) VALUES (%s, %s, %s, %s)"
+# A duplicate uid leaves the stored record as it is, as ON CONFLICT DO NOTHING does in SQLite
+MYSQL_ADD_ONCE_SQL = """
+    INSERT INTO `working_hourse` (`date_time`, `hourse`, `user`, `project`, `uid`) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE `uid` = `uid`
+"""
+# Stamping a transaction's rows with their sync versions, see MySQL migration 2
+MYSQL_NEXT_TRANSACTION_SQL = """
+    UPDATE `sync_state` SET `value` = LAST_INSERT_ID(CAST(`value` AS UNSIGNED) + 1) WHERE `key` = 'version'
+"""
+MYSQL_STAMP_SQL = """
+    UPDATE `working_hourse` SET `version` = (LAST_INSERT_ID() << 32) | `sr_no`
+    WHERE `version` = -CONNECTION_ID()
+"""
+MYSQL_COUNT_TOTAL_SQL = "SELECT COUNT(*), COALESCE(SUM(`hourse`), 0) FROM `working_hourse`"
+MYSQL_SUMMARY_SQL = """
+    SELECT
+        COALESCE(SUM(CASE WHEN `date_time` >= %s AND `date_time` < %s THEN `hourse` END), 0),
+        COALESCE(SUM(CASE WHEN `date_time` >= %s AND `date_time` < %s THEN `hourse` END), 0),
+        COALESCE(SUM(`hourse`), 0)
+    FROM `working_hourse`
+"""
+MYSQL_FIRST_PAGE_SQL = f"""
+    SELECT {MYSQL_COLUMNS} FROM `working_hourse`
+    ORDER BY `date_time` DESC, `sr_no` DESC LIMIT %s
+"""
+MYSQL_NEXT_PAGE_SQL = f"""
+    SELECT {MYSQL_COLUMNS} FROM `working_hourse`
+    WHERE `date_time` < %s OR (`date_time` = %s AND `sr_no` < %s)
+    ORDER BY `date_time` DESC, `sr_no` DESC LIMIT %s
+"""
+MYSQL_NEWER_SQL = f"""
+    SELECT {MYSQL_COLUMNS} FROM `working_hourse`
+    WHERE `sr_no` > %s ORDER BY `date_time` DESC, `sr_no` DESC
+"""
+MYSQL_SELECT_ALL_SQL = f"SELECT {MYSQL_COLUMNS} FROM `working_hourse` ORDER BY `date_time` DESC, `sr_no` DESC"
+MYSQL_CHANGES_SQL = f"""
+    SELECT `uid`, {MYSQL_EPOCH}, `hourse`, `modified`, `version`, `user`, `project` FROM `working_hourse`
+    WHERE `version` > %s AND (`source` IS NULL OR `source` <> %s)
+    ORDER BY `version` LIMIT %s
+"""
+MYSQL_SYNC_INSERT_SQL = """
+    INSERT INTO `working_hourse` (`date_time`, `hourse`, `user`, `project`, `uid`, `modified`, `source`)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+MYSQL_SYNC_UPDATE_SQL = """
+    UPDATE `working_hourse`
+    SET `date_time` = %s, `hourse` = %s, `user` = %s, `project` = %s, `modified` = %s, `source` = %s,
+        `version` = NULL
+    WHERE `uid` = %s
+"""
+MYSQL_SET_SYNC_MARKS_SQL = """
+    INSERT INTO `sync_peers` (`peer`, `pulled`, `pushed`) VALUES (%s, COALESCE(%s, 0), COALESCE(%s, 0))
+    ON DUPLICATE KEY UPDATE `pulled` = COALESCE(%s, `pulled`), `pushed` = COALESCE(%s, `pushed`)
+"""
+
+
+# Client errors that mean the connection itself is gone: can't connect
+# (socket, host), server gone away, lost during a query
+MYSQL_CONNECTION_ERRORS = {2002, 2003, 2006, 2013, 2055}
+
+
+def _mysql_connection_lost(error):
+    return (isinstance(error, (mysql.connector.InterfaceError, mysql.connector.OperationalError))
+            and error.errno in MYSQL_CONNECTION_ERRORS)
+
+
+def _mysql_time(value):
+    """DATETIME literal for a datetime or local epoch seconds"""
+    if not isinstance(value, datetime):
+        value = EPOCH + timedelta(seconds=value)
+    return value.strftime(MYSQL_TIME_FORMAT)
+
+
+def _mysql_range(start=None, end=None, user=None, project=None):
+    """WHERE conditions and params for an optional [start, end) range, user and project"""
+    where, params = [], []
+    for column, value in (('user', user), ('project', project)):
+        if value is not None:
+            where.append(f"`{column}` = %s")
+            params.append(value)
+    if start is not None:
+        where.append("`date_time` >= %s")
+        params.append(_mysql_time(start))
+    if end is not None:
+        where.append("`date_time` < %s")
+        params.append(_mysql_time(end))
+    return where, params
+
+
+class MySQLBackend(StorageBackend):
+    """The shared MySQL server, through a mysql.connector pool."""
+
+    name = 'mysql'
+
+    def __init__(self, config):
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python is not installed")
+        self.config = config
+        self._pool = None
+        # Schema version, read on first use. The server is shared, so unlike
+        # SQLite it is only migrated on request (python database.py migrate --mysql)
+        self.version = None
+
+    def _get_connection(self):
+        if self._pool is None:
+            metrics.count('db.connections_opened', int(self.config['pool_size']))
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name='work_hours',
+                pool_size=int(self.config['pool_size']),
+                pool_reset_session=False,
+                host=self.config['host'],
+                port=int(self.config['port']),
+                user=self.config['user'],
+                password=self.config['password'],
+                database=self.config['database']
+            )
+        connection = self._pool.get_connection()
+        try:
+            # Revive connections the server dropped while the prompt sat idle
+            connection.ping(reconnect=True, attempts=3, delay=1)
+        except DB_ERRORS:
+            connection.close()
+            raise
+        return connection
+
+    def _reset_pool(self):
+        """Forget the pool, closing its idle connections"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # Take each idle connection out and disconnect it instead of handing
+        # it back. One that cannot be revived goes back to the end of the
+        # queue, so pool_size attempts reach every idle connection once.
+        for _ in range(pool.pool_size):
+            try:
+                connection = pool.get_connection()
+            except pooling.PoolError:
+                return  # The rest are in use, and go with the pool
+            except DB_ERRORS:
+                continue
+            try:
+                connection.disconnect()
+            except DB_ERRORS:
+                pass
+
+    @contextmanager
+    def cursor(self, check=True):
+        """Yield a cursor, reconnecting once if the connection has gone away.
+
+        Only connection-level errors reset the pool; after any other error
+        the transaction is rolled back and the connection reused. The first
+        cursor checks the schema is current, unless check is False.
+        """
+        for attempt in range(2):
+            try:
+                connection = self._get_connection()
+                break
+            except DB_ERRORS as e:
+                if attempt or not _mysql_connection_lost(e):
+                    raise
+                self._reset_pool()
+                metrics.count('db.reconnects')
+                time.sleep(0.5)
+
+        cursor = connection.cursor()
+        lost = False
+        try:
+            if check and self.version is None:
+                self._check_schema(cursor)
+            yield cursor
+            connection.commit()
+        except Exception as e:
+            lost = isinstance(e, DB_ERRORS) and _mysql_connection_lost(e)
+            if not lost:
+                # Nothing half-done may be committed by the connection's next
+                # user, whatever the error: the pool doesn't reset sessions
+                connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            # Returns the connection to the pool
+            connection.close()
+            if lost:
+                # After close(), so the broken connection is closed with the rest
+                self._reset_pool()
+
+    @contextmanager
+    def _write_cursor(self):
+        """A cursor whose inserts and updates get their sync versions at commit"""
+        with self.cursor() as cursor:
+            cursor.execute("SET @sync_pending = 1")
+            try:
+                yield cursor
+                # Last, so the counter row stays locked only until the commit
+                cursor.execute(MYSQL_NEXT_TRANSACTION_SQL)
+                cursor.execute(MYSQL_STAMP_SQL)
+            finally:
+                # The pool keeps session variables; writes on a plain cursor
+                # must not be parked with nothing left to stamp them
+                try:
+                    cursor.execute("SET @sync_pending = NULL")
+                except DB_ERRORS as e:
+                    if not _mysql_connection_lost(e):
+                        raise
+
+    @staticmethod
+    def _schema_version(cursor):
+        """The version recorded in `sync_state`, 1 before the first migration"""
+        try:
+            cursor.execute("SELECT `value` FROM `sync_state` WHERE `key` = 'schema'")
+        except mysql.connector.Error as e:
+            if e.errno != MYSQL_NO_SUCH_TABLE:
+                raise
+            return 1
+        row = cursor.fetchone()
+        return int(row[0]) if row else 1
+
+    def _check_schema(self, cursor):
+        """Refuse to work on a schema older than this code, without changing it"""
+        version = self._schema_version(cursor)
+        if version < len(MYSQL_MIGRATIONS) + 1:
+            raise mysql.connector.errors.ProgrammingError(
+                msg=f"MySQL schema is at version {version}, this version of the app needs "
+                    f"{len(MYSQL_MIGRATIONS) + 1}: run 'python database.py migrate --mysql'"
+            )
+        self.version = version
+
+    def migrate(self):
+        """Create or upgrade the schema on the server, returns its version.
+
+        A named lock keeps two clients from migrating at once; the version
+        is read again once it is held.
+        """
+        if self.version == len(MYSQL_MIGRATIONS) + 1:
+            return self.version
+        with self.cursor(check=False) as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (MYSQL_MIGRATE_LOCK, MYSQL_MIGRATE_WAIT))
+            if cursor.fetchone()[0] != 1:
+                raise mysql.connector.errors.OperationalError(msg="Another client is migrating the schema")
+            try:
+                version = self._migrate(cursor)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (MYSQL_MIGRATE_LOCK,))
+                cursor.fetchone()
+        self.version = version
+        return version
+
+    def _migrate(self, cursor):
+        cursor.execute(MYSQL_CREATE_SQL)
+        cursor.execute(MYSQL_STATE_SQL)
+        version = self._schema_version(cursor)
+        for number, statements in enumerate(MYSQL_MIGRATIONS[version - 1:], start=version + 1):
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as e:
+                    if e.errno not in MYSQL_ALREADY_APPLIED:
+                        raise
+            cursor.execute(
+                "REPLACE INTO `sync_state` (`key`, `value`) VALUES ('schema', %s)", (str(number),)
+            )
+            version = number
+        return version
+
+    def add(self, date_time, hours, user='', project=''):
+        with self._write_cursor() as cursor:
+            cursor.execute(MYSQL_INSERT_SQL, (_mysql_time(date_time), hours, user, project))
+            # Read before the stamp's LAST_INSERT_ID(expr) replaces it
+            sr_no = cursor.lastrowid
+        return sr_no
+
+    def _insert_chunk(self, chunk, seen_days, user, project):
+        if seen_days is not None:
+            chunk = self._drop_existing_days(chunk, seen_days, user, project)
+        rows = [(_mysql_time(date_time), hours, user, project) for date_time, hours in chunk]
+        if rows:
+            with self._write_cursor() as cursor:
+                cursor.executemany(MYSQL_INSERT_SQL, rows)
+        return len(rows)
+
+    def add_once(self, records, user='', project=''):
+        rows = [(_mysql_time(date_time), hours, user, project, uid) for uid, date_time, hours in records]
+        if not rows:
+            return 0
+        with self._write_cursor() as cursor:
+            cursor.executemany(MYSQL_ADD_ONCE_SQL, rows)
+            # 1 per inserted row, 0 for a uid that was already there
+            inserted = cursor.rowcount
+        return inserted
+
+    def _drop_existing_days(self, chunk, seen_days, user, project):
+        """Filter out records whose day is already stored for the user and project, or in seen_days"""
+        first = min(date_time for date_time, _ in chunk).replace(hour=0, minute=0, second=0)
+        last = max(date_time for date_time, _ in chunk).replace(hour=0, minute=0, second=0)
+        where, params = _mysql_range(first, last + timedelta(days=1), user, project)
+        with self.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT DATE_FORMAT(`date_time`, '%Y-%m-%d') FROM `working_hourse` WHERE "
+                + " AND ".join(where), params
+            )
+            seen_days.update(str(row[0]) for row in cursor.fetchall())
+
+        kept = []
+        for date_time, hours in chunk:
+            day = date_time.strftime('%Y-%m-%d')
+            if day not in seen_days:
+                seen_days.add(day)
+                kept.append((date_time, hours))
+        return kept
+
+    def count_and_total(self, user=None, project=None):
+        where, params = _mysql_range(user=user, project=project)
+        query = MYSQL_COUNT_TOTAL_SQL + (" WHERE " + " AND ".join(where) if where else "")
+        with self.cursor() as cursor:
+            # Let the server count and sum instead of shipping every row
+            cursor.execute(query, params)
+            count, hours = cursor.fetchone()
+        return count, int(hours)
+
+    def summary(self, now, user=None, project=None):
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        month = day.replace(day=1)
+        next_month = bucket_start('month', month_number(month) + 1)
+        where, params = _mysql_range(user=user, project=project)
+        query = MYSQL_SUMMARY_SQL + (" WHERE " + " AND ".join(where) if where else "")
+        with self.cursor() as cursor:
+            cursor.execute(query, [
+                _mysql_time(day), _mysql_time(day + timedelta(days=1)),
+                _mysql_time(month), _mysql_time(next_month),
+            ] + params)
+            return tuple(int(value) for value in cursor.fetchone())
+
+    def breakdown(self, period='day', start=None, end=None, user=None, project=None):
+        low, high = bucket_range(period, start, end)
+        where, params = _mysql_range(
+            bucket_start(period, low) if low is not None else None,
+            bucket_start(period, high) if high is not None else None,
+            user, project,
+        )
+        bucket = f"DATE_FORMAT(`date_time`, '{MYSQL_PERIOD_FORMATS[period]}')"
+        select_query = f"SELECT {bucket}, COUNT(*), COALESCE(SUM(`hourse`), 0) FROM `working_hourse`"
+        if where:
+            select_query += " WHERE " + " AND ".join(where)
+        select_query += f" GROUP BY {bucket} ORDER BY {bucket}"
+        with self.cursor() as cursor:
+            cursor.execute(select_query, params)
+            return [(str(row[0]), row[1], int(row[2])) for row in cursor.fetchall()]
+
+    def totals_by(self, dimension, start=None, end=None):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        low, high = bucket_range('day', start, end)
+        where, params = _mysql_range(
+            bucket_start('day', low) if low is not None else None,
+            bucket_start('day', high) if high is not None else None,
+        )
+        # Grouping walks the (dimension, date_time, hourse) index
+        select_query = f"SELECT `{dimension}`, COUNT(*), COALESCE(SUM(`hourse`), 0) FROM `working_hourse`"
+        if where:
+            select_query += " WHERE " + " AND ".join(where)
+        select_query += f" GROUP BY `{dimension}` ORDER BY `{dimension}`"
+        with self.cursor() as cursor:
+            cursor.execute(select_query, params)
+            return [(row[0], row[1], int(row[2])) for row in cursor.fetchall()]
+
+    def page(self, after=None, limit=PAGE_SIZE):
+        with self.cursor() as cursor:
+            if after is None:
+                cursor.execute(MYSQL_FIRST_PAGE_SQL, (limit,))
+            else:
+                stamp = _mysql_time(after[0])
+                cursor.execute(MYSQL_NEXT_PAGE_SQL, (stamp, stamp, after[1], limit))
+            return cursor.fetchall()
+
+    def newer(self, sr_no):
+        with self.cursor() as cursor:
+            cursor.execute(MYSQL_NEWER_SQL, (sr_no,))
+            return cursor.fetchall()
+
+    def all_rows(self):
+        with self.cursor() as cursor:
+            cursor.execute(MYSQL_SELECT_ALL_SQL)
+            return cursor.fetchall()
+
+    def iter_batches(self, start=None, end=None, batch_size=EXPORT_BATCH_SIZE, user=None, project=None):
+        """Yield rows in (date_time, sr_no) order, one keyset query per batch.
+
+        Nothing is held open on the pooled connection between batches, so a
+        pager can wait on input without pinning a server cursor.
+        """
+        where, params = _mysql_range(start, end, user, project)
+        order = " ORDER BY `date_time`, `sr_no` LIMIT %s"
+        first_query = f"SELECT {MYSQL_COLUMNS} FROM `working_hourse`"
+        if where:
+            first_query += " WHERE " + " AND ".join(where)
+        # Walks the (date_time, sr_no) index from the last row sent
+        next_query = (
+            f"SELECT {MYSQL_COLUMNS} FROM `working_hourse` WHERE "
+            + " AND ".join(where + ["(`date_time` > %s OR (`date_time` = %s AND `sr_no` > %s))"])
+        )
+        rows = None
+        while True:
+            with self.cursor() as cursor:
+                if rows is None:
+                    cursor.execute(first_query + order, params + [batch_size])
+                else:
+                    stamp = _mysql_time(rows[-1][1])
+                    cursor.execute(next_query + order, params + [stamp, stamp, rows[-1][0], batch_size])
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch_size:
+                return
+
+    def sync_device(self):
+        with self.cursor() as cursor:
+            cursor.execute("SELECT `value` FROM `sync_state` WHERE `key` = 'device'")
+            return cursor.fetchone()[0]
+
+    def changes_since(self, version, limit=SYNC_BATCH_SIZE, exclude=None):
+        with self.cursor() as cursor:
+            cursor.execute(MYSQL_CHANGES_SQL, (version, exclude or '', limit))
+            return [
+                (uid, ts, hours, modified, int(number), user, project)
+                for uid, ts, hours, modified, number, user, project in cursor.fetchall()
+            ]
+
+    def apply_changes(self, rows, source):
+        if not rows:
+            return 0, 0, 0
+        uids = [row[0] for row in rows]
+        with self._write_cursor() as cursor:
+            # Locks the records so a concurrent sync can't interleave
+            cursor.execute(
+                f"SELECT `uid`, {MYSQL_EPOCH}, `hourse`, `modified`, `user`, `project` FROM `working_hourse` "
+                f"WHERE `uid` IN ({','.join(['%s'] * len(uids))}) FOR UPDATE", uids
+            )
+            existing = {row[0]: row[1:] for row in cursor.fetchall()}
+            inserts, updates, skipped = merge_changes(rows, existing)
+            if inserts:
+                cursor.executemany(MYSQL_SYNC_INSERT_SQL, [
+                    (_mysql_time(ts), hours, user, project, uid, modified, source)
+                    for uid, ts, hours, user, project, modified in inserts
+                ])
+            if updates:
+                cursor.executemany(MYSQL_SYNC_UPDATE_SQL, [
+                    (_mysql_time(ts), hours, user, project, modified, source, uid)
+                    for uid, ts, hours, user, project, modified in updates
+                ])
+        return len(inserts), len(updates), skipped
+
+    def sync_marks(self, peer):
+        with self.cursor() as cursor:
+            cursor.execute("SELECT `pulled`, `pushed` FROM `sync_peers` WHERE `peer` = %s", (peer,))
+            row = cursor.fetchone()
+        return (int(row[0]), int(row[1])) if row else (0, 0)
+
+    def set_sync_marks(self, peer, pulled=None, pushed=None):
+        with self.cursor() as cursor:
+            cursor.execute(MYSQL_SET_SYNC_MARKS_SQL, (peer, pulled, pushed, pulled, pushed))
+
+    def close(self):
+        self._reset_pool()
+
+
+class MemoryBackend(StorageBackend):
+    """Records in Python structures; nothing survives the process."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}  # sr_no -> (ts, hours, user, project)
+        # (ts, sr_no) keys kept sorted, for pages and ranges
+        self._keys = []
+        self._daily = {}
+        self._monthly = {}
+        # (user, project) -> (daily, monthly) totals for that partition
+        self._partitions = {}
+        self._next_id = 1
+        # uids of records added through add_once
+        self._uids = set()
+
+    def _insert(self, ts, hours, user, project):
+        sr_no = self._next_id
+        self._next_id += 1
+        self._rows[sr_no] = (ts, hours, user, project)
+        insort(self._keys, (ts, sr_no))
+        self._count(self._daily, self._monthly, self._partitions, ts, hours, user, project)
+        return sr_no
+
+    @staticmethod
+    def _count(daily, monthly, partitions, ts, hours, user, project):
+        """Add one record to (records, hours) totals"""
+        day, month = ts // 86400, month_number(EPOCH + timedelta(seconds=ts))
+        partition_daily, partition_monthly = partitions.setdefault((user, project), ({}, {}))
+        for totals, key in ((daily, day), (partition_daily, day), (monthly, month), (partition_monthly, month)):
+            records, total = totals.get(key, (0, 0))
+            totals[key] = (records + 1, total + hours)
+
+    def _recount(self):
+        """(daily, monthly, partitions) totals recomputed from the records"""
+        daily, monthly, partitions = {}, {}, {}
+        for row in self._rows.values():
+            self._count(daily, monthly, partitions, *row)
+        return daily, monthly, partitions
+
+    @staticmethod
+    def _rollup_tables(daily, monthly, partitions):
+        """Totals keyed as in the SQLite rollup tables, values (hours, records)"""
+        tables = {
+            'daily_totals': {day: (hours, records) for day, (records, hours) in daily.items()},
+            'monthly_totals': {month: (hours, records) for month, (records, hours) in monthly.items()},
+            'partition_daily_totals': {},
+            'partition_monthly_totals': {},
+        }
+        for (user, project), totals in partitions.items():
+            for table, buckets in zip(('partition_daily_totals', 'partition_monthly_totals'), totals):
+                for key, (records, hours) in buckets.items():
+                    tables[table][user, project, key] = (hours, records)
+        return tables
+
+    def rebuild_rollups(self):
+        with self._lock:
+            self._daily, self._monthly, self._partitions = self._recount()
+
+    def verify_rollups(self):
+        with self._lock:
+            expected = self._rollup_tables(*self._recount())
+            stored = self._rollup_tables(self._daily, self._monthly, self._partitions)
+        mismatches = []
+        for table in ROLLUP_QUERIES:
+            mismatches.extend(_rollup_mismatches(table, expected[table], stored[table]))
+        return mismatches
+
+    def _totals(self, user, project):
+        """(daily, monthly) totals over the partitions matching user and project"""
+        if user is None and project is None:
+            return self._daily, self._monthly
+        daily, monthly = {}, {}
+        for (row_user, row_project), partition in self._partitions.items():
+            if user not in (None, row_user) or project not in (None, row_project):
+                continue
+            for merged, totals in zip((daily, monthly), partition):
+                for key, (records, hours) in totals.items():
+                    old_records, old_hours = merged.get(key, (0, 0))
+                    merged[key] = (old_records + records, old_hours + hours)
+        return daily, monthly
+
+    def add(self, date_time, hours, user='', project=''):
+        with self._lock:
+            return self._insert(to_epoch(date_time), hours, user, project)
+
+    def _insert_chunk(self, chunk, seen_days, user, project):
+        inserted = 0
+        with self._lock:
+            for date_time, hours in chunk:
+                ts = to_epoch(date_time)
+                if seen_days is not None and ts // 86400 in self._partitions.get((user, project), ({}, {}))[0]:
+                    continue
+                self._insert(ts, hours, user, project)
+                inserted += 1
+        return inserted
+
+    def add_once(self, records, user='', project=''):
+        inserted = 0
+        with self._lock:
+            for uid, date_time, hours in records:
+                if uid in self._uids:
+                    continue
+                self._uids.add(uid)
+                self._insert(to_epoch(date_time), hours, user, project)
+                inserted += 1
+        return inserted
+
+    def count_and_total(self, user=None, project=None):
+        with self._lock:
+            monthly = self._totals(user, project)[1]
+            return sum(records for records, _ in monthly.values()), sum(hours for _, hours in monthly.values())
+
+    def summary(self, now, user=None, project=None):
+        with self._lock:
+            daily, monthly = self._totals(user, project)
+            today = daily.get(day_number(now), (0, 0))[1]
+            month = monthly.get(month_number(now), (0, 0))[1]
+            total = sum(hours for _, hours in monthly.values())
+        return today, month, total
+
+    def breakdown(self, period='day', start=None, end=None, user=None, project=None):
+        low, high = bucket_range(period, start, end)
+        with self._lock:
+            daily, monthly = self._totals(user, project)
+            if period == 'day':
+                totals = dict(daily)
+            else:
+                totals = {}
+                for month, (records, hours) in monthly.items():
+                    key = month if period == 'month' else month // 12
+                    old_records, old_hours = totals.get(key, (0, 0))
+                    totals[key] = (old_records + records, old_hours + hours)
+        return [
+            (bucket_label(period, key), records, hours)
+            for key, (records, hours) in sorted(totals.items())
+            if (low is None or key >= low) and (high is None or key < high)
+        ]
+
+    def totals_by(self, dimension, start=None, end=None):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        low, high = bucket_range('day', start, end)
+        totals = {}
+        with self._lock:
+            for partition, (daily, monthly) in self._partitions.items():
+                key = partition[DIMENSIONS.index(dimension)]
+                if start is None and end is None:
+                    buckets = monthly.values()
+                else:
+                    buckets = [
+                        value for day, value in daily.items()
+                        if (low is None or day >= low) and (high is None or day < high)
+                    ]
+                for records, hours in buckets:
+                    old_records, old_hours = totals.get(key, (0, 0))
+                    totals[key] = (old_records + records, old_hours + hours)
+        return [(key, records, hours) for key, (records, hours) in sorted(totals.items())]
+
+    def _rows_for(self, keys):
+        return [(sr_no, ts, self._rows[sr_no][1]) for ts, sr_no in keys]
+
+    def page(self, after=None, limit=PAGE_SIZE):
+        with self._lock:
+            stop = len(self._keys) if after is None else bisect_left(self._keys, tuple(after))
+            return self._rows_for(reversed(self._keys[max(stop - limit, 0):stop]))
+
+    def newer(self, sr_no):
+        with self._lock:
+            keys = sorted(((row[0], number) for number, row in self._rows.items() if number > sr_no), reverse=True)
+            return self._rows_for(keys)
+
+    def all_rows(self):
+        with self._lock:
+            return self._rows_for(reversed(self._keys))
+
+    def iter_batches(self, start=None, end=None, batch_size=EXPORT_BATCH_SIZE, user=None, project=None):
+        with self._lock:
+            first = bisect_left(self._keys, (to_epoch(start),)) if start is not None else 0
+            stop = bisect_left(self._keys, (to_epoch(end),)) if end is not None else len(self._keys)
+            keys = self._keys[first:stop]
+            if user is not None or project is not None:
+                keys = [
+                    key for key in keys
+                    if user in (None, self._rows[key[1]][2]) and project in (None, self._rows[key[1]][3])
+                ]
+            rows = self._rows_for(keys)
+        for index in range(0, len(rows), batch_size):
+            yield rows[index:index + batch_size]
+
+
+def open_backend(config=None):
+    """Create the backend named by config['backend']: sqlite, mysql or memory"""
+    config = config or load_config()
+    kind = config['backend'].lower()
+    if kind == 'sqlite':
+        return SQLiteBackend(config['path'])
+    if kind == 'mysql':
+        return MySQLBackend(config)
+    if kind == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Unknown storage backend: {config['backend']}")
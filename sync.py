@@ -0,0 +1,284 @@
+"""Delta sync of working_hourse between two databases.
+
+Every database tracks its own changes (SQLite migrations 4 and 5, MySQL
+migrations 2 and 3): each insert or edit stamps the record with a version
+that only grows, taken from a per-database counter (per row in SQLite,
+per transaction in MySQL). A sync round between the local
+database and a peer is two loops over batches of changed rows:
+
+    push   local rows with version > pushed mark  ->  peer applies them
+    pull   peer rows with version > pulled mark   ->  local applies them
+
+The marks live in the local sync_peers table and move forward after
+every batch, so the work follows the number of changed rows rather than
+the size of the table, and an interrupted sync resumes where it stopped.
+Rows a database received from a peer are never sent back to it.
+
+Conflicts are settled per record uid: the change with the later
+`modified` time wins on both sides, and on a tie the same content wins on
+both (storage.merge_changes). The app never
+deletes records, so there are no deletions to replicate.
+
+Requests and replies are zlib-compressed JSON, whether the peer is a
+SyncEndpoint in this process (LocalTransport) or a sync server reached
+over HTTP (HttpTransport, started with `python sync.py serve`).
+
+A sync server only answers requests carrying its shared token, set as
+sync_token in db.ini or WORK_DB_SYNC_TOKEN on both ends, and listens on
+localhost unless --host says otherwise. Anyone holding the token can
+write records, so put the server behind TLS if it leaves the machine.
+
+Usage:
+    python sync.py run [--db work_tracker.db] PEER
+    python sync.py serve [--host 127.0.0.1] [--port 8765] PEER
+
+PEER is a SQLite file, `config` for the db.ini / WORK_DB_* backend, or
+for run only, the http:// URL of a sync server.
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import hmac
+import json
+import re
+import urllib.error
+import urllib.request
+import zlib
+
+from instrumentation import metrics
+from storage import DB_ERRORS, SYNC_BATCH_SIZE, SQLiteBackend, load_config, open_backend
+
+# 2: rows carry user and project
+PROTOCOL = 2
+DEFAULT_PORT = 8765
+# Device ids fit sync_peers.peer and the source columns
+DEVICE_PATTERN = re.compile(r'[0-9A-Za-z_-]{1,32}')
+
+
+class SyncError(Exception):
+    """The peer refused a request or speaks another protocol version"""
+
+
+def encode(message):
+    return zlib.compress(json.dumps(message, separators=(',', ':')).encode())
+
+
+def decode(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+class SyncEndpoint:
+    """Answers sync requests for one backend, the peer's side of a round."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _device(self, request):
+        """The requesting peer's id, checked before it is stored or matched on"""
+        device = request.get('device')
+        if not isinstance(device, str) or not DEVICE_PATTERN.fullmatch(device):
+            raise SyncError(f"Bad device id: {device!r}")
+        if device == self.backend.sync_device():
+            raise SyncError("A database can't sync with itself")
+        return device
+
+    def handle(self, payload):
+        """Reply to an encoded request with an encoded response"""
+        request = decode(payload)
+        op = request.get('op')
+        if op == 'hello':
+            reply = {'protocol': PROTOCOL, 'device': self.backend.sync_device()}
+        elif op == 'pull':
+            limit = min(int(request.get('limit', SYNC_BATCH_SIZE)), SYNC_BATCH_SIZE)
+            reply = {'rows': self.backend.changes_since(int(request['since']), limit, exclude=self._device(request))}
+        elif op == 'push':
+            device = self._device(request)
+            rows = [tuple(row) for row in request['rows']]
+            inserted, updated, skipped = self.backend.apply_changes(rows, device)
+            reply = {'inserted': inserted, 'updated': updated, 'skipped': skipped}
+        else:
+            raise SyncError(f"Unknown sync request: {op}")
+        return encode(reply)
+
+
+class Transport:
+    """Sends requests to a peer; subclasses move the encoded bytes"""
+
+    def request(self, message):
+        payload = encode(message)
+        reply = self._send(payload)
+        metrics.count('sync.bytes_sent', len(payload))
+        metrics.count('sync.bytes_received', len(reply))
+        return decode(reply)
+
+    def _send(self, payload):
+        raise NotImplementedError
+
+
+class LocalTransport(Transport):
+    """A SyncEndpoint in this process, e.g. a second SQLite file standing in for a server"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def _send(self, payload):
+        return self.endpoint.handle(payload)
+
+
+class HttpTransport(Transport):
+    """A sync server, POSTing each request to its URL with the shared token"""
+
+    def __init__(self, url, token, timeout=30):
+        if not token:
+            raise SyncError("No sync token: set sync_token in db.ini or WORK_DB_SYNC_TOKEN")
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _send(self, payload):
+        request = urllib.request.Request(self.url, data=payload, headers={
+            'Content-Type': 'application/octet-stream',
+            'Authorization': f"Bearer {self.token}",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            raise SyncError(f"Sync server error {e.code}: {e.read().decode(errors='replace')}") from e
+
+
+@metrics.timed('sync.round')
+def sync(local, transport, batch_size=SYNC_BATCH_SIZE):
+    """Push local changes to the peer behind `transport`, then pull its changes.
+
+    Returns counts of rows pushed and pulled, and what the pulled rows did
+    locally: inserted, updated, or skipped as older than what was here.
+    """
+    hello = transport.request({'op': 'hello'})
+    if hello.get('protocol') != PROTOCOL:
+        raise SyncError(f"Peer speaks sync protocol {hello.get('protocol')}, expected {PROTOCOL}")
+    device, peer = local.sync_device(), hello['device']
+    pulled, pushed = local.sync_marks(peer)
+    stats = {'pushed': 0, 'pulled': 0, 'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    with metrics.timer('sync.push'):
+        while True:
+            rows = local.changes_since(pushed, batch_size, exclude=peer)
+            if not rows:
+                break
+            transport.request({'op': 'push', 'device': device, 'rows': rows})
+            pushed = rows[-1][4]
+            local.set_sync_marks(peer, pushed=pushed)
+            stats['pushed'] += len(rows)
+            if len(rows) < batch_size:
+                break
+
+    with metrics.timer('sync.pull'):
+        while True:
+            reply = transport.request({'op': 'pull', 'device': device, 'since': pulled, 'limit': batch_size})
+            rows = [tuple(row) for row in reply['rows']]
+            if not rows:
+                break
+            inserted, updated, skipped = local.apply_changes(rows, peer)
+            pulled = rows[-1][4]
+            local.set_sync_marks(peer, pulled=pulled)
+            stats['pulled'] += len(rows)
+            stats['inserted'] += inserted
+            stats['updated'] += updated
+            stats['skipped'] += skipped
+            if len(rows) < batch_size:
+                break
+
+    metrics.count('sync.rows_pushed', stats['pushed'])
+    metrics.count('sync.rows_pulled', stats['pulled'])
+    return stats
+
+
+def make_server(endpoint, token, host='127.0.0.1', port=DEFAULT_PORT):
+    """An HTTPServer answering POSTed sync requests that carry `token`.
+
+    Call serve_forever() on it.
+    """
+    if not token:
+        raise SyncError("No sync token: set sync_token in db.ini or WORK_DB_SYNC_TOKEN")
+    expected = f"Bearer {token}".encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                if not hmac.compare_digest(self.headers.get('Authorization', '').encode(), expected):
+                    metrics.count('sync.unauthorized')
+                    reply, status = b"Missing or wrong sync token", 401
+                else:
+                    reply, status = endpoint.handle(payload), 200
+            except (SyncError, KeyError, ValueError, TypeError, zlib.error) as e:
+                reply, status = f"Bad request: {e}".encode(), 400
+            except DB_ERRORS as e:
+                metrics.error('sync.serve', e)
+                reply, status = f"Database error: {e}".encode(), 500
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    return HTTPServer((host, port), Handler)
+
+
+def open_peer(spec):
+    """Backend for a SQLite path, or `config` for the configured one"""
+    if spec == 'config':
+        return open_backend()
+    return SQLiteBackend(spec)
+
+
+if __name__ == '__main__':
+    import argparse
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Sync work tracker databases.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="sync a local SQLite database with a peer")
+    run_parser.add_argument('peer', help="SQLite file, 'config', or http:// URL of a sync server")
+    run_parser.add_argument('--db', help="local database (default: work_tracker.db next to this script)")
+    run_parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE, help="rows per request")
+    serve_parser = commands.add_parser('serve', help="answer sync requests over HTTP")
+    serve_parser.add_argument('peer', help="SQLite file or 'config' to serve")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    token = load_config()['sync_token']
+    if args.command == 'serve':
+        backend = open_peer(args.peer)
+        try:
+            server = make_server(SyncEndpoint(backend), token, args.host, args.port)
+        except SyncError as e:
+            backend.close()
+            print(e)
+            raise SystemExit(1)
+        print(f"Serving {args.peer} on http://{args.host}:{args.port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            backend.close()
+    else:
+        local = SQLiteBackend(args.db or DatabaseManager.get_db_path())
+        remote = None
+        try:
+            if args.peer.startswith(('http://', 'https://')):
+                transport = HttpTransport(args.peer, token)
+            else:
+                remote = open_peer(args.peer)
+                transport = LocalTransport(SyncEndpoint(remote))
+            stats = sync(local, transport, args.batch_size)
+            print(", ".join(f"{name} {count}" for name, count in stats.items()))
+        except (SyncError, OSError) + DB_ERRORS as e:
+            print(f"Sync failed: {e}")
+            raise SystemExit(1)
+        finally:
+            local.close()
+            if remote is not None:
+                remote.close()
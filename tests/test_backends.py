@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import MemoryBackend, SQLiteBackend, load_config, open_backend, to_epoch
+
+START = datetime(2024, 12, 30, 9)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    backend = MemoryBackend() if request.param == 'memory' else SQLiteBackend(str(tmp_path / 'work.db'))
+    # Five days over a month and a year boundary, two users, two projects
+    for day in range(5):
+        backend.add(START + timedelta(days=day), day + 1, user='ann' if day % 2 else 'bob', project='site')
+    backend.add(START, 10, user='ann', project='office')
+    yield backend
+    backend.close()
+
+
+def test_summary_and_totals(backend):
+    assert backend.count_and_total() == (6, 25)
+    assert backend.summary(START) == (11, 13, 25)
+    assert backend.summary(START, user='ann') == (10, 12, 16)
+    assert backend.count_and_total(project='site') == (5, 15)
+
+
+def test_breakdown_per_period(backend):
+    assert backend.breakdown('year') == [('2024', 3, 13), ('2025', 3, 12)]
+    assert backend.breakdown('month', user='bob') == [('2024-12', 1, 1), ('2025-01', 2, 8)]
+    # Buckets overlapping the range count in full
+    assert backend.breakdown('day', START + timedelta(days=1), START + timedelta(days=2, hours=1)) == [
+        ('2024-12-31', 1, 2), ('2025-01-01', 1, 3),
+    ]
+
+
+def test_totals_by(backend):
+    assert backend.totals_by('user') == [('ann', 3, 16), ('bob', 3, 9)]
+    assert backend.totals_by('project', START + timedelta(days=2)) == [('site', 3, 12)]
+    with pytest.raises(ValueError):
+        backend.totals_by('device')
+
+
+def test_pages_walk_newest_first_without_gaps(backend):
+    seen = []
+    after = None
+    while True:
+        page = backend.page(after, limit=4)
+        if not page:
+            break
+        seen.extend(page)
+        sr_no, ts, _ = page[-1]
+        after = (ts, sr_no)
+    assert seen == backend.all_rows()
+    assert [ts for _, ts, _ in seen] == sorted((ts for _, ts, _ in seen), reverse=True)
+    assert [sr_no for sr_no, _, _ in backend.newer(4)] == [5, 6]
+
+
+def test_iter_batches_in_time_order(backend):
+    batches = list(backend.iter_batches(START + timedelta(days=1), batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert [hours for batch in batches for _, _, hours in batch] == [2, 3, 4, 5]
+    rows = [row for batch in backend.iter_batches(user='ann', project='office') for row in batch]
+    assert rows == [(6, to_epoch(START), 10)]
+
+
+def test_add_once_skips_stored_uids(backend):
+    records = [('a', START, 1), ('b', START, 2)]
+    assert backend.add_once(records) == 2
+    assert backend.add_once(records + [('c', START, 3)]) == 1
+    assert backend.count_and_total() == (9, 31)
+
+
+def test_open_backend_from_config(tmp_path):
+    config = dict(load_config(), backend='sqlite', path=str(tmp_path / 'work.db'))
+    backend = open_backend(config)
+    assert isinstance(backend, SQLiteBackend)
+    backend.close()
+    assert isinstance(open_backend(dict(config, backend='Memory')), MemoryBackend)
+    with pytest.raises(ValueError):
+        open_backend(dict(config, backend='postgres'))
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager, RecordSet, SummaryCache
+from storage import MemoryBackend, to_epoch
+
+NOW = datetime(2024, 5, 15, 12, 0)
+
+
+@pytest.fixture
+def manager():
+    backend = MemoryBackend()
+    DatabaseManager.use_backend(backend)
+    yield backend
+    DatabaseManager.use_backend(None)
+
+
+def test_summary_is_keyed_by_day_and_month():
+    cache = SummaryCache()
+    cache.set_summary(NOW, (1, 2, 3), cache.generation)
+
+    assert cache.get_summary(NOW + timedelta(hours=1)) == (1, 2, 3)
+    assert cache.get_summary(NOW + timedelta(days=1)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_add_record_writes_through_to_the_summary():
+    cache = SummaryCache()
+    cache.set_summary(NOW, (1, 2, 3), cache.generation)
+
+    cache.add_record(1, NOW, 4)
+    assert cache.get_summary(NOW) == (5, 6, 7)
+    cache.add_record(2, NOW - timedelta(days=1), 4)
+    assert cache.get_summary(NOW) == (5, 10, 11)
+    cache.add_record(3, NOW - timedelta(days=40), 4)
+    assert cache.get_summary(NOW) == (5, 10, 15)
+
+
+def test_add_record_prepends_new_records_and_drops_back_dated_ones():
+    cache = SummaryCache()
+    cache.set_records(RecordSet([1], [to_epoch(NOW)], [8]), cache.generation)
+
+    cache.add_record(2, NOW + timedelta(hours=1), 2)
+    assert list(cache.get_records().ids) == [2, 1]
+    cache.add_record(3, NOW - timedelta(days=1), 2)
+    assert cache.get_records() is None
+
+
+def test_read_started_before_a_write_is_not_cached():
+    cache = SummaryCache()
+    generation = cache.generation
+    cache.add_record(1, NOW, 4)
+
+    cache.set_summary(NOW, (0, 0, 0), generation)
+    cache.set_records(RecordSet(), generation)
+    assert cache.get_summary(NOW) is None
+    assert cache.get_records() is None
+    assert cache.stats()['stale'] == 2
+
+
+def test_writes_drop_cached_reports():
+    cache = SummaryCache()
+    cache.set_report('week', object(), cache.generation)
+    cache.add_record(1, NOW, 4)
+    assert cache.get_report('week') is None
+
+
+def test_manager_cache_matches_the_backend_after_writes(manager):
+    now = datetime.now().replace(microsecond=0)
+    assert DatabaseManager.get_summary() == (0, 0, 0)
+    assert len(DatabaseManager.read_from_db()) == 0
+
+    assert DatabaseManager.write_to_db(now, 3)
+    assert DatabaseManager.get_summary() == manager.summary(now) == (3, 3, 3)
+    assert list(DatabaseManager.read_from_db()) == [(1, now, 3)]
+
+    DatabaseManager.write_many([(now - timedelta(days=400), 5)])
+    assert DatabaseManager.get_summary() == (3, 3, 8)
+    assert [row[0] for row in DatabaseManager.read_from_db()] == [1, 2]
+
+
+def test_manager_write_many_reports_a_database_failure(manager, monkeypatch):
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(manager, 'add_many', locked)
+    assert DatabaseManager.write_many([(NOW, 5)]) is None
+
+
+def test_manager_hands_out_copies_of_cached_records(manager):
+    DatabaseManager.write_to_db(datetime.now(), 3)
+    records = DatabaseManager.read_from_db()
+    records.extend(RecordSet([9], [0], [1]))
+    assert len(DatabaseManager.read_from_db()) == 1
@@ -0,0 +1,158 @@
+from datetime import datetime
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from records_io import read_records
+from storage import SQLiteBackend
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'work.db')
+
+
+def run(db_path, *args, input=None):
+    env = dict(os.environ, WORK_DB_BACKEND='sqlite', WORK_DB_PATH=db_path)
+    return subprocess.run(
+        [sys.executable, MAIN_SCRIPT, *args], input=input, capture_output=True, text=True, env=env, timeout=60,
+    )
+
+
+def test_add_and_summary(db_path):
+    assert run(db_path, 'add', '6', '--at', '2024-03-04 09:30').stdout == "Recorded 6 at 2024-03-04 09:30:00\n"
+    assert run(db_path, '--user', 'ann', 'add', '3').returncode == 0
+
+    lines = run(db_path, 'summary').stdout.splitlines()
+    assert lines[:2] == ["Total records: 2", "Total hours: 9"]
+    assert lines[3] == "Today: 3"
+    assert run(db_path, 'summary', '--user', 'ann').stdout.splitlines()[:2] == ["Total records: 1", "Total hours: 3"]
+
+
+def test_add_rejects_hours_out_of_range(db_path):
+    result = run(db_path, 'add', '25')
+    assert result.returncode == 1
+    assert result.stdout.startswith("Error: hours must be between 1 and 24")
+    assert SQLiteBackend(db_path).count_and_total() == (0, 0)
+
+
+def test_add_many_from_standard_input(db_path):
+    rows = "".join(f"2024-03-{day:02d} 09:00,{day}\n" for day in range(1, 6))
+    result = run(db_path, '--project', 'site', 'add-many', '--chunk-size', '2', input="date_time,hours\n" + rows)
+    assert result.returncode == 0
+    assert result.stdout.startswith("Added 5 records")
+
+    result = run(db_path, 'add-many', '--dedup', '--project', 'site', input="date_time,hours\n2024-03-01 17:00,4\n")
+    assert result.stdout.startswith("Added 0 records")
+    assert SQLiteBackend(db_path).totals_by('project') == [('site', 5, 15)]
+
+
+def test_add_many_fails_on_a_missing_file(db_path, tmp_path):
+    result = run(db_path, 'add-many', str(tmp_path / 'missing.csv'))
+    assert result.returncode == 1
+    assert result.stdout.startswith("Error reading")
+
+
+def test_table_export_report_and_totals(db_path, tmp_path):
+    backend = SQLiteBackend(db_path)
+    for day in range(1, 11):
+        backend.add(datetime(2024, 3, day, 9), 9, user='ann' if day % 2 else 'bob')
+    backend.close()
+
+    table = run(db_path, 'table', '--page-size', '0', '--from', '2024-03-09').stdout.splitlines()
+    assert [line.split()[1] for line in table[2:]] == ['2024-03-09', '2024-03-10']
+
+    out = str(tmp_path / 'bob.jsonl')
+    assert run(db_path, '--user', 'bob', 'export', out, '--to', '2024-03-04').stdout == "Exported 2 records\n"
+    assert [date_time.day for date_time, _ in read_records(out)] == [2, 4]
+
+    report = run(db_path, 'report', 'month', '--overtime', '8').stdout.splitlines()
+    assert report[2].split() == ['2024-03', '10', '90', '9.0', '10']
+
+    totals = run(db_path, 'totals', 'user', '--from', '2024-03-01', '--to', '2024-03-03').stdout.splitlines()
+    assert totals[0].split() == ['User', 'Records', 'Hours']
+    assert [line.split() for line in totals[2:]] == [['ann', '2', '18'], ['bob', '1', '9']]
+
+
+def test_export_fails_on_an_unwritable_path(db_path, tmp_path):
+    result = run(db_path, 'export', str(tmp_path / 'missing' / 'out.csv'))
+    assert result.returncode == 1
+    assert result.stdout.startswith("Error writing")
+
+
+def test_bad_arguments_exit_with_usage(db_path):
+    result = run(db_path, 'table', '--from', '03/04/2024')
+    assert result.returncode == 2
+    assert "expected YYYY-MM-DD" in result.stderr
+
+
+def test_add_many_rejects_a_chunk_size_below_one(db_path):
+    result = run(db_path, 'add-many', '--chunk-size', '0', input="date_time,hours\n2024-03-01 09:00,4\n")
+    assert result.returncode == 2
+    assert "at least 1" in result.stderr
+
+
+def test_report_rejects_a_window_below_one(db_path):
+    assert run(db_path, 'add', '6').returncode == 0
+    result = run(db_path, 'report', '--window', '0')
+    assert result.returncode == 2
+    assert "at least 1" in result.stderr
+
+
+def test_report_rejects_a_negative_overtime_threshold(db_path):
+    result = run(db_path, 'report', '--overtime', '-1')
+    assert result.returncode == 2
+    assert "at least 0" in result.stderr
+    assert run(db_path, 'report', '--overtime', '0').returncode == 0
+
+
+def test_interactive_session(db_path):
+    result = run(db_path, '--user', 'ann', input="abc\n30\n5\nno\nyes\n7\nno\nno\n")
+    assert result.returncode == 0
+    out = result.stdout
+    assert "Invalid input. Please enter an integer." in out
+    assert "Please enter valid hours: hours must be between 1 and 24, got 30." in out
+    assert "Your total records are 1 and total hours are 5" in out
+    assert "Your total records are 2 and total hours are 12" in out
+    # The save is acknowledged after the next question, not before it
+    assert out.index("Do you want to see the working hours table?") < out.index("Saved 5 hours at")
+    assert SQLiteBackend(db_path).count_and_total(user='ann') == (2, 12)
+
+
+def test_interactive_end_of_input_keeps_the_last_save(db_path):
+    result = run(db_path, input="6\n")
+    assert result.returncode == 0
+    assert "Saved 6 hours at" in result.stdout
+    assert "Traceback" not in result.stderr
+    assert SQLiteBackend(db_path).count_and_total() == (1, 6)
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGINT') or os.name != 'posix', reason="needs POSIX signals")
+def test_interactive_ctrl_c_at_the_prompt_exits(db_path):
+    env = dict(os.environ, WORK_DB_BACKEND='sqlite', WORK_DB_PATH=db_path)
+    process = subprocess.Popen(
+        [sys.executable, MAIN_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, env=env,
+    )
+    process.stdin.write("4\nno\nyes\n")
+    process.stdin.flush()
+    # Wait for the second round's prompt, with stdin still open
+    deadline = time.monotonic() + 30
+    while SQLiteBackend(db_path).count_and_total() != (1, 4) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    time.sleep(0.5)
+    process.send_signal(signal.SIGINT)
+    try:
+        out, err = process.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        pytest.fail("main.py did not exit on Ctrl-C")
+    assert process.returncode == 0, err
+    assert "Saved 4 hours at" in out
+    assert "Traceback" not in err
@@ -0,0 +1,162 @@
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+from storage import EXPORT_SQL, MIGRATIONS, NEXT_PAGE_SQL, SQLiteBackend, migrate, to_epoch
+
+# The database shipped with the app, still at schema version 0
+SHIPPED_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'work_tracker.db')
+
+
+def test_shipped_database_migrates_to_current_schema(tmp_path):
+    path = str(tmp_path / 'work_tracker.db')
+    shutil.copy(SHIPPED_DB, path)
+
+    backend = SQLiteBackend(path)
+    assert backend.migrate() == len(MIGRATIONS)
+
+    assert backend.count_and_total() == (8, 38)
+    assert backend.breakdown('day') == [('2024-12-01', 8, 38)]
+    assert backend.breakdown('month') == [('2024-12', 8, 38)]
+    assert backend.totals_by('user') == [('', 8, 38)]
+    assert backend.verify_rollups() == []
+
+    # Every old record can be synced
+    changes = backend.changes_since(0)
+    assert len(changes) == 8
+    assert len({uid for uid, *_ in changes}) == 8
+    backend.close()
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+
+
+def test_baseline_rows_keep_their_ids_and_times(tmp_path):
+    path = str(tmp_path / 'work_tracker.db')
+    shutil.copy(SHIPPED_DB, path)
+    with sqlite3.connect(path) as connection:
+        original = connection.execute("SELECT sr_no, date_time, hourse FROM working_hourse").fetchall()
+
+    backend = SQLiteBackend(path)
+    expected = [
+        (sr_no, to_epoch(datetime.strptime(date_time, '%Y-%m-%d %H:%M:%S')), hours)
+        for sr_no, date_time, hours in original
+    ]
+    assert sorted(backend.all_rows()) == expected
+    with backend.pool.reader() as connection:
+        # date_time stays readable in the old text format
+        rows = connection.execute("SELECT sr_no, date_time, hourse FROM working_hourse ORDER BY sr_no").fetchall()
+    assert rows == original
+    backend.close()
+
+
+def test_baseline_rows_without_values_migrate_as_zero(tmp_path):
+    path = str(tmp_path / 'old.db')
+    with sqlite3.connect(path) as connection:
+        connection.executescript(MIGRATIONS[0])
+        connection.execute("INSERT INTO working_hourse (date_time, hourse) VALUES ('2024-12-02 08:00:00', NULL)")
+        connection.execute("INSERT INTO working_hourse (date_time, hourse) VALUES (NULL, 4)")
+
+    backend = SQLiteBackend(path)
+    assert sorted(backend.all_rows()) == [(1, to_epoch(datetime(2024, 12, 2, 8)), 0), (2, 0, 4)]
+    assert backend.verify_rollups() == []
+    backend.close()
+
+
+def test_reopening_a_current_database_changes_nothing(tmp_path):
+    path = str(tmp_path / 'work.db')
+    backend = SQLiteBackend(path)
+    backend.add(datetime(2024, 1, 1, 9), 8)
+    backend.close()
+
+    backend = SQLiteBackend(path)
+    assert backend.migrate() == len(MIGRATIONS)
+    assert backend.count_and_total() == (1, 8)
+    backend.close()
+
+
+def test_time_range_queries_use_the_ts_index(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    with backend.pool.reader() as connection:
+        for sql, params in ((NEXT_PAGE_SQL, (0, 0, 10)), (EXPORT_SQL, {'low': 0, 'high': 1})):
+            plan = " ".join(row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, params))
+            assert "idx_working_hourse_ts" in plan
+    backend.close()
+
+
+def test_rollups_follow_writes_after_migration(tmp_path):
+    path = str(tmp_path / 'work_tracker.db')
+    shutil.copy(SHIPPED_DB, path)
+    backend = SQLiteBackend(path)
+
+    with backend.pool.writer() as connection:
+        connection.execute("UPDATE working_hourse SET hourse = hourse + 1 WHERE sr_no = 1")
+        connection.execute("DELETE FROM working_hourse WHERE sr_no = 2")
+
+    assert backend.verify_rollups() == []
+    backend.close()
+
+
+class StaleVersion:
+    """A connection whose first user_version read predates another process's migration"""
+
+    def __init__(self, connection, version):
+        self.connection = connection
+        self.stale = version
+
+    def execute(self, sql, *params):
+        if sql == "PRAGMA user_version" and self.stale is not None:
+            version, self.stale = self.stale, None
+            return self.connection.execute("SELECT ?", (version,))
+        return self.connection.execute(sql, *params)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+def test_stale_version_read_does_not_replay_migrations(tmp_path):
+    path = str(tmp_path / 'work_tracker.db')
+    shutil.copy(SHIPPED_DB, path)
+    SQLiteBackend(path).close()
+
+    connection = sqlite3.connect(path)
+    assert migrate(StaleVersion(connection, 1)) == len(MIGRATIONS)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(working_hourse)")]
+    assert {'uid', 'user', 'project'} <= set(columns)
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    connection.close()
+
+    backend = SQLiteBackend(path)
+    assert backend.count_and_total() == (8, 38)
+    assert backend.verify_rollups() == []
+    backend.close()
+
+
+def test_concurrent_opens_migrate_once(tmp_path):
+    path = str(tmp_path / 'work_tracker.db')
+    shutil.copy(SHIPPED_DB, path)
+    versions, errors = [], []
+
+    def open_and_migrate():
+        connection = sqlite3.connect(path, timeout=30)
+        try:
+            versions.append(migrate(connection))
+        except sqlite3.Error as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=open_and_migrate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert versions == [len(MIGRATIONS)] * 4
+    backend = SQLiteBackend(path)
+    assert backend.count_and_total() == (8, 38)
+    assert backend.verify_rollups() == []
+    backend.close()
@@ -0,0 +1,131 @@
+"""Against a real MySQL server; skipped unless WORK_DB_TEST_MYSQL names a scratch database.
+
+The tables in that database are dropped before every test. The server is
+the one in db.ini / WORK_DB_* (host, port, user, password).
+"""
+from datetime import datetime, timedelta
+import os
+import threading
+
+import pytest
+
+from storage import DB_ERRORS, MYSQL_INSERT_SQL, MYSQL_MIGRATIONS, SQLiteBackend, load_config, mysql, open_backend
+from sync import LocalTransport, SyncEndpoint, sync
+
+TEST_DATABASE = os.environ.get('WORK_DB_TEST_MYSQL')
+LATEST = len(MYSQL_MIGRATIONS) + 1
+START = datetime(2024, 1, 1, 9)
+
+pytestmark = pytest.mark.skipif(
+    mysql is None or not TEST_DATABASE, reason="set WORK_DB_TEST_MYSQL to a scratch MySQL database"
+)
+
+
+def open_server():
+    return open_backend(dict(load_config(), backend='mysql', database=TEST_DATABASE))
+
+
+@pytest.fixture
+def empty():
+    backend = open_server()
+    with backend.cursor(check=False) as cursor:
+        for table in ('working_hourse', 'sync_state', 'sync_peers'):
+            cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def server(empty):
+    empty.migrate()
+    return empty
+
+
+def test_opening_leaves_the_schema_alone(empty):
+    with pytest.raises(DB_ERRORS, match="database.py migrate --mysql"):
+        empty.count_and_total()
+    with empty.cursor(check=False) as cursor:
+        cursor.execute("SHOW TABLES")
+        assert cursor.fetchall() == []
+
+
+def test_migrate_is_repeatable_and_serialised(empty):
+    versions = []
+
+    def migrate():
+        backend = open_server()
+        try:
+            versions.append(backend.migrate())
+        finally:
+            backend.close()
+
+    threads = [threading.Thread(target=migrate) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert versions == [LATEST] * 3
+    assert open_server().migrate() == LATEST
+    assert empty.count_and_total() == (0, 0)
+
+
+def test_versions_are_stamped_per_transaction(server):
+    server.add_many(((START + timedelta(days=day), 2) for day in range(6)), chunk_size=4)
+    server.add(START + timedelta(days=10), 3)
+
+    versions = [row[4] for row in server.changes_since(0)]
+    assert len(versions) == 7
+    assert versions == sorted(set(versions))
+    assert all(version > 0 for version in versions)
+    # One counter value per chunk, one for the single add
+    assert len({version >> 32 for version in versions}) == 3
+
+
+def test_add_once_skips_stored_uids(server):
+    records = [('queued-1', START, 4), ('queued-2', START + timedelta(days=1), 5)]
+    assert server.add_once(records) == 2
+    assert server.add_once(records) == 0
+    assert server.count_and_total() == (2, 9)
+
+
+def test_any_error_in_a_cursor_rolls_back(server):
+    with pytest.raises(TypeError):
+        with server.cursor() as cursor:
+            cursor.execute(MYSQL_INSERT_SQL, (START, 4, "", ""))
+            raise TypeError("not a database error")
+    assert server.count_and_total() == (0, 0)
+
+
+def test_iter_batches_in_time_order(server):
+    server.add_many([(START + timedelta(days=day), day + 1) for day in (3, 0, 2, 1, 4)])
+
+    batches = list(server.iter_batches(batch_size=2))
+
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    assert [row[2] for rows in batches for row in rows] == [1, 2, 3, 4, 5]
+
+
+def test_sync_with_sqlite(server, tmp_path):
+    local = SQLiteBackend(str(tmp_path / 'local.db'))
+    local.add_many((START + timedelta(days=day), 2) for day in range(3))
+    server.add_many((START + timedelta(days=10 + day), 5) for day in range(2))
+    transport = LocalTransport(SyncEndpoint(server))
+
+    stats = sync(local, transport)
+    assert (stats['pushed'], stats['pulled']) == (3, 2)
+    assert local.count_and_total() == server.count_and_total() == (5, 16)
+
+    # A tie on modified settles on the same content on both sides
+    uid = local.changes_since(0)[0][0]
+    # An edit gets the current time; the second statement pins it
+    with local.pool.writer() as connection:
+        connection.execute("UPDATE working_hourse SET hourse = 9 WHERE uid = ?", (uid,))
+        connection.execute("UPDATE working_hourse SET modified = 2000000100 WHERE uid = ?", (uid,))
+    with server.cursor() as cursor:
+        cursor.execute("UPDATE `working_hourse` SET `hourse` = 7 WHERE `uid` = %s", (uid,))
+        cursor.execute("UPDATE `working_hourse` SET `modified` = 2000000100 WHERE `uid` = %s", (uid,))
+    sync(local, transport)
+    sync(local, transport)
+    assert local.count_and_total() == server.count_and_total() == (5, 23)
+    local.close()
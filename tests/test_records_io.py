@@ -0,0 +1,177 @@
+from datetime import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from records_io import read_records, read_stream, write_records
+from storage import MemoryBackend, SQLiteBackend, to_epoch
+
+DAY = datetime(2024, 3, 4, 9, 30)
+DATABASE_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database.py')
+
+
+def test_csv_skips_hours_out_of_range(tmp_path, capsys):
+    path = tmp_path / 'records.csv'
+    path.write_text("date_time,hours\n2024-03-04 09:30:00,8\n2024-03-05,0\n2024-03-06,25\n")
+
+    assert list(read_records(str(path))) == [(DAY, 8)]
+    assert "records.csv:3" in capsys.readouterr().out
+
+
+def test_json_skips_hours_out_of_range(tmp_path, capsys):
+    path = tmp_path / 'records.json'
+    path.write_text(json.dumps([
+        {'date_time': '2024-03-04 09:30:00', 'hours': 8},
+        {'date': '2024-03-05', 'hourse': -1},
+    ]))
+
+    assert list(read_records(str(path))) == [(DAY, 8)]
+    assert "records.json:2" in capsys.readouterr().out
+
+
+def test_jsonl_skips_hours_out_of_range(tmp_path, capsys):
+    path = tmp_path / 'records.jsonl'
+    path.write_text('{"date_time": "2024-03-05", "hours": 30}\n{"date_time": "2024-03-04 09:30", "hours": 8}\n')
+
+    assert list(read_records(str(path))) == [(DAY, 8)]
+    assert "records.jsonl:1" in capsys.readouterr().out
+
+
+def test_whr_skips_hours_out_of_range(tmp_path, capsys):
+    path = tmp_path / 'records.whr'
+    ts = to_epoch(DAY)
+    write_records([[(1, ts, 8), (2, ts, 0)], [(3, ts, 99)]], str(path))
+
+    assert list(read_records(str(path))) == [(DAY, 8)]
+    out = capsys.readouterr().out
+    assert "records.whr:row 2" in out and "records.whr:row 3" in out
+
+
+def test_old_column_names_and_bad_rows(capsys):
+    stream = io.StringIO("date,hourse\n2024-03-04T09:30,8\nnot a date,3\n2024-03-05,\n")
+    assert list(read_stream(stream, 'csv')) == [(DAY, 8)]
+    out = capsys.readouterr().out
+    assert "<stdin>:3" in out and "<stdin>:4" in out
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        list(read_stream(io.StringIO(""), 'xml'))
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_add_many_dedup_skips_days_already_recorded(kind, tmp_path):
+    backend = MemoryBackend() if kind == 'memory' else SQLiteBackend(str(tmp_path / 'work.db'))
+    backend.add(DAY, 8)
+    records = [(DAY.replace(hour=14), 2), (datetime(2024, 3, 5, 9), 6), (datetime(2024, 3, 5, 15), 1)]
+
+    assert backend.add_many(records, chunk_size=1, dedup=True) == 1
+    assert backend.count_and_total() == (2, 14)
+    # Another user's day is their own
+    assert backend.add_many(records, dedup=True, user='ann') == 2
+    backend.close()
+
+
+def test_add_many_rejects_a_chunk_size_below_one():
+    backend = MemoryBackend()
+    with pytest.raises(ValueError):
+        backend.add_many([(DAY, 8)], chunk_size=0)
+    assert backend.count_and_total() == (0, 0)
+
+
+def test_import_command_loads_a_csv_file(tmp_path):
+    source = tmp_path / 'records.csv'
+    source.write_text("date_time,hours\n" + "".join(f"2024-03-{day:02d} 09:00:00,8\n" for day in range(1, 11)))
+    path = str(tmp_path / 'work.db')
+
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'import', str(source), '--db', path, '--chunk-size', '3'],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0
+    assert "Imported 10 records" in result.stdout
+    backend = SQLiteBackend(path)
+    assert backend.count_and_total() == (10, 80)
+    assert backend.verify_rollups() == []
+    backend.close()
+
+
+def test_import_command_takes_the_format_option(tmp_path):
+    source = tmp_path / 'records.txt'
+    source.write_text(json.dumps([{'date_time': '2024-03-04 09:30:00', 'hours': 8}]))
+    path = str(tmp_path / 'work.db')
+
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'import', str(source), '--db', path, '--format', 'json'],
+        capture_output=True, text=True,
+    )
+    assert "Imported 1 records" in result.stdout
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'export', str(tmp_path / 'out.json'), '--db', path, '--format', 'json'],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 2
+    assert "json can only be imported" in result.stderr
+
+
+def test_import_command_fails_on_a_missing_file(tmp_path):
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'import', str(tmp_path / 'missing.csv'), '--db', str(tmp_path / 'work.db')],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 1
+    assert "Error reading" in result.stdout
+    assert "Traceback" not in result.stderr
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl', 'whr'])
+def test_export_round_trips(fmt, tmp_path):
+    records = [(datetime(2024, 3, day, 9, day, day), day % 24 + 1) for day in range(1, 31)]
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    backend.add_many(records)
+    path = str(tmp_path / f'records.{fmt}')
+
+    # Several batches, so every block and row boundary is crossed
+    assert write_records(backend.iter_batches(batch_size=7), path) == 30
+    assert list(read_records(path)) == records
+
+    copy = SQLiteBackend(str(tmp_path / 'copy.db'))
+    copy.add_many(read_records(path))
+    assert copy.breakdown('day') == backend.breakdown('day')
+    backend.close()
+    copy.close()
+
+
+def test_export_command_limits_to_the_given_days(tmp_path):
+    path = str(tmp_path / 'work.db')
+    backend = SQLiteBackend(path)
+    backend.add_many((datetime(2024, 3, day, 9), 8) for day in range(1, 11))
+    backend.close()
+    out = str(tmp_path / 'march.csv')
+
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'export', out, '--db', path, '--from', '2024-03-03', '--to', '2024-03-05'],
+        capture_output=True, text=True,
+    )
+    assert "Exported 3 records" in result.stdout
+    assert [date_time.day for date_time, _ in read_records(out)] == [3, 4, 5]
+
+
+def test_export_command_fails_on_an_unwritable_path(tmp_path):
+    result = subprocess.run(
+        [sys.executable, DATABASE_SCRIPT, 'export', str(tmp_path / 'missing' / 'out.csv'),
+         '--db', str(tmp_path / 'work.db')],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 1
+    assert "Error exporting records" in result.stdout
+    assert "Traceback" not in result.stderr
+
+
+def test_unknown_export_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_records([], str(tmp_path / 'records.xml'))
@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from reports import Report, build_report, format_report, summary_lines
+from storage import MemoryBackend
+
+# Mon 2024-01-29 to Fri 2024-02-02, a gap, then Mon 2024-02-05 and Tue 2024-02-06
+DAYS = [
+    ('2024-01-29', 1, 8), ('2024-01-30', 2, 10), ('2024-01-31', 1, 6),
+    ('2024-02-01', 1, 8), ('2024-02-02', 1, 9), ('2024-02-05', 1, 4), ('2024-02-06', 3, 12),
+]
+TODAY = date(2024, 2, 7)
+
+
+def test_weekly_buckets_and_totals():
+    report = build_report(DAYS, 'week', today=TODAY)
+    assert report.buckets == [['2024-W05', 5, 6, 41, 3], ['2024-W06', 2, 4, 16, 4]]
+    assert (report.days, report.records, report.hours) == (7, 10, 57)
+    assert (report.overtime, report.overtime_days) == (7, 3)
+    assert report.average_per_day == pytest.approx(57 / 7)
+    assert report.average_per_period == 28.5
+
+
+def test_monthly_and_yearly_buckets():
+    assert [bucket[0] for bucket in build_report(DAYS, 'month', today=TODAY).buckets] == ['2024-01', '2024-02']
+    assert build_report(DAYS, 'year', today=TODAY).buckets == [['2024', 7, 10, 57, 7]]
+    with pytest.raises(ValueError):
+        build_report(DAYS, 'fortnight')
+
+
+def test_streaks_and_rolling_window():
+    report = build_report(DAYS, today=TODAY)
+    assert report.longest_streak == (5, date(2024, 1, 29), date(2024, 2, 2))
+    # Yesterday was worked, so the streak still counts today
+    assert report.current_streak == 2
+    # 2024-02-01 to 2024-02-07
+    assert report.rolling == 33
+    assert report.best_window == (41, date(2024, 2, 2))
+
+    assert build_report(DAYS, today=TODAY + timedelta(days=1)).current_streak == 0
+
+
+def test_overtime_threshold_and_window_are_parameters():
+    report = build_report(DAYS, overtime=9, window=2, today=TODAY)
+    assert (report.overtime, report.overtime_days) == (4, 2)
+    assert report.rolling == 12
+    with pytest.raises(ValueError):
+        build_report(DAYS, window=0, today=TODAY)
+    with pytest.raises(ValueError):
+        build_report(DAYS, overtime=-1, today=TODAY)
+
+
+def test_empty_report():
+    report = build_report([], today=TODAY)
+    assert report.buckets == [] and report.average_per_day == 0 and report.average_per_period == 0
+    assert "Longest streak: 0 days" in summary_lines(report)
+    assert format_report(Report('week')).count("\n") == len(summary_lines(report)) + 2
+
+
+def test_report_from_a_backend_matches_its_records():
+    backend = MemoryBackend()
+    start = datetime(2024, 1, 29, 9)
+    for day in range(5):
+        backend.add(start + timedelta(days=day), 8)
+    backend.add(start, 3)
+
+    report = build_report(backend.breakdown('day'), 'month', today=date(2024, 2, 2))
+    assert report.buckets == [['2024-01', 3, 4, 27, 3], ['2024-02', 2, 2, 16, 0]]
+    assert report.current_streak == 5
+    text = format_report(report)
+    assert text.splitlines()[2].split() == ['2024-01', '3', '27', '9.0', '3']
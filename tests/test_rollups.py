@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+import os
+import subprocess
+import sys
+
+import pytest
+
+from database import DatabaseManager
+from storage import MemoryBackend, SQLiteBackend, day_number, month_number
+
+DATABASE_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database.py')
+
+START = datetime(2024, 1, 30, 9, 0)
+
+
+def add_records(backend):
+    backend.add_many((START + timedelta(days=day), 8) for day in range(4))
+    backend.add(START, 2, user='ann', project='site')
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def manager():
+    yield DatabaseManager
+    DatabaseManager.use_backend(None)
+
+
+def test_memory_rollups_verify_clean():
+    backend = MemoryBackend()
+    add_records(backend)
+    assert backend.verify_rollups() == []
+
+
+def test_memory_rebuild_repairs_drifted_rollups():
+    backend = MemoryBackend()
+    add_records(backend)
+    day = day_number(START)
+    backend._daily[day] = (9, 99)
+    backend._partitions['ann', 'site'][0].clear()
+
+    assert backend.verify_rollups() == [
+        ('daily_totals', day, (10, 2), (99, 9)),
+        ('partition_daily_totals', ('ann', 'site', day), (2, 1), None),
+    ]
+    backend.rebuild_rollups()
+    assert backend.verify_rollups() == []
+    assert backend.summary(START) == (10, 18, 34)
+
+
+def test_manager_rollup_commands_on_memory_backend(manager):
+    backend = MemoryBackend()
+    add_records(backend)
+    manager.use_backend(backend)
+
+    assert manager.rebuild_rollups() is True
+    assert manager.verify_rollups() == []
+
+
+def test_sqlite_triggers_follow_inserts_updates_and_deletes(sqlite):
+    add_records(sqlite)
+    with sqlite.pool.writer() as connection:
+        # Across a month boundary and to another user
+        connection.execute("UPDATE working_hourse SET ts = ts + 2 * 86400, user = 'bob' WHERE sr_no = 1")
+        connection.execute("UPDATE working_hourse SET hourse = 6 WHERE sr_no = 2")
+        connection.execute("DELETE FROM working_hourse WHERE sr_no = 4")
+
+    assert sqlite.verify_rollups() == []
+    assert sqlite.breakdown('month') == [('2024-01', 2, 8), ('2024-02', 2, 16)]
+    assert sqlite.breakdown('day') == [('2024-01-30', 1, 2), ('2024-01-31', 1, 6), ('2024-02-01', 2, 16)]
+    assert sqlite.totals_by('user') == [('', 2, 14), ('ann', 1, 2), ('bob', 1, 8)]
+
+
+def test_sqlite_last_record_of_a_day_removes_its_rollup_rows(sqlite):
+    sr_no = sqlite.add(START, 8, user='ann')
+    with sqlite.pool.writer() as connection:
+        connection.execute("DELETE FROM working_hourse WHERE sr_no = ?", (sr_no,))
+        tables = ('daily_totals', 'monthly_totals', 'partition_daily_totals', 'partition_monthly_totals')
+        assert [connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables] == [0] * 4
+
+
+def test_sqlite_rebuild_repairs_drifted_rollups(sqlite):
+    add_records(sqlite)
+    day, month = day_number(START), month_number(START)
+    with sqlite.pool.writer() as connection:
+        connection.execute("UPDATE daily_totals SET hours = 99 WHERE day = ?", (day,))
+        connection.execute("DELETE FROM partition_monthly_totals WHERE user = 'ann'")
+
+    assert sqlite.verify_rollups() == [
+        ('daily_totals', day, (10, 2), (99, 2)),
+        ('partition_monthly_totals', ('ann', 'site', month), (2, 1), None),
+    ]
+    sqlite.rebuild_rollups()
+    assert sqlite.verify_rollups() == []
+    assert sqlite.summary(START) == (10, 18, 34)
+
+
+def run_database(*args):
+    return subprocess.run([sys.executable, DATABASE_SCRIPT, *args], capture_output=True, text=True)
+
+
+def test_verify_and_rebuild_commands(tmp_path):
+    path = str(tmp_path / 'work.db')
+    backend = SQLiteBackend(path)
+    add_records(backend)
+    with backend.pool.writer() as connection:
+        connection.execute("UPDATE monthly_totals SET records = 0")
+    backend.close()
+
+    result = run_database('verify', '--db', path)
+    assert result.returncode == 1
+    assert "2 mismatched rollup rows" in result.stdout
+
+    result = run_database('rebuild', '--db', path)
+    assert result.returncode == 0
+    assert "Rollups rebuilt" in result.stdout
+    result = run_database('verify', '--db', path)
+    assert result.returncode == 0
+    assert "0 mismatched rollup rows" in result.stdout
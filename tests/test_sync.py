@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import SQLiteBackend
+from sync import LocalTransport, SyncEndpoint, SyncError, encode, sync
+
+START = datetime(2024, 1, 1, 9)
+
+
+@pytest.fixture
+def local(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'local.db'))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def peer(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'peer.db'))
+    yield backend
+    backend.close()
+
+
+def add_days(backend, first, days, hours):
+    backend.add_many((START + timedelta(days=first + day), hours) for day in range(days))
+
+
+def record(backend, uid):
+    with backend.pool.reader() as connection:
+        return connection.execute(
+            "SELECT hourse, modified FROM working_hourse WHERE uid = ?", (uid,)
+        ).fetchone()
+
+
+def edit(backend, uid, hours, modified):
+    with backend.pool.writer() as connection:
+        connection.execute("UPDATE working_hourse SET hourse = ? WHERE uid = ?", (hours, uid))
+        connection.execute("UPDATE working_hourse SET modified = ? WHERE uid = ?", (modified, uid))
+
+
+def test_push_and_pull(local, peer):
+    add_days(local, 0, 3, 2)
+    add_days(peer, 10, 2, 5)
+
+    stats = sync(local, LocalTransport(SyncEndpoint(peer)), batch_size=2)
+
+    assert (stats['pushed'], stats['pulled'], stats['inserted']) == (3, 2, 2)
+    assert local.count_and_total() == peer.count_and_total() == (5, 16)
+    assert local.verify_rollups() == peer.verify_rollups() == []
+
+
+def test_rows_are_not_echoed_back(local, peer):
+    add_days(local, 0, 3, 2)
+    transport = LocalTransport(SyncEndpoint(peer))
+    sync(local, transport)
+
+    # What the peer got from us is not offered back to us
+    assert peer.changes_since(0, exclude=local.sync_device()) == []
+    stats = sync(local, transport)
+    assert (stats['pushed'], stats['pulled']) == (0, 0)
+
+    # A third database still receives them
+    other = SQLiteBackend(str(local.pool.path) + '-other')
+    try:
+        sync(other, LocalTransport(SyncEndpoint(peer)))
+        assert other.count_and_total() == (3, 6)
+    finally:
+        other.close()
+
+
+def test_conflict_later_edit_wins_on_both_sides(local, peer):
+    add_days(local, 0, 1, 2)
+    transport = LocalTransport(SyncEndpoint(peer))
+    sync(local, transport)
+    uid = local.changes_since(0)[0][0]
+
+    edit(local, uid, 7, 2000000100)
+    edit(peer, uid, 9, 2000000200)
+    sync(local, transport)
+
+    assert record(local, uid) == record(peer, uid) == (9, 2000000200)
+    assert local.count_and_total() == peer.count_and_total() == (1, 9)
+
+
+def test_conflict_tie_settles_on_content(local, peer):
+    add_days(local, 0, 1, 2)
+    transport = LocalTransport(SyncEndpoint(peer))
+    sync(local, transport)
+    uid = local.changes_since(0)[0][0]
+
+    # Edited in the same second on both sides
+    edit(local, uid, 9, 2000000100)
+    edit(peer, uid, 7, 2000000100)
+    sync(local, transport)
+    sync(local, transport)
+
+    assert record(local, uid) == record(peer, uid) == (9, 2000000100)
+
+
+def test_endpoint_rejects_bad_device(peer):
+    endpoint = SyncEndpoint(peer)
+    for device in ('x' * 40, 'bad id', None, peer.sync_device()):
+        with pytest.raises(SyncError):
+            endpoint.handle(encode({'op': 'pull', 'since': 0, 'device': device}))
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from storage import EPOCH, SQLiteBackend
+from write_queue import WriteQueue, read_log
+
+
+def write_log(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_read_log_drops_committed_head_and_torn_tail(tmp_path):
+    log = tmp_path / 'queue'
+    write_log(log, "A 100 1 a\nA 200 2 b\nC 1\nA 300 3 c\nA 40")
+    assert read_log(log) == [(200, 2, 'b'), (300, 3, 'c')]
+
+
+def test_replay_commits_uncommitted_tail(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    log = tmp_path / 'queue'
+    write_log(log, "A 100 1 a\nC 1\nA 200 2 b\nA 300 3 c\nA 40")
+
+    queue = WriteQueue(str(log), lambda: backend, flush_delay=0)
+    queue.close()
+
+    assert queue.stats()['replayed'] == 2
+    assert backend.count_and_total() == (2, 5)
+    assert read_log(log) == []
+
+
+def test_replay_after_commit_is_not_stored_twice(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    log = tmp_path / 'queue'
+    records = [(1700000000 + i * 86400, i + 1, f"uid{i}") for i in range(3)]
+    write_log(log, "".join(f"A {ts} {hours} {uid}\n" for ts, hours, uid in records))
+    # The batch reached the database but the process died before its C line
+    backend.add_once((uid, EPOCH + timedelta(seconds=ts), hours) for ts, hours, uid in records)
+
+    queue = WriteQueue(str(log), lambda: backend, flush_delay=0)
+    queue.close()
+
+    assert queue.stats()['replayed'] == 3
+    assert backend.count_and_total() == (3, 6)
+
+
+def test_saves_are_committed_and_log_truncated(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'work.db'))
+    log = tmp_path / 'queue'
+    committed = []
+    queue = WriteQueue(str(log), lambda: backend, on_commit=committed.extend, flush_delay=0)
+    for day in range(1, 4):
+        queue.add(datetime(2024, 1, day, 9), day)
+    queue.close()
+
+    assert backend.count_and_total() == (3, 6)
+    assert [hours for _, hours in committed] == [1, 2, 3]
+    assert log.read_text() == ''
@@ -0,0 +1,195 @@
+"""Durable queue for record saves, committed in groups by a background thread.
+
+add() appends the record to a small log file and returns as soon as it
+is on disk. A flusher thread waits a moment for more saves to pile up,
+then commits everything pending to the backend in one transaction.
+Records stay in the log until they are committed, so a save survives a
+locked database, a dropped connection or the app being killed: whatever
+the log still holds is replayed when the queue is next opened.
+
+The log is plain text, one line per event:
+
+    A <ts> <hours> <uid>    a record saved at local epoch seconds ts
+    C <n>                   the first n A lines in the file are committed
+
+The file is truncated whenever everything in it has been committed. A
+crash in the instant between a commit and writing its C line replays
+that batch once more; every record carries its uid into the database
+(backend.add_once), which skips the ones it already has, so each record
+is still stored once.
+"""
+from datetime import timedelta
+import os
+import threading
+import uuid
+
+from instrumentation import metrics
+from storage import DB_ERRORS, EPOCH, to_epoch
+
+# Seconds the flusher waits after the first save so a burst commits together
+FLUSH_DELAY = 0.2
+# Records per transaction
+MAX_BATCH = 500
+# Backoff between attempts while the database is unavailable
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 30
+
+
+def new_uid():
+    return uuid.uuid4().hex
+
+
+def read_log(path):
+    """Return the (ts, hours, uid) records in the log that were never committed"""
+    records, committed = [], 0
+    try:
+        with open(path) as f:
+            lines = f.read().split('\n')
+    except FileNotFoundError:
+        return records
+    # The last element is '' for a complete log, or a torn final write
+    for line in lines[:-1]:
+        parts = line.split()
+        try:
+            if parts[0] == 'A':
+                # Logs written before records had uids get one now
+                records.append((int(parts[1]), int(parts[2]), parts[3] if len(parts) > 3 else new_uid()))
+            elif parts[0] == 'C':
+                committed = int(parts[1])
+        except (IndexError, ValueError):
+            print(f"Skipping bad write queue line: {line!r}")
+    return records[committed:]
+
+
+class WriteQueue:
+    """Append-only log of saves plus the thread that commits them.
+
+    get_backend is called for every commit, and may return None while the
+    database can't be opened. on_commit(records) runs on the flusher
+    thread after each successful commit, with the (ts, hours) records.
+    """
+
+    def __init__(self, path, get_backend, on_commit=None, flush_delay=FLUSH_DELAY, sync=True):
+        self.path = path
+        self.get_backend = get_backend
+        self.on_commit = on_commit
+        self.flush_delay = flush_delay
+        self.sync = sync
+        self.committed = 0
+        self.batches = 0
+        self.failures = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._pending = read_log(path)
+        self.replayed = len(self._pending)
+        self._rewrite()
+        self._log = open(path, 'a')
+        self._log_committed = 0  # A lines at the top of the file already committed
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def _rewrite(self):
+        """Start the log afresh with just the pending records"""
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as f:
+            f.writelines(f"A {ts} {hours} {uid}\n" for ts, hours, uid in self._pending)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+    def _write(self, line):
+        self._log.write(line)
+        self._log.flush()
+        if self.sync:
+            os.fsync(self._log.fileno())
+
+    def add(self, date_time, hours):
+        """Log one record; it is committed in the background shortly after.
+
+        Raises OSError if the log can't be written, the record is not queued then.
+        """
+        record = (to_epoch(date_time), hours, new_uid())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write queue is closed")
+            self._write("A {} {} {}\n".format(*record))
+            self._pending.append(record)
+            # Only the first save of a batch wakes the flusher, later ones
+            # must not cut its wait short
+            if len(self._pending) == 1:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        retry = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                if not self._closed:
+                    # close() notifies, so shutting down flushes right away
+                    self._cond.wait(retry or self.flush_delay)
+                closing = self._closed
+                batch = self._pending[:MAX_BATCH]
+            if self._commit(batch):
+                retry = 0
+            elif closing:
+                # Left in the log for the next start
+                return
+            else:
+                retry = min(max(retry * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+
+    @metrics.timed('queue.commit')
+    def _commit(self, batch):
+        try:
+            backend = self.get_backend()
+            if backend is None:
+                raise RuntimeError("No database")
+            backend.add_once((uid, EPOCH + timedelta(seconds=ts), hours) for ts, hours, uid in batch)
+        except (RuntimeError,) + DB_ERRORS as e:
+            print(f"Error committing queued records: {e}")
+            metrics.error('queue.commit', e)
+            self.failures += 1
+            return False
+
+        with self._cond:
+            del self._pending[:len(batch)]
+            self.committed += len(batch)
+            self.batches += 1
+            try:
+                if self._pending:
+                    self._log_committed += len(batch)
+                    self._write(f"C {self._log_committed}\n")
+                else:
+                    self._log.truncate(0)
+                    self._log_committed = 0
+            except OSError as e:
+                # The records are in the database; at worst they replay again
+                print(f"Error updating write queue log: {e}")
+                metrics.error('queue.log', e)
+        if self.on_commit is not None:
+            self.on_commit([(ts, hours) for ts, hours, _ in batch])
+        return True
+
+    def close(self, timeout=None):
+        """Commit what can be committed and stop; the rest stays in the log"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        with self._cond:
+            self._log.close()
+
+    def stats(self):
+        return {
+            'pending': self.pending(),
+            'committed': self.committed,
+            'batches': self.batches,
+            'failures': self.failures,
+            'replayed': self.replayed,
+        }